@@ -2,12 +2,18 @@
 Generic MDP Pathway Module
 
 """
-import numpy, math, scipy.stats
+import numpy, math, scipy.stats, scipy.special
 
 
 class MDP_Pathway:
     def __init__(self, policy_length):
         self.policy_length = policy_length
+
+        #the events' states and actions as arrays, built the first time they're needed, and dropped
+        #  whenever the events list changes (see MDP_EventList)
+        self._feature_matrix = None
+        self._action_vector = None
+
         self.events = []
         self.metadata = {}
         self.ID_number = 0
@@ -18,6 +24,10 @@ class MDP_Pathway:
         self.generation_policy_parameters = [1.0] * policy_length
         self.generation_joint_prob = 1.0
 
+        #the log of generation_joint_prob, which (unlike the joint probability itself) does not
+        #  underflow to zero on long pathways
+        self.generation_log_joint_prob = 0.0
+
         #other cumulative measures
         self.actions_0_taken = 0
         self.actions_1_taken = 0
@@ -32,6 +42,9 @@ class MDP_Pathway:
         self.normalized_value_mag = 0.0
         self.normalized_value_mean = 0.0
 
+        #any original values that the recorded means and magnitudes can't restore exactly (see MDP_Normalizer)
+        self.normalization_corrections = None
+
 
         self.discount_rate = 1.0
 
@@ -39,18 +52,64 @@ class MDP_Pathway:
         self.net_value = 0.0
 
 
+    @property
+    def events(self):
+        return self._events
+
+    @events.setter
+    def events(self, event_list):
+        self._events = MDP_EventList(self, event_list)
+        self.invalidate_feature_cache()
+
+    def __setstate__(self, state):
+        #pathways pickled before the events list was wrapped hold it as a plain "events" list
+        if "events" in state:
+            state["_events"] = MDP_EventList(self, state.pop("events"))
+        state.setdefault("_feature_matrix", None)
+        state.setdefault("_action_vector", None)
+        state.setdefault("normalization_corrections", None)
+        self.__dict__.update(state)
+
+    def invalidate_feature_cache(self):
+        """Drops the cached feature matrix and action vector. Changes to the events list do this automatically,
+        but changes to an event's own state or action do not, so call this after making any."""
+        self._feature_matrix = None
+        self._action_vector = None
+
+    def feature_matrix(self):
+        """Returns an (events x policy_length) array of the events' states, building and caching it if needed"""
+        if self._feature_matrix is None:
+            if len(self.events) == 0:
+                self._feature_matrix = numpy.zeros((0, self.policy_length))
+            else:
+                self._feature_matrix = numpy.array([e.state for e in self.events], dtype=float).reshape(len(self.events), -1)
+        return self._feature_matrix
+
+    def action_vector(self):
+        """Returns a boolean array of the events' actions, building and caching it if needed"""
+        if self._action_vector is None:
+            self._action_vector = numpy.array([bool(e.action) for e in self.events], dtype=bool)
+        return self._action_vector
+
+    def calc_action_probs(self, parameter_list, probability_lower_limit=0.001, probability_upper_limit=0.999):
+        """Returns an array of the probability of each event's action under the logistic policy with the given
+        parameters, limited to [probability_lower_limit, probability_upper_limit] as in MDP_Policy.calc_prob()"""
+        p = logistic_array(numpy.dot(self.feature_matrix(), numpy.asarray(parameter_list, dtype=float)))
+        p = numpy.clip(p, probability_lower_limit, probability_upper_limit)
+        return numpy.where(self.action_vector(), p, 1.0 - p)
+
+    def calc_joint_probs(self, parameter_list, probability_lower_limit=0.001, probability_upper_limit=0.999):
+        """Returns the joint probability, and its log, of this pathway's actions under the logistic policy with
+        the given parameters. See calc_action_probs()"""
+        probs = self.calc_action_probs(parameter_list, probability_lower_limit, probability_upper_limit)
+        return float(numpy.prod(probs)), log_joint_prob(probs)
+
     def set_generation_policy_parameters(self,parameter_list, UPDATE_JOINT_PROB=False):
         self.generation_policy_parameters = parameter_list
 
         #calculate the joint probability (assuming there are any MDP_Event objects in the list)
-        pol = MDP_Policy(self.policy_length)
-
         if UPDATE_JOINT_PROB:
-            joint_p = 1.0
-            for ev in self.events:
-                joint_p *= pol.calc_action_prob(ev)
-
-            self.generation_joint_prob = joint_p
+            self.generation_joint_prob, self.generation_log_joint_prob = self.calc_joint_probs(parameter_list)
 
     def update_net_value(self):
         """Sums the rewards from every event and records the value in self.net_value"""
@@ -66,6 +125,70 @@ class MDP_Pathway:
 
 
 
+class MDP_EventList(list):
+    """The list holding an MDP_Pathway's events. It is an ordinary list, except that any change to it tells the
+    pathway to drop its cached feature matrix and action vector."""
+
+    def __init__(self, pathway, events=()):
+        list.__init__(self, events)
+        self.pathway = pathway
+
+    def _changed(self):
+        #while unpickling, items are added before the pathway is restored
+        pathway = getattr(self, "pathway", None)
+        if pathway is not None: pathway.invalidate_feature_cache()
+
+    def append(self, event):
+        list.append(self, event)
+        self._changed()
+
+    def extend(self, events):
+        list.extend(self, events)
+        self._changed()
+
+    def insert(self, i, event):
+        list.insert(self, i, event)
+        self._changed()
+
+    def pop(self, i=-1):
+        event = list.pop(self, i)
+        self._changed()
+        return event
+
+    def remove(self, event):
+        list.remove(self, event)
+        self._changed()
+
+    def clear(self):
+        list.clear(self)
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self._changed()
+
+    def __setitem__(self, i, value):
+        list.__setitem__(self, i, value)
+        self._changed()
+
+    def __delitem__(self, i):
+        list.__delitem__(self, i)
+        self._changed()
+
+    def __iadd__(self, events):
+        self.extend(events)
+        return self
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self._changed()
+        return self
+
+
 class MDP_Event:
     def __init__(self,sequence_index):
         """Instantiation
@@ -100,6 +223,176 @@ class MDP_Event:
         self.metadata = meta_data_dictionary
 
 
+class MDP_Dataset:
+    def __init__(self, policy_length, lengths, states, actions, action_probs, decision_probs, rewards, sequence_indices=None):
+        """A whole set of pathways, with every event's values held in contiguous numpy arrays.
+
+        Rather than one MDP_Event object per event, each event field is one array over all events, with
+        each pathway's events stored one after the other. Indexing the dataset returns MDP_ArrayPathway
+        objects, which behave like MDP_Pathway objects but whose events are views into these arrays.
+
+        Arguements:
+        policy_length: integer: the number of features (and policy parameters) of each event
+        lengths: the number of events in each pathway, in order
+        states: an (events x features) array-like of event features
+        actions: an array-like of booleans, one per event
+        action_probs: an array-like of the probability of taking the action, one per event
+        decision_probs: an array-like of the probability of doing what was done, one per event
+        rewards: an (events x rewards) array-like, or a 1-D array-like if each event has one reward
+        sequence_indices: optional array-like of each event's step within its pathway. Defaults to
+          0, 1, 2... within each pathway
+        """
+        self.policy_length = policy_length
+        self.lengths = numpy.asarray(lengths, dtype=numpy.int64)
+        self.offsets = numpy.concatenate(([0], numpy.cumsum(self.lengths))).astype(numpy.int64)
+        event_count = int(self.offsets[-1])
+
+        self.states = numpy.ascontiguousarray(states, dtype=float).reshape(event_count, -1)
+        self.actions = numpy.ascontiguousarray(actions, dtype=bool)
+        self.action_probs = numpy.ascontiguousarray(action_probs, dtype=float)
+        self.decision_probs = numpy.ascontiguousarray(decision_probs, dtype=float)
+        self.rewards = numpy.ascontiguousarray(rewards, dtype=float).reshape(event_count, -1)
+        if sequence_indices is None:
+            sequence_indices = numpy.arange(event_count) - numpy.repeat(self.offsets[:-1], self.lengths)
+        self.sequence_indices = numpy.ascontiguousarray(sequence_indices, dtype=numpy.int64)
+
+        self.pathways = [MDP_ArrayPathway(self, j) for j in range(len(self.lengths))]
+
+    def __len__(self):
+        return len(self.pathways)
+
+    def __getitem__(self, j):
+        return self.pathways[j]
+
+    def __iter__(self):
+        return iter(self.pathways)
+
+    def event_count(self):
+        return int(self.offsets[-1])
+
+    def pathway_slice(self, j):
+        """Returns the slice of the event arrays that holds pathway j's events"""
+        return slice(int(self.offsets[j]), int(self.offsets[j+1]))
+
+
+class MDP_ArrayPathway:
+    """A pathway whose events are held in an MDP_Dataset's arrays. It has the same attributes and methods as
+    MDP_Pathway, but uses __slots__ and never creates per-event objects unless its events are indexed."""
+
+    __slots__ = ["dataset", "index", "policy_length", "metadata", "ID_number", "generation_policy_parameters",
+                 "generation_joint_prob", "generation_log_joint_prob", "actions_0_taken", "actions_1_taken",
+                 "normalized", "normalization_mags", "normalization_means", "normalized_value",
+                 "normalized_value_mag", "normalized_value_mean", "normalization_corrections", "discount_rate",
+                 "net_value"]
+
+    def __init__(self, dataset, index):
+        self.dataset = dataset
+        self.index = index
+        self.policy_length = dataset.policy_length
+        self.metadata = {}
+        self.ID_number = 0
+        self.generation_policy_parameters = [1.0] * self.policy_length
+        self.generation_joint_prob = 1.0
+        self.generation_log_joint_prob = 0.0
+        self.actions_0_taken = 0
+        self.actions_1_taken = 0
+        self.normalized = False
+        self.normalization_mags = []
+        self.normalization_means = []
+        self.normalized_value = False
+        self.normalized_value_mag = 0.0
+        self.normalized_value_mean = 0.0
+        self.normalization_corrections = None
+        self.discount_rate = 1.0
+        self.net_value = 0.0
+
+    #zero-copy views of this pathway's part of the dataset arrays
+    @property
+    def states(self): return self.dataset.states[self.dataset.pathway_slice(self.index)]
+    @property
+    def actions(self): return self.dataset.actions[self.dataset.pathway_slice(self.index)]
+    @property
+    def action_probs(self): return self.dataset.action_probs[self.dataset.pathway_slice(self.index)]
+    @property
+    def decision_probs(self): return self.dataset.decision_probs[self.dataset.pathway_slice(self.index)]
+    @property
+    def rewards(self): return self.dataset.rewards[self.dataset.pathway_slice(self.index)]
+    @property
+    def sequence_indices(self): return self.dataset.sequence_indices[self.dataset.pathway_slice(self.index)]
+
+    @property
+    def events(self):
+        return MDP_EventArray(self.dataset, self.dataset.pathway_slice(self.index))
+
+    #the dataset's arrays already are this pathway's feature matrix and action vector
+    def feature_matrix(self): return self.states
+    def action_vector(self): return self.actions
+    def invalidate_feature_cache(self): pass
+
+    #these work on the events view exactly as they do for MDP_Pathway
+    calc_action_probs = MDP_Pathway.calc_action_probs
+    calc_joint_probs = MDP_Pathway.calc_joint_probs
+    set_generation_policy_parameters = MDP_Pathway.set_generation_policy_parameters
+    strip_metadata = MDP_Pathway.strip_metadata
+
+    def update_net_value(self):
+        """Sums the rewards from every event and records the value in self.net_value"""
+        discounts = numpy.power(float(self.discount_rate), self.sequence_indices)
+        self.net_value = float(numpy.dot(self.rewards.sum(axis=1), discounts))
+
+
+class MDP_EventArray:
+    """A read-only, list-like view of a run of events in an MDP_Dataset. Indexing it returns MDP_EventView objects."""
+
+    __slots__ = ["dataset", "start", "stop"]
+
+    def __init__(self, dataset, event_slice):
+        self.dataset = dataset
+        self.start = event_slice.start
+        self.stop = event_slice.stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0: i += len(self)
+        if not (0 <= i < len(self)): raise IndexError("event index out of range")
+        return MDP_EventView(self.dataset, self.start + i)
+
+    def __iter__(self):
+        for i in range(self.start, self.stop):
+            yield MDP_EventView(self.dataset, i)
+
+
+class MDP_EventView:
+    """One event of an MDP_Dataset, with the same (read-only) attributes as MDP_Event"""
+
+    __slots__ = ["dataset", "i"]
+
+    def __init__(self, dataset, i):
+        self.dataset = dataset
+        self.i = i
+
+    @property
+    def sequence_index(self): return int(self.dataset.sequence_indices[self.i])
+    @property
+    def state(self): return self.dataset.states[self.i]
+    @property
+    def state_length(self): return self.dataset.states.shape[1]
+    @property
+    def action(self): return bool(self.dataset.actions[self.i])
+    @property
+    def action_prob(self): return float(self.dataset.action_probs[self.i])
+    @property
+    def decision_prob(self): return float(self.dataset.decision_probs[self.i])
+    @property
+    def rewards(self): return self.dataset.rewards[self.i]
+    @property
+    def metadata(self): return {}
+
+
 class MDP_Policy:
     def __init__(self, policy_length):
         #TODO unlock multiple actions
@@ -176,10 +469,358 @@ class MDP_Policy:
 
 
 
+class MDP_Evaluator:
+    def __init__(self, pathways, probability_lower_limit=0.001, probability_upper_limit=0.999):
+        """Off-policy evaluator for scoring many candidate policies against one set of MDP_Pathway objects.
+
+        The features, actions and generation probabilities of every event are stacked into arrays once, here,
+        so that each call to evaluate() is a few matrix operations, no matter how many events there are.
+
+        Arguements:
+        pathways: a list of MDP_Pathway objects, generated under the policy (or policies) recorded in their events'
+          decision_prob values
+        probability_lower_limit, probability_upper_limit: the limits applied to each candidate policy's
+          probabilities, as in MDP_Policy
+        """
+        self.probability_lower_limit = probability_lower_limit
+        self.probability_upper_limit = probability_upper_limit
+
+        self.pathway_count = len(pathways)
+        self.values = numpy.array([pw.net_value for pw in pathways], dtype=float)
+
+        if isinstance(pathways, MDP_Dataset):
+            #already stacked, so just use the dataset's arrays
+            self.lengths = pathways.lengths
+            self.offsets = pathways.offsets[:-1]
+            self.event_count = pathways.event_count()
+            self.states = pathways.states
+            self.actions = pathways.actions
+            self.action_probs = pathways.action_probs
+            decision_probs = pathways.decision_probs
+        else:
+            self.lengths = numpy.array([len(pw.events) for pw in pathways], dtype=int)
+            self.offsets = numpy.concatenate(([0], numpy.cumsum(self.lengths)[:-1])).astype(int)
+
+            events = [e for pw in pathways for e in pw.events]
+            self.event_count = len(events)
+            self.states = numpy.array([e.state for e in events], dtype=float).reshape(self.event_count, -1)
+            self.actions = numpy.array([bool(e.action) for e in events], dtype=bool)
+            self.action_probs = numpy.array([e.action_prob for e in events], dtype=float)
+            decision_probs = numpy.array([e.decision_prob for e in events], dtype=float)
+
+        #log-probability of each pathway under the policy that generated it
+        self.generation_log_probs = self.sum_by_pathway(log_probs(decision_probs))
+
+        #the parts of the KL divergence that only depend on the generation policy (see KLD())
+        self.kld_pk = self.action_probs / self.action_probs.sum() if self.event_count > 0 else self.action_probs
+        self.kld_pk_entropy = float(numpy.sum(scipy.special.xlogy(self.kld_pk, self.kld_pk)))
+
+    def sum_by_pathway(self, event_values):
+        """Sums an array with one row per event into an array with one row per pathway"""
+        totals = numpy.zeros((self.pathway_count,) + event_values.shape[1:])
+        nonempty = self.lengths > 0
+        if self.event_count > 0:
+            totals[nonempty] = numpy.add.reduceat(event_values, self.offsets[nonempty], axis=0)
+        return totals
+
+    def action_log_probs(self, policies):
+        """Returns an (events x policies) array of the log-probability of each event's action under each policy.
+
+        Arguements:
+        policies: a (policies x features) array-like, with one row of policy parameters per candidate policy
+        """
+        B = numpy.atleast_2d(numpy.asarray(policies, dtype=float))
+        p = logistic_array(numpy.dot(self.states, B.T))
+        p = numpy.clip(p, self.probability_lower_limit, self.probability_upper_limit)
+        return numpy.log(numpy.where(self.actions[:,None], p, 1.0 - p))
+
+    def evaluate(self, policies, chunk_size=None):
+        """Returns importance-weighted value estimates and weight diagnostics for each candidate policy
+
+        Arguements:
+        policies: a (policies x features) array-like, with one row of policy parameters per candidate policy
+        chunk_size: the number of policies scored at once. Defaults to however many keep the
+          (events x policies) working array to about ten million entries.
+
+        Returns a dictionary of arrays, each with one entry per policy:
+          "Value": the ordinary importance sampling estimate, the mean of weight * net_value
+          "Weighted Value": the self-normalized (weighted) importance sampling estimate
+          "Effective Sample Size": (sum of weights)^2 / (sum of squared weights)
+          "Max Weight": the largest pathway weight, as a fraction of the sum of the weights
+          "Log Weight Mean", "Log Weight STD": the mean and standard deviation of the pathway log-weights
+        """
+        B = numpy.atleast_2d(numpy.asarray(policies, dtype=float))
+        K = B.shape[0]
+        if chunk_size is None: chunk_size = max(1, 10000000 // max(1, self.event_count))
+
+        results = {}
+        for key in ["Value", "Weighted Value", "Effective Sample Size", "Max Weight", "Log Weight Mean", "Log Weight STD"]:
+            results[key] = numpy.zeros(K)
+
+        for start in range(0, K, chunk_size):
+            stop = min(K, start + chunk_size)
+            log_w = self.sum_by_pathway(self.action_log_probs(B[start:stop])) - self.generation_log_probs[:,None]
+
+            #scale by the largest log-weight before exponentiating, so the weights can't overflow
+            scale = log_w.max(axis=0)
+            w = numpy.exp(log_w - scale)
+            w_sum = w.sum(axis=0)
+            weighted_total = numpy.dot(self.values, w)
+
+            with numpy.errstate(over="ignore"):
+                results["Value"][start:stop] = weighted_total * numpy.exp(scale) / self.pathway_count
+            results["Weighted Value"][start:stop] = weighted_total / w_sum
+            results["Effective Sample Size"][start:stop] = w_sum**2 / (w**2).sum(axis=0)
+            results["Max Weight"][start:stop] = 1.0 / w_sum
+            results["Log Weight Mean"][start:stop] = log_w.mean(axis=0)
+            results["Log Weight STD"][start:stop] = log_w.std(axis=0)
+
+        return results
+
+    def KLD(self, policies, chunk_size=None):
+        """Returns an array of the Kullback-Leibler divergence of each candidate policy from the generation policy.
+
+        Each value is the same as MDP.KLD(pathways, policy) would give, i.e. scipy.stats.entropy(pk, qk) where pk
+        are the events' action_prob values and qk the logistic action probabilities under the candidate policy,
+        each normalized to sum to one. Since pk doesn't change between calls, its normalization and the
+        sum(pk*ln(pk)) term are computed once, when the evaluator is built, leaving
+
+            KLD = sum(pk*ln(pk)) - sum(pk*ln(qk)) + ln(sum(qk))
+
+        Arguements:
+        policies: a (policies x features) array-like, with one row of policy parameters per candidate policy
+        chunk_size: the number of policies handled at once. See evaluate()
+        """
+        B = numpy.atleast_2d(numpy.asarray(policies, dtype=float))
+        K = B.shape[0]
+        if chunk_size is None: chunk_size = max(1, 10000000 // max(1, self.event_count))
+
+        kld = numpy.zeros(K)
+        for start in range(0, K, chunk_size):
+            stop = min(K, start + chunk_size)
+            qk = logistic_array(numpy.dot(self.states, B[start:stop].T))
+            with numpy.errstate(divide="ignore"):
+                kld[start:stop] = (self.kld_pk_entropy - numpy.sum(scipy.special.xlogy(self.kld_pk[:,None], qk), axis=0)
+                                   + numpy.log(qk.sum(axis=0)))
+        return kld
+
+
+
+class MDP_Normalizer:
+    def __init__(self, feature_count=0):
+        """Streaming means and magnitudes of event features and pathway net values, for normalizing a dataset.
+
+        update() takes the pathways a batch at a time, so a dataset never has to be in memory all at once,
+        and merge() combines normalizers built on separate shards (e.g. in separate processes), using Chan
+        et al.'s pairwise update of the count, mean and sum of squared deviations. The result is the same
+        (up to rounding) as computing the statistics over all of the pathways at once.
+
+        Each magnitude is the power of two nearest the standard deviation, so that scaling is exact.
+        Features that never vary (like a constant intercept term) get a mean of 0 and a magnitude of 1, so
+        normalizing leaves them alone.
+
+        Arguements:
+        feature_count: integer: the number of features of each event. Default=0, which takes it from the
+          first pathways given to update()
+        """
+        self.feature_count = feature_count
+        self.count = 0
+        self.mean = numpy.zeros(feature_count)
+        self.M2 = numpy.zeros(feature_count)
+        self.value_count = 0
+        self.value_mean = 0.0
+        self.value_M2 = 0.0
+
+    def update(self, pathways):
+        """Adds the events and net values of a list of pathways, or of an MDP_Dataset, to the statistics"""
+        if isinstance(pathways, MDP_Dataset):
+            self._merge_features(pathways.states)
+            self._merge_values(numpy.array([pw.net_value for pw in pathways], dtype=float))
+            return
+
+        for pw in pathways:
+            self._merge_features(pw.feature_matrix())
+        self._merge_values(numpy.array([pw.net_value for pw in pathways], dtype=float))
+
+    def merge(self, other):
+        """Adds the statistics of another MDP_Normalizer (e.g. one built on another shard) to this one's"""
+        if other.count > 0:
+            self._merge(other.count, other.mean, other.M2)
+        if other.value_count > 0:
+            self.value_count, self.value_mean, self.value_M2 = _chan_merge(self.value_count, self.value_mean, self.value_M2,
+                                                                           other.value_count, other.value_mean, other.value_M2)
+
+    def means(self):
+        """Returns the array of feature means used for normalizing (0 for features that never vary)"""
+        return numpy.where(self.M2 > 0, self.mean, 0.0)
+
+    def magnitudes(self):
+        """Returns the array of feature magnitudes used for normalizing (1 for features that never vary)"""
+        return numpy.array([_power_of_two(math.sqrt(m2 / self.count)) if m2 > 0 else 1.0 for m2 in self.M2])
+
+    def value_normalization(self):
+        """Returns the (mean, magnitude) used for normalizing net values"""
+        if self.value_M2 > 0:
+            return self.value_mean, _power_of_two(math.sqrt(self.value_M2 / self.value_count))
+        return 0.0, 1.0
+
+    def apply(self, pathways, FEATURES=True, VALUES=True):
+        """Normalizes the events' features and/or the net values of a list of pathways, or an MDP_Dataset, in
+        place, as (x - mean) / magnitude. The means and magnitudes are recorded on each pathway (in
+        normalization_means, normalization_mags, normalized_value_mean and normalized_value_mag), along with
+        the original values of the few entries that rounding would stop them from restoring exactly, so that
+        denormalize() can undo the normalization exactly. Whether they were normalized as a list or as a
+        dataset, the pathways of a dataset can be denormalized either way.
+
+        The magnitudes are powers of two (see magnitudes()), not the standard deviations themselves, so the
+        normalized features have a standard deviation between about 0.71 and 1.41, rather than exactly 1.
+
+        A list may hold MDP_ArrayPathway objects (e.g. from MDP_MetadataIndex.select()), whose features are
+        normalized in their dataset's arrays. Those arrays must be writeable.
+        """
+        means = self.means()
+        mags = self.magnitudes()
+        value_mean, value_mag = self.value_normalization()
+
+        for pw in pathways:
+            if (FEATURES and pw.normalized) or (VALUES and pw.normalized_value):
+                raise ValueError("Pathway " + str(pw.ID_number) + " is already normalized")
+            #check before changing anything, so a read-only dataset can't leave the list half normalized
+            if FEATURES and isinstance(pw, MDP_ArrayPathway):
+                _check_writeable(pw.dataset)
+
+        if FEATURES and isinstance(pathways, MDP_Dataset):
+            _check_writeable(pathways)
+            pathways.states[:], (wrong, originals) = _normalize_array(pathways.states, means, mags)
+            #each pathway keeps its own corrections, indexed within its feature matrix, so it can also be
+            # denormalized without the rest of the dataset
+            row_length = pathways.states.shape[1]
+            bounds = numpy.searchsorted(wrong, pathways.offsets * row_length)
+
+        for j, pw in enumerate(pathways):
+            if pw.normalization_corrections is None:
+                pw.normalization_corrections = {}
+            if FEATURES:
+                if isinstance(pathways, MDP_Dataset):
+                    pw.normalization_corrections["Features"] = (wrong[bounds[j]:bounds[j+1]] - pathways.offsets[j] * row_length,
+                                                                originals[bounds[j]:bounds[j+1]])
+                else:
+                    normalized, pw.normalization_corrections["Features"] = _normalize_array(pw.feature_matrix(), means, mags)
+                    _set_event_states(pw, normalized)
+                pw.normalized = True
+                pw.normalization_means = means.tolist()
+                pw.normalization_mags = mags.tolist()
+            if VALUES:
+                normalized = (pw.net_value - value_mean) / value_mag
+                if normalized * value_mag + value_mean != pw.net_value:
+                    pw.normalization_corrections["Net Value"] = pw.net_value
+                pw.net_value = normalized
+                pw.normalized_value = True
+                pw.normalized_value_mean = value_mean
+                pw.normalized_value_mag = value_mag
+
+    def _merge_features(self, X):
+        X = numpy.asarray(X, dtype=float)
+        if len(X) == 0: return
+        if self.count == 0 and self.feature_count == 0:
+            self.feature_count = X.shape[1]
+            self.mean = numpy.zeros(self.feature_count)
+            self.M2 = numpy.zeros(self.feature_count)
+        mean = X.mean(axis=0)
+        self._merge(len(X), mean, ((X - mean)**2).sum(axis=0))
+
+    def _merge(self, count, mean, M2):
+        self.count, self.mean, self.M2 = _chan_merge(self.count, self.mean, self.M2, count, mean, M2)
+
+    def _merge_values(self, values):
+        if len(values) == 0: return
+        mean = float(values.mean())
+        self.value_count, self.value_mean, self.value_M2 = _chan_merge(self.value_count, self.value_mean, self.value_M2,
+                                                                       len(values), mean, float(((values - mean)**2).sum()))
+
+
 #################################################################
 # MODULE-LEVEL FUNCTIONS
 #################################################################
 
+def denormalize(pathways):
+    """Exactly undoes MDP_Normalizer.apply() on a list of pathways, or an MDP_Dataset, using the means,
+    magnitudes and corrections recorded on them"""
+    pathways_list = list(pathways)
+    #a dataset whose pathways were all normalized alike is denormalized in one pass over its states array
+    WHOLE_DATASET = (isinstance(pathways, MDP_Dataset) and len(pathways_list) > 0 and
+                     all(pw.normalized and pw.normalization_means == pathways_list[0].normalization_means and
+                         pw.normalization_mags == pathways_list[0].normalization_mags for pw in pathways_list))
+    if WHOLE_DATASET:
+        _check_writeable(pathways)
+        means = numpy.array(pathways_list[0].normalization_means)
+        mags = numpy.array(pathways_list[0].normalization_mags)
+        row_length = pathways.states.shape[1]
+        corrections = [pw.normalization_corrections["Features"] for pw in pathways_list]
+        wrong = numpy.concatenate([c[0] + pathways.offsets[j] * row_length for j, c in enumerate(corrections)])
+        originals = numpy.concatenate([c[1] for c in corrections])
+        pathways.states[:] = _denormalize_array(pathways.states, means, mags, (wrong.astype(numpy.int64), originals))
+
+    for pw in pathways_list:
+        corrections = pw.normalization_corrections or {}
+        if pw.normalized:
+            if not WHOLE_DATASET:
+                means = numpy.array(pw.normalization_means)
+                mags = numpy.array(pw.normalization_mags)
+                _set_event_states(pw, _denormalize_array(pw.feature_matrix(), means, mags, corrections["Features"]))
+            pw.normalized = False
+            pw.normalization_means = []
+            pw.normalization_mags = []
+        if pw.normalized_value:
+            pw.net_value = pw.net_value * pw.normalized_value_mag + pw.normalized_value_mean
+            if "Net Value" in corrections: pw.net_value = corrections["Net Value"]
+            pw.normalized_value = False
+            pw.normalized_value_mean = 0.0
+            pw.normalized_value_mag = 0.0
+        pw.normalization_corrections = None
+
+def _chan_merge(count_a, mean_a, M2_a, count_b, mean_b, M2_b):
+    """Returns the (count, mean, sum of squared deviations) of two sets of values, from each set's own"""
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (float(count_b) / count)
+    M2 = M2_a + M2_b + delta**2 * (float(count_a) * count_b / count)
+    return count, mean, M2
+
+def _power_of_two(x):
+    """Returns the power of two nearest x (which must be positive)"""
+    return 2.0 ** round(math.log(x, 2))
+
+def _normalize_array(X, means, mags):
+    """Returns (X - means) / mags, and the flat indices and original values of any entries of X that
+    normalized * mags + means doesn't give back exactly"""
+    normalized = (X - means) / mags
+    wrong = numpy.flatnonzero(normalized * mags + means != X)
+    return normalized, (wrong, numpy.asarray(X).ravel()[wrong].copy())
+
+def _denormalize_array(normalized, means, mags, corrections):
+    X = normalized * mags + means
+    wrong, originals = corrections
+    X.ravel()[wrong] = originals
+    return X
+
+def _set_event_states(pw, states):
+    """Writes each row of states back to the matching event of an MDP_Pathway, keeping the events' own
+    state type (list or array), and caches the array as the pathway's feature matrix. The events of an
+    MDP_ArrayPathway are read-only views, so its rows are written into its dataset's states array instead."""
+    if isinstance(pw, MDP_ArrayPathway):
+        _check_writeable(pw.dataset)
+        pw.states[:] = states
+        return
+    for e, row in zip(pw.events, states):
+        e.state = row.tolist() if isinstance(e.state, list) else row.copy()
+    pw._feature_matrix = states
+
+def _check_writeable(dataset):
+    if not dataset.states.flags.writeable:
+        raise ValueError("Can't normalize an MDP_Dataset whose arrays are read-only (e.g. one loaded with "
+                         "MDP_PathwayStore.load(mmap_mode='r')); load it with mmap_mode='r+' or None instead")
+
 def convert_to_array(numeric_list):
     #check to see if using int's is a good idea. If the values are in between +/- 10, maybe use floats
     USE_FLOAT = False
@@ -198,6 +839,26 @@ def convert_to_array(numeric_list):
     return arr
 
     
+def convert_pathways_to_MDP_dataset(pathways):
+    """Packs a list of MDP_Pathway objects into an MDP_Dataset, copying over their pathway-level values.
+    Every event in the list must have the same number of features and of rewards."""
+    events = [e for pw in pathways for e in pw.events]
+    policy_length = pathways[0].policy_length if len(pathways) > 0 else 0
+    dataset = MDP_Dataset(policy_length,
+                          [len(pw.events) for pw in pathways],
+                          [e.state for e in events],
+                          [bool(e.action) for e in events],
+                          [e.action_prob for e in events],
+                          [e.decision_prob for e in events],
+                          [e.rewards for e in events],
+                          [e.sequence_index for e in events])
+
+    for pw, new_pw in zip(pathways, dataset):
+        for attr in MDP_ArrayPathway.__slots__[2:]:
+            setattr(new_pw, attr, getattr(pw, attr, getattr(new_pw, attr)))
+
+    return dataset
+
 def convert_SWIMM_pathway_to_MDP_pathway(SWIMM_pathway):
     """ Converts a SWIMM pathway into a generic MDP_Pathway object and returns it"""
     
@@ -224,6 +885,8 @@ def convert_SWIMM_pathway_to_MDP_pathway(SWIMM_pathway):
         event.rewards = [SWIMM_pathway["States"][i][4]]
         
         new_MDP_pw.events.append(event)
+
+    new_MDP_pw.generation_log_joint_prob = log_joint_prob([e.decision_prob for e in new_MDP_pw.events])
     
     return new_MDP_pw
 
@@ -337,6 +1000,22 @@ def logistic(value):
         #  for a logistic function.
         return 0.0
 
+def logistic_array(values):
+    """Element-wise logistic function over a numpy array. Like logistic(), very negative values give 0.0"""
+    with numpy.errstate(over="ignore"):
+        return 1.0 / (1.0 + numpy.exp(-values))
+
+def log_probs(probabilities):
+    """Element-wise log of an array of probabilities, giving -inf (without a warning) for zeros"""
+    with numpy.errstate(divide="ignore"):
+        return numpy.log(probabilities)
+
+def log_joint_prob(probabilities):
+    """Returns the log of the product of a sequence of probabilities, computed as a sum of logs so that
+    it stays usable where the product itself would underflow to zero"""
+    if len(probabilities) == 0: return 0.0
+    return float(numpy.sum(log_probs(numpy.asarray(probabilities, dtype=float))))
+
 def crossproduct(vector1, vector2):
     """Returns the crossproduct of two vectors"""
 
@@ -351,6 +1030,12 @@ def crossproduct(vector1, vector2):
 
         return total
 
+def KLD_batch(pathways, policies):
+    """Returns an array of the Kullback-Leibler divergence of each policy in "policies" from the policy that
+    generated "pathways". See KLD() and MDP_Evaluator.KLD(). When this is called repeatedly on the same
+    pathways (e.g. inside a search loop), build an MDP_Evaluator once and call its KLD() method instead."""
+    return MDP_Evaluator(pathways).KLD(policies)
+
 def KLD(pathways, new_pol):
     """
 
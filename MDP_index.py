@@ -0,0 +1,167 @@
+"""
+In-memory columnar index over MDP pathways' metadata
+
+"""
+import numpy
+
+
+#the metadata values given sorted (range) indexes by default. These are all SWM summary values
+INDEX_KEYS = ["Total Pathway Value", "Average Habitat Value", "Suppression Rate", "Average State Value"]
+
+
+class MDP_MetadataIndex:
+    def __init__(self, pathways, keys=INDEX_KEYS, policy_normalizer=None):
+        """Finds pathways by their generation policy, ID number (the seed, for SWM pathways) and metadata
+        values, without scanning their metadata dictionaries.
+
+        Each metadata value in keys is copied into a numpy column, with a sorted order of the column, so
+        that a range query is two binary searches. The generation policies and ID numbers are each hashed
+        to an integer code, with the positions of the pathways holding each code, so that equality queries
+        are a dictionary lookup. query() starts from whichever of its conditions matches the fewest
+        pathways, and checks just those against the others.
+
+        The index holds references to the pathways, not copies, and isn't updated if their metadata
+        changes; build a new index instead.
+
+        Arguements:
+        pathways: a list of MDP_Pathway objects (e.g. from SWMv1_3.convert_to_MDP_pathway()) or an MDP_Dataset
+        keys: the metadata keys to build range indexes for. Pathways whose metadata lacks a key (or was
+          stripped) are never matched by a range on it.
+        policy_normalizer: optional function that returns the canonical form of a policy list or name, so
+          that policies the model treats alike are matched as one (e.g. SWMv1_3.sanitize_policy, which reads
+          'SA' as [20, 0]). It is given lists and strings only. Default=None, which matches lists, tuples
+          and arrays of equal values, and strings exactly.
+        """
+        self.pathways = pathways
+        self.keys = list(keys)
+        self.policy_normalizer = policy_normalizer
+        metadata = [pw.metadata if pw.metadata is not None else {} for pw in pathways]
+
+        #range indexes: each column, its non-missing values in order, and the positions in that order
+        self.columns = {}
+        self.orders = {}
+        self.sorted_values = {}
+        for key in self.keys:
+            column = numpy.array([m.get(key, numpy.nan) for m in metadata], dtype=float)
+            order = numpy.argsort(column, kind="stable")
+            #missing values sort to the end, and are left out of the order
+            order = order[:numpy.count_nonzero(~numpy.isnan(column))]
+            self.columns[key] = column
+            self.orders[key] = order
+            self.sorted_values[key] = column[order]
+
+        #hash indexes
+        id_numbers = [pw.ID_number for pw in pathways]
+        self.id_numbers = numpy.array(id_numbers)
+        self.seed_codes, self.seed_lookup, self.seed_positions = _hash_index(id_numbers)
+        policies = [_policy_key(m.get("Generation Policy", pw.generation_policy_parameters), policy_normalizer)
+                    for m, pw in zip(metadata, pathways)]
+        self.policy_codes, self.policy_lookup, self.policy_positions = _hash_index(policies)
+
+    def __len__(self):
+        return len(self.pathways)
+
+    def query(self, policy=None, seed=None, ranges=None):
+        """Returns the positions (in the indexed list or dataset) of the pathways matching every condition
+        given, in ascending order.
+
+        policy: the generation policy to match, after the index's policy_normalizer. Lists, tuples and
+          arrays match equal values, so [0, 10] matches [0.0, 10.0]. Default=None, for any policy
+        seed: an ID number, or a list of ID numbers, to match. Default=None, for any ID number
+        ranges: a dictionary of metadata key: [low, high], matching low <= value <= high. Either end can
+          be None, to leave that side open. Each key must be one of the index's keys.
+        """
+        conditions = []
+        if policy is not None:
+            code = self.policy_lookup.get(_policy_key(policy, self.policy_normalizer), -1)
+            conditions.append(("policy", code, self._positions(self.policy_positions, [code])))
+        if seed is not None:
+            seeds = list(seed) if isinstance(seed, (list, tuple, numpy.ndarray)) else [seed]
+            #a repeated seed matches its pathways once
+            codes = numpy.unique([self.seed_lookup.get(_hashable(s), -1) for s in seeds])
+            conditions.append(("seed", codes, self._positions(self.seed_positions, codes)))
+        if ranges is not None:
+            for key, bounds in ranges.items():
+                if key not in self.columns:
+                    raise ValueError("There is no range index on " + repr(key) + "; the index has " + str(self.keys))
+                low, high = bounds
+                conditions.append(("range", (key, low, high), self._range_positions(key, low, high)))
+
+        if len(conditions) == 0:
+            return numpy.arange(len(self.pathways))
+
+        #start from the most selective condition, and filter its positions by the others
+        conditions.sort(key=lambda condition: len(condition[2]))
+        positions = conditions[0][2]
+        for kind, value, matched in conditions[1:]:
+            if len(positions) == 0: break
+            if kind == "policy":
+                positions = positions[self.policy_codes[positions] == value]
+            elif kind == "seed":
+                positions = positions[numpy.isin(self.seed_codes[positions], value)]
+            else:
+                key, low, high = value
+                values = self.columns[key][positions]
+                keep = ~numpy.isnan(values)
+                if low is not None: keep &= values >= low
+                if high is not None: keep &= values <= high
+                positions = positions[keep]
+
+        return numpy.sort(positions)
+
+    def ids(self, policy=None, seed=None, ranges=None):
+        """Returns the ID numbers of the pathways matching query()"""
+        return self.id_numbers[self.query(policy, seed, ranges)]
+
+    def select(self, policy=None, seed=None, ranges=None):
+        """Returns a list of the pathways matching query(). These are the indexed pathway objects themselves
+        (for an MDP_Dataset, MDP_ArrayPathways viewing its arrays), so nothing is copied."""
+        return [self.pathways[int(i)] for i in self.query(policy, seed, ranges)]
+
+    def _range_positions(self, key, low, high):
+        values = self.sorted_values[key]
+        start = 0 if low is None else numpy.searchsorted(values, low, "left")
+        stop = len(values) if high is None else numpy.searchsorted(values, high, "right")
+        return self.orders[key][start:max(start, stop)]
+
+    def _positions(self, positions_by_code, codes):
+        found = [positions_by_code[c] for c in codes if c >= 0]
+        if len(found) == 0: return numpy.zeros(0, dtype=numpy.int64)
+        if len(found) == 1: return found[0]
+        return numpy.concatenate(found)
+
+
+
+#################################################################
+# MODULE-LEVEL FUNCTIONS
+#################################################################
+
+def _hash_index(keys):
+    """Returns (codes, lookup, positions) for a list of hashable keys: an array of each key's integer code,
+    a dictionary of key: code, and a list of the (ascending) positions holding each code"""
+    lookup = {}
+    #a new key gets the next code, len(lookup), before it is added
+    codes = numpy.array([lookup.setdefault(_hashable(key), len(lookup)) for key in keys], dtype=numpy.int64)
+
+    order = numpy.argsort(codes, kind="stable")
+    bounds = numpy.concatenate(([0], numpy.cumsum(numpy.bincount(codes, minlength=len(lookup)))))
+    positions = [order[bounds[c]:bounds[c+1]] for c in range(len(lookup))]
+    return codes, lookup, positions
+
+def _hashable(value):
+    """numpy scalars hash like the Python values they hold, but are converted anyway, to keep the keys plain"""
+    if isinstance(value, numpy.generic): return value.item()
+    return value
+
+def _policy_key(policy, normalizer=None):
+    """Returns a policy list (as a tuple of floats) or name, after normalizer if one is given. Anything else
+    (e.g. None, for pathways without a policy) is its own key"""
+    if isinstance(policy, (list, tuple, numpy.ndarray)):
+        policy = list(policy)
+    elif not isinstance(policy, str):
+        return policy
+    if normalizer is not None:
+        policy = normalizer(policy)
+    if isinstance(policy, (list, tuple, numpy.ndarray)):
+        return tuple(map(float, policy))
+    return policy
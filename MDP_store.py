@@ -0,0 +1,253 @@
+"""
+On-disk, memory-mapped storage for MDP pathways
+
+"""
+import os, json, struct, numpy
+import MDP
+
+
+class MDP_PathwayStore:
+    """A directory of pathways, stored column by column so that they can be memory-mapped back.
+
+    Each event field is kept in its own .npy file, with every pathway's events one after the other:
+        states.npy, actions.npy, action_probs.npy, decision_probs.npy, rewards.npy, sequence_indices.npy
+    offsets.npy holds the index of each pathway's first event (plus the total, at the end), and
+    pathways.jsonl holds one line of pathway-level values per pathway: ID Number, net value, generation
+    policy and joint probabilities, and the pathway's metadata dictionary (e.g. a SWM summary, which
+    includes the Generation Policy and model parameters).
+
+    New batches are appended to the end of each file in place, with offsets.npy written last; anything an
+    interrupted append wrote after the pathways it counts is cut off by the next append. load()
+    memory-maps the event files, so an MDP_Dataset larger than memory can be read without deserializing it.
+    """
+
+    event_fields = ["states", "actions", "action_probs", "decision_probs", "rewards", "sequence_indices"]
+
+    def __init__(self, directory):
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        if not os.path.exists(self._path("offsets.npy")): return 0
+        return len(numpy.load(self._path("offsets.npy"), mmap_mode="r")) - 1
+
+    def append(self, pathways):
+        """Adds a batch of pathways to the end of the store.
+
+        pathways: an MDP.MDP_Dataset, a list of MDP_Pathway objects (e.g. from SWMv1_3.convert_to_MDP_pathway()),
+          or a list of SWMv1_3 simulate() results, which are converted with SWMv1_3.convert_to_MDP_dataset()
+        """
+        if len(pathways) == 0: return
+
+        if not isinstance(pathways, MDP.MDP_Dataset):
+            if isinstance(pathways[0], dict):
+                import SWMv1_3
+                pathways = SWMv1_3.convert_to_MDP_dataset(pathways)
+            else:
+                pathways = MDP.convert_pathways_to_MDP_dataset(pathways)
+        dataset = pathways
+
+        #everything is checked before anything is written, so a batch that doesn't fit changes nothing
+        lines = [json.dumps(_pathway_record(pw), default=_json_default) + "\n" for pw in dataset]
+        arrays = dict((field, numpy.ascontiguousarray(getattr(dataset, field))) for field in self.event_fields)
+        self._discard_uncommitted()
+        if os.path.exists(self._path("store.json")):
+            with open(self._path("store.json")) as f:
+                policy_length = json.load(f)["Policy Length"]
+            if policy_length != dataset.policy_length:
+                raise ValueError("Can't append pathways with " + str(dataset.policy_length) + " features to " +
+                                 self.directory + ", which holds pathways with " + str(policy_length))
+        for field in self.event_fields:
+            _check_npy_append(self._path(field + ".npy"), arrays[field])
+
+        #event data goes first, and the offsets last, so that an interrupted append leaves the
+        # store's pathway count (from offsets.npy) pointing only at complete pathways. The rows and
+        # lines after them are discarded by the next append
+        for field in self.event_fields:
+            _append_npy(self._path(field + ".npy"), arrays[field])
+
+        with open(self._path("pathways.jsonl"), "a") as f:
+            f.writelines(lines)
+
+        if os.path.exists(self._path("offsets.npy")):
+            start = int(numpy.load(self._path("offsets.npy"), mmap_mode="r")[-1])
+            _append_npy(self._path("offsets.npy"), start + dataset.offsets[1:])
+        else:
+            _append_npy(self._path("offsets.npy"), dataset.offsets)
+
+        with open(self._path("store.json"), "w") as f:
+            json.dump({"Policy Length": dataset.policy_length, "Pathways": len(self)}, f)
+
+    def load(self, mmap_mode="r"):
+        """Returns the stored pathways as an MDP.MDP_Dataset whose event arrays are memory-mapped
+        from disk. Use mmap_mode=None to read everything into memory instead."""
+        offsets = numpy.load(self._path("offsets.npy"))
+        pathway_count = len(offsets) - 1
+        event_count = int(offsets[-1])
+
+        arrays = {}
+        for field in self.event_fields:
+            arrays[field] = numpy.load(self._path(field + ".npy"), mmap_mode=mmap_mode)[:event_count]
+
+        with open(self._path("store.json")) as f:
+            policy_length = json.load(f)["Policy Length"]
+
+        dataset = MDP.MDP_Dataset(policy_length, numpy.diff(offsets), arrays["states"], arrays["actions"],
+                                  arrays["action_probs"], arrays["decision_probs"], arrays["rewards"],
+                                  arrays["sequence_indices"])
+
+        with open(self._path("pathways.jsonl")) as f:
+            for pw, line in zip(dataset, f):
+                for attr, value in json.loads(line).items():
+                    setattr(pw, attr, value)
+
+        return dataset
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _discard_uncommitted(self):
+        """Cuts the event files and pathways.jsonl back to the pathways that offsets.npy counts, removing
+        whatever an interrupted append wrote after them"""
+        if not os.path.exists(self._path("offsets.npy")):
+            #an interrupted first append: nothing was committed
+            for filename in [field + ".npy" for field in self.event_fields] + ["pathways.jsonl", "store.json"]:
+                if os.path.exists(self._path(filename)):
+                    os.remove(self._path(filename))
+            return
+
+        _truncate_npy(self._path("offsets.npy"))
+        offsets = numpy.load(self._path("offsets.npy"), mmap_mode="r")
+        pathway_count = len(offsets) - 1
+        event_count = int(offsets[-1])
+        del offsets
+        for field in self.event_fields:
+            _truncate_npy(self._path(field + ".npy"), event_count)
+
+        with open(self._path("pathways.jsonl"), "r+b") as f:
+            f.truncate(sum(len(line) for k, line in zip(range(pathway_count), f)))
+
+
+
+#################################################################
+# MODULE-LEVEL FUNCTIONS
+#################################################################
+
+#the MDP_ArrayPathway attributes that are saved in pathways.jsonl
+_pathway_attributes = ["ID_number", "net_value", "generation_policy_parameters", "generation_joint_prob",
+                       "generation_log_joint_prob", "actions_0_taken", "actions_1_taken", "discount_rate",
+                       "metadata"]
+
+def _pathway_record(pw):
+    return dict((attr, getattr(pw, attr)) for attr in _pathway_attributes)
+
+def _json_default(value):
+    """Converts the numpy values found in pathway metadata into plain JSON values"""
+    if isinstance(value, numpy.ndarray): return value.tolist()
+    if isinstance(value, numpy.generic): return value.item()
+    raise TypeError("Can't store a " + type(value).__name__ + " in pathway metadata")
+
+#the length, in bytes, of the .npy headers written by _append_npy(). This is far more than the shape of
+# any array needs, so the header can always be rewritten in place
+NPY_HEADER_LENGTH = 256
+
+#rows are copied this many at a time when a file has to be rewritten
+_COPY_ROWS = 1 << 16
+
+def _append_npy(path, array):
+    """Appends rows to a .npy file along its first axis, creating the file if needed.
+
+    New files are written with a header padded to NPY_HEADER_LENGTH bytes, which leaves room for the
+    first axis to grow to any size, so an append only writes the new rows and rewrites the header in place.
+    A file whose header has no room left (e.g. one written by numpy.save) is copied once into a new
+    file with a padded header, streaming the old rows from a memory map rather than loading them.
+    """
+    array = numpy.ascontiguousarray(array)
+    if not os.path.exists(path):
+        _write_npy(path, array)
+        return
+
+    _check_npy_append(path, array)
+    with open(path, "r+b") as f:
+        version, shape, fortran_order, dtype = _read_npy_header(f)
+        header_length = f.tell()
+
+        new_shape = (shape[0] + array.shape[0],) + tuple(shape[1:])
+        header = _npy_header(dtype, new_shape, header_length)
+        if (version == (1, 0)) and (header is not None):
+            #the data goes first, so an interrupted append leaves the old row count in the header
+            f.seek(header_length + shape[0] * dtype.itemsize * int(numpy.prod(shape[1:])))
+            f.write(array.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(header)
+            return
+
+    existing = numpy.load(path, mmap_mode="r")
+    _write_npy(path + ".tmp", array, existing)
+    del existing
+    os.replace(path + ".tmp", path)
+
+def _check_npy_append(path, array):
+    """Raises a ValueError if array's rows can't be appended to the .npy file at path (if there is one)"""
+    if not os.path.exists(path): return
+    with open(path, "rb") as f:
+        version, shape, fortran_order, dtype = _read_npy_header(f)
+    if (dtype != array.dtype) or (tuple(shape[1:]) != array.shape[1:]) or fortran_order:
+        raise ValueError("Can't append a " + str(array.dtype) + " array of shape " + str(array.shape) +
+                         " to " + path + ", which holds " + str(dtype) + " rows of shape " + str(shape[1:]))
+
+def _read_npy_header(f):
+    """Returns the (version, shape, fortran_order, dtype) of an open .npy file, leaving it at the data"""
+    version = numpy.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = numpy.lib.format.read_array_header_2_0(f)
+    return version, shape, fortran_order, dtype
+
+def _truncate_npy(path, rows=None):
+    """Cuts a .npy file back to its first rows rows (by default, the rows its header counts), dropping
+    any bytes after them"""
+    with open(path, "r+b") as f:
+        version, shape, fortran_order, dtype = _read_npy_header(f)
+        header_length = f.tell()
+        rows = shape[0] if rows is None else min(rows, shape[0])
+        new_shape = (rows,) + tuple(shape[1:])
+        header = _npy_header(dtype, new_shape, header_length)
+        if (version == (1, 0)) and (header is not None) and not fortran_order:
+            #the header first, so an interrupted cut never counts rows that are gone
+            f.seek(0)
+            f.write(header)
+            f.truncate(header_length + rows * dtype.itemsize * int(numpy.prod(shape[1:])))
+            return
+        if rows == shape[0]: return
+
+    existing = numpy.load(path, mmap_mode="r")
+    _write_npy(path + ".tmp", numpy.ascontiguousarray(existing[rows:rows]), existing[:rows])
+    del existing
+    os.replace(path + ".tmp", path)
+
+def _npy_header(dtype, shape, header_length=None):
+    """Returns a version 1.0 .npy header for a C-ordered array, padded with spaces to header_length bytes
+    (by default, NPY_HEADER_LENGTH or more), or None if the header won't fit in header_length"""
+    text = repr({"descr": numpy.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": tuple(shape)})
+    #the magic string and version take 8 bytes, the header length 2, and the header ends with a newline
+    minimum = 10 + len(text) + 1
+    if header_length is None:
+        header_length = max(NPY_HEADER_LENGTH, 64 * ((minimum + 64 + 63) // 64))
+    if (minimum > header_length) or (header_length - 10 > 65535):
+        return None
+    text = text + " " * (header_length - minimum) + "\n"
+    return numpy.lib.format.magic(1, 0) + struct.pack("<H", len(text)) + text.encode("latin1")
+
+def _write_npy(path, array, existing=None):
+    """Writes array (after the rows of existing, if given) to a new .npy file with a padded header"""
+    rows = array.shape[0] + (0 if existing is None else existing.shape[0])
+    with open(path, "wb") as f:
+        f.write(_npy_header(array.dtype, (rows,) + array.shape[1:]))
+        if existing is not None:
+            for start in range(0, existing.shape[0], _COPY_ROWS):
+                f.write(numpy.ascontiguousarray(existing[start:start + _COPY_ROWS]).tobytes())
+        f.write(array.tobytes())
@@ -0,0 +1,242 @@
+"""Offline benchmarks for SWMv1_3 and MDP, with a JSON baseline to catch performance regressions
+
+Run from the command line:
+    python SWM_benchmark.py --save baseline.json        (record a baseline)
+    python SWM_benchmark.py --compare baseline.json     (flag regressions against it; exits 1 if any)
+"""
+
+import argparse, gc, json, platform, sys, time, tracemalloc, numpy
+import SWMv1_3 as SWM
+import MDP
+
+
+#each timed run of a case lasts at least this long
+MINIMUM_RUN_SECONDS = 0.05
+
+#compare() never counts a slowdown smaller than this fraction, on top of its tolerance, as a regression
+NOISE_FLOOR = 0.05
+
+
+def benchmark_cases(QUICK=False):
+    """Returns a list of (name, setup) pairs. Each setup() builds its inputs and returns (run, steps), where
+    run() is the timed work and steps is how many timesteps or events it handles. With QUICK, the largest
+    cases are left out."""
+    cases = []
+    for timesteps in [50, 500, 10000]:
+        if QUICK and timesteps > 500: continue
+        for mode in ["False", "True"]:
+            name = "simulate " + str(timesteps) + (" probabilistic" if mode == "True" else " deterministic")
+            cases.append((name, _simulate_case(timesteps, {"Probabilistic Choices": mode})))
+
+    event_counts = [1000, 10000] if QUICK else [1000, 10000, 100000]
+    cases.append(("convert_to_MDP_pathway", _convert_case(event_counts[-1])))
+    cases.append(("update_net_value", _net_value_case(event_counts[-1])))
+    for events in event_counts:
+        cases.append(("calc_action_prob " + str(events), _action_prob_case(events)))
+        cases.append(("KLD " + str(events), _KLD_case(events)))
+    return cases
+
+
+def run_benchmarks(QUICK=False, repeats=5, SILENT=False):
+    """Runs every benchmark case and returns a dictionary of their results, keyed by case name. See measure()"""
+    results = {}
+    for name, setup in benchmark_cases(QUICK):
+        run, steps = setup()
+        results[name] = measure(run, steps, repeats)
+        if not SILENT:
+            print(name.ljust(36) + str(int(results[name]["Steps per Second"])).rjust(12) + " steps/s" +
+                  str(round(100 * _spread(results[name]), 1)).rjust(7) + "% spread" +
+                  str(results[name]["Peak Memory"] // 1024).rjust(10) + " KiB peak" +
+                  str(round(results[name]["Retained Blocks per Step"], 2)).rjust(10) + " retained blocks/step")
+    return results
+
+
+def measure(run, steps, repeats=5):
+    """Times run() repeats times (looping short runs for at least MINIMUM_RUN_SECONDS), then runs it once
+    more under tracemalloc.
+
+    The fastest run is reported, since slower runs mostly measure whatever else the machine was doing, along
+    with the median, whose distance from the fastest shows how noisy the timing was.
+
+    RETURNS
+    -------
+    A dictionary holding the "Steps", the fastest "Seconds", the "Median Seconds", the number of "Repeats",
+    "Steps per Second" (at the fastest run), "Peak Memory" (the most memory tracemalloc saw allocated at once
+    during the run, in bytes) and "Retained Blocks per Step" (the memory blocks allocated during the run that
+    were still held when it finished, including its return value, per step). Blocks that the run allocates
+    and frees again aren't counted; their cost shows up in the time.
+    """
+    #small cases are looped, so that each timed run is long enough for the clock to be meaningful
+    start = time.perf_counter()
+    run()
+    loops = max(1, int(MINIMUM_RUN_SECONDS / max(time.perf_counter() - start, 1e-9)))
+
+    times = []
+    for r in range(max(1, repeats)):
+        gc.collect()
+        start = time.perf_counter()
+        for l in range(loops):
+            run()
+        times.append((time.perf_counter() - start) / loops)
+    seconds = min(times)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    output = run()
+    current, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, "filename"))
+    del output
+
+    return {
+            "Steps": steps,
+            "Seconds": seconds,
+            "Median Seconds": float(numpy.median(times)),
+            "Repeats": len(times),
+            "Steps per Second": steps / seconds if seconds > 0 else float("inf"),
+            "Peak Memory": peak,
+            "Retained Blocks per Step": max(0, blocks) / float(steps)
+           }
+
+
+def save_baseline(baseline_file, results):
+    """Writes benchmark results, with a description of the machine and library versions, to a JSON file"""
+    with open(baseline_file, "w") as f:
+        json.dump({"Environment": _environment(), "Results": results}, f, indent=1, sort_keys=True)
+
+
+def load_baseline(baseline_file):
+    """Returns the benchmark results saved by save_baseline()"""
+    with open(baseline_file) as f:
+        return json.load(f)["Results"]
+
+
+def compare(results, baseline, tolerance=0.2, noise_floor=NOISE_FLOOR):
+    """Returns a list of regression messages: one for each case whose steps per second fell, or whose
+    peak memory or retained blocks per step rose, by more than tolerance (a fraction) against the baseline.
+    Cases missing from either side are skipped, as are values that one side didn't record.
+
+    Timings are compared fastest run to fastest run. On top of tolerance, a slowdown has to exceed the noise
+    of the two timings: the larger of their spreads (how far each median was from its fastest run), or
+    noise_floor (a fraction), whichever is larger. So a single noisy run on either side can't flag a case.
+    """
+    regressions = []
+    for name in sorted(results):
+        if name not in baseline: continue
+        new = results[name]
+        old = baseline[name]
+        noise = max(noise_floor, _spread(new), _spread(old))
+        if new["Seconds"] > old["Seconds"] * (1 + tolerance + noise):
+            regressions.append(name + ": " + _change(old["Steps per Second"], new["Steps per Second"]) +
+                               " steps per second (noise " + str(round(100 * noise, 1)) + "%)")
+        if new["Peak Memory"] > old["Peak Memory"] * (1 + tolerance):
+            regressions.append(name + ": " + _change(old["Peak Memory"], new["Peak Memory"]) + " peak memory")
+        #a fraction of a block per step is noise, so allow for at least one block either way
+        if "Retained Blocks per Step" in old and \
+                new["Retained Blocks per Step"] > old["Retained Blocks per Step"] * (1 + tolerance) + 1:
+            regressions.append(name + ": " + _change(old["Retained Blocks per Step"], new["Retained Blocks per Step"]) +
+                               " retained blocks per step")
+    return regressions
+
+
+def _spread(result):
+    """The fractional distance from a result's fastest run to its median run"""
+    if result.get("Median Seconds") is None or result["Seconds"] <= 0: return 0.0
+    return result["Median Seconds"] / result["Seconds"] - 1
+
+
+def _change(old, new):
+    if old == 0: return str(old) + " -> " + str(new)
+    return str(round(100.0 * (new - old) / old, 1)) + "%"
+
+
+def _environment():
+    return {
+            "Python": platform.python_version(),
+            "numpy": numpy.__version__,
+            "Machine": platform.machine(),
+            "Processor": platform.processor(),
+            "Platform": platform.platform()
+           }
+
+
+def _simulate_case(timesteps, model_parameters):
+    def setup():
+        def run():
+            return SWM.simulate(timesteps, [0, 10, -0.5], 0, model_parameters, SILENT=True)
+        return run, timesteps
+    return setup
+
+
+def _pathways(events, timesteps=500):
+    """Simulated pathways with about the given number of events in total"""
+    count = max(1, events // timesteps)
+    results = SWM.simulate_batch(timesteps, [0, 10], list(range(count)), {"Probabilistic Choices": "True"})
+    return results
+
+
+def _convert_case(events):
+    def setup():
+        pathways = _pathways(events)
+        def run():
+            #convert_to_MDP_pathway() pops each pathway's States, so convert shallow copies
+            return [SWM.convert_to_MDP_pathway(dict(pw)) for pw in pathways]
+        return run, sum(pw["Timesteps"] for pw in pathways)
+    return setup
+
+
+def _MDP_pathways(events):
+    return [SWM.convert_to_MDP_pathway(pw) for pw in _pathways(events)]
+
+
+def _net_value_case(events):
+    def setup():
+        pathways = _MDP_pathways(events)
+        def run():
+            for pw in pathways:
+                pw.update_net_value()
+        return run, sum(len(pw.events) for pw in pathways)
+    return setup
+
+
+def _action_prob_case(events):
+    def setup():
+        pathways = _MDP_pathways(events)
+        policy = MDP.MDP_Policy(2)
+        policy.set_params([0.5, 2.0])
+        def run():
+            return [policy.calc_action_prob(e) for pw in pathways for e in pw.events]
+        return run, sum(len(pw.events) for pw in pathways)
+    return setup
+
+
+def _KLD_case(events):
+    def setup():
+        pathways = _MDP_pathways(events)
+        def run():
+            return MDP.KLD(pathways, [0.5, 2.0])
+        return run, sum(len(pw.events) for pw in pathways)
+    return setup
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks for SWMv1_3 and MDP")
+    parser.add_argument("--save", help="write the results to this JSON baseline file")
+    parser.add_argument("--compare", help="flag regressions against this JSON baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="the fractional change counted as a regression")
+    parser.add_argument("--repeats", type=int, default=5, help="timed runs per case; the fastest is kept")
+    parser.add_argument("--quick", action="store_true", help="leave out the largest cases")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.quick, args.repeats)
+    if args.save:
+        save_baseline(args.save, results)
+    if args.compare:
+        regressions = compare(results, load_baseline(args.compare), args.tolerance)
+        for r in regressions:
+            print("REGRESSION " + r)
+        if regressions: sys.exit(1)
+        print("No regressions")
@@ -0,0 +1,150 @@
+"""Result cache for SWM v1.3's simulate(), with an in-memory LRU tier and an optional on-disk tier"""
+
+import collections, hashlib, json, os, numpy
+import SWMv1_3 as SWM
+
+
+class SimulationCache:
+    """Memoizes SWM.simulate(), which is fully deterministic given its random seed.
+
+    Pathways are cached by a canonical hash of the sanitized policy, the seed, the model_parameters
+    dictionary and SWM.MODEL_VERSION. The number of timesteps is not part of the key: since a pathway's
+    first t steps do not depend on how many steps follow them, a request for t timesteps is served from
+    the prefix of any cached pathway that is at least that long.
+
+    The states of recently used pathways are kept in memory, up to max_entries of them. If a directory is
+    given, every simulated pathway is also written there, and the least recently used files are deleted
+    whenever the directory grows past max_disk_bytes.
+    """
+
+    def __init__(self, max_entries=256, directory=None, max_disk_bytes=1<<30):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if (directory is not None) and (not os.path.isdir(directory)):
+            os.makedirs(directory)
+
+        self.memory = collections.OrderedDict()
+        self.hits = 0
+        self.prefix_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def simulate(self, timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT=False, COLUMNAR=False):
+        """Same as SWM.simulate(), but served from the cache when possible. A random_seed of None is
+        never cached, since the pathway can't be reproduced."""
+        timesteps = int(timesteps)
+        if random_seed is None:
+            return SWM.simulate(timesteps, policy, random_seed, model_parameters, SILENT=SILENT, COLUMNAR=COLUMNAR)
+
+        key = self.key(policy, random_seed, model_parameters)
+        columns = self._lookup(key, timesteps)
+        if columns is None:
+            self.misses += 1
+            result = SWM.simulate(timesteps, policy, random_seed, model_parameters, SILENT=True, COLUMNAR=True)
+            columns = result["States"]
+            self._store(key, columns)
+
+        columns = columns.prefix(timesteps)
+        summary = SWM._summarize_columns(columns, random_seed, policy, SWM._parse_model_parameters(model_parameters))
+
+        if not SILENT:
+            SWM._print_summary(summary, columns.reward, columns.habitat)
+
+        #copies, so that callers can modify the states (or pop them, like convert_to_MDP_pathway()) freely
+        if COLUMNAR:
+            summary["States"] = SWM.PathwayStates(columns=dict((f, getattr(columns, f).copy()) for f in columns.fields))
+        else:
+            summary["States"] = columns.to_list()
+
+        return summary
+
+    def key(self, policy, random_seed, model_parameters):
+        """Returns the canonical hash identifying a pathway, regardless of its length"""
+        canonical = json.dumps({
+                                "Policy": [float(b) for b in SWM.sanitize_policy(policy)],
+                                "Seed": [type(random_seed).__name__, repr(random_seed)],
+                                "Model Parameters": model_parameters,
+                                "Model Version": SWM.MODEL_VERSION
+                               }, sort_keys=True, default=repr)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def stats(self):
+        """Returns the cache's hit and miss counts. "Hits" includes prefix and disk hits."""
+        return {
+                "Hits": self.hits,
+                "Prefix Hits": self.prefix_hits,
+                "Disk Hits": self.disk_hits,
+                "Misses": self.misses,
+                "Memory Entries": len(self.memory)
+               }
+
+    def clear(self):
+        """Empties the in-memory tier (but not the on-disk tier) and resets the counters"""
+        self.memory.clear()
+        self.hits = self.prefix_hits = self.disk_hits = self.misses = 0
+
+    def _lookup(self, key, timesteps):
+        """Returns the cached PathwayStates for key if it has at least timesteps states, or None"""
+        columns = self.memory.get(key)
+        from_disk = False
+        if (columns is None or len(columns) < timesteps) and self.directory is not None:
+            disk_columns = self._read(key)
+            if disk_columns is not None and (columns is None or len(disk_columns) > len(columns)):
+                columns = disk_columns
+                from_disk = True
+
+        if columns is None or len(columns) < timesteps:
+            return None
+
+        self.hits += 1
+        if len(columns) > timesteps: self.prefix_hits += 1
+        if from_disk:
+            self.disk_hits += 1
+            self._remember(key, columns)
+        else:
+            self.memory.move_to_end(key)
+        return columns
+
+    def _store(self, key, columns):
+        self._remember(key, columns)
+        if self.directory is not None:
+            self._write(key, columns)
+
+    def _remember(self, key, columns):
+        self.memory[key] = columns
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".npz")
+
+    def _read(self, key):
+        path = self._path(key)
+        if not os.path.exists(path): return None
+        with numpy.load(path) as f:
+            columns = SWM.PathwayStates(columns=dict((name, f[name]) for name in f.files))
+        #mark the file as recently used, for eviction
+        os.utime(path, None)
+        return columns
+
+    def _write(self, key, columns):
+        tmp_path = self._path(key) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            numpy.savez(f, **dict((name, getattr(columns, name)) for name in columns.fields))
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used files until the directory fits in max_disk_bytes"""
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".npz"):
+                stat = os.stat(os.path.join(self.directory, name))
+                files.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for mtime, size, name in files)
+        for mtime, size, name in sorted(files):
+            if total <= self.max_disk_bytes: break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
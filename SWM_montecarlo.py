@@ -0,0 +1,325 @@
+"""Sequential Monte Carlo estimation of SWM v1.3 policy values, stopping once the estimates are precise enough"""
+
+import math, time, numpy, scipy.stats, scipy.stats.qmc
+import SWMv1_3 as SWM
+
+
+#the summary values estimated for each policy
+MONTE_CARLO_METRICS = ["Total Pathway Value", "Average Habitat Value", "Suppression Rate"]
+
+#the ways of drawing pathways' random numbers, and how many pathways each of their groups holds by default.
+# See sampling_tapes()
+SAMPLING_MODES = {"plain": 1, "antithetic": 2, "sobol": 32, "halton": 32, "stratified": 32}
+
+
+class OnlineEstimate:
+    """The running count, mean and sum of squared deviations of one value, merged a batch at a time
+    (with Chan et al.'s pairwise update), and the confidence interval of its mean"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+
+    def update(self, values):
+        values = numpy.asarray(values, dtype=float)
+        if len(values) == 0: return
+        mean = float(values.mean())
+        M2 = float(((values - mean)**2).sum())
+        count = self.count + len(values)
+        delta = mean - self.mean
+        self.M2 += M2 + delta**2 * (float(self.count) * len(values) / count)
+        self.mean += delta * (float(len(values)) / count)
+        self.count = count
+
+    def std(self):
+        """The sample standard deviation"""
+        if self.count < 2: return float("inf")
+        return math.sqrt(self.M2 / (self.count - 1))
+
+    def half_width(self, confidence=0.95):
+        """The half-width of the t confidence interval of the mean"""
+        if self.count < 2: return float("inf")
+        return float(scipy.stats.t.ppf(0.5 + confidence/2.0, self.count - 1)) * self.std() / math.sqrt(self.count)
+
+    def report(self, confidence=0.95):
+        return {"Mean": self.mean, "STD": self.std(), "Half Width": self.half_width(confidence), "Samples": self.count}
+
+
+def sampling_tapes(timesteps, sampling="plain", group_size=None, group_seed=0):
+    """Returns one group of EventTapes, drawn with one of the SAMPLING_MODES.
+
+    The pathways within a group are drawn together, so they aren't independent of each other, but every
+    group is independent of every other and its mean is an unbiased estimate of the mean over plain random
+    pathways. Estimates should therefore be built from group means, and their confidence intervals from the
+    spread between groups.
+
+        "plain":      one pathway per group, drawn from seed group_seed exactly as simulate() would.
+        "antithetic": the plain pathway for group_seed, paired with its mirror image, where every draw u
+                      is replaced by 1 - u (so a severe fire in one is a mild fire in the other).
+        "sobol":      group_size points of a scrambled Sobol' sequence over all of a pathway's draws (its
+                      three starting draws, then an event draw and a choice roll per timestep).
+                      group_size must be a power of two, and timesteps at most 10599.
+        "halton":     as "sobol", with a scrambled Halton sequence.
+        "stratified": a Latin hypercube: each of the group's pathways falls in a different one of
+                      group_size equal strata of every draw.
+
+    The scrambling of each QMC or stratified group is seeded with group_seed.
+
+    PARAMETERS
+    ----------
+    timesteps: integer; the length of the tapes.
+
+    sampling: one of SAMPLING_MODES. Default="plain"
+
+    group_size: integer; the number of pathways in each QMC or stratified group. Default=None, which uses
+         the mode's entry in SAMPLING_MODES. Plain and antithetic groups always hold 1 and 2 pathways.
+
+    group_seed: integer; which group to draw.
+
+
+    RETURNS
+    -------
+    A list of EventTapes, to replay with SWM.simulate_parallel() (or any of the simulate functions)
+    """
+    size = _group_size(sampling, group_size)
+    timesteps = int(timesteps)
+    if sampling == "plain":
+        return [SWM.EventTape(timesteps, group_seed)]
+    if sampling == "antithetic":
+        tape = SWM.EventTape(timesteps, group_seed)
+        mirror = SWM.EventTape(timesteps, group_seed, starts=1.0 - tape.starts, ev=1.0 - tape.ev,
+                               choice_roll=1.0 - tape.choice_roll)
+        return [tape, mirror]
+
+    dimensions = 3 + 2*timesteps
+    if sampling == "sobol":
+        sampler = scipy.stats.qmc.Sobol(d=dimensions, scramble=True, seed=group_seed)
+    elif sampling == "halton":
+        sampler = scipy.stats.qmc.Halton(d=dimensions, scramble=True, seed=group_seed)
+    else:
+        sampler = scipy.stats.qmc.LatinHypercube(d=dimensions, seed=group_seed)
+    unit = sampler.random(size)
+
+    #the pathways are labeled by their position in the whole sequence of groups
+    return [SWM.EventTape(timesteps, group_seed*size + k, starts=unit[k,:3], ev=unit[k,3::2], choice_roll=unit[k,4::2])
+            for k in range(size)]
+
+
+def adaptive_monte_carlo(timesteps=200, policies=["LB", "SA", "CT"], model_parameters={}, half_widths={"Total Pathway Value": 25.0},
+                         confidence=0.95, batch_size=32, max_seeds=10000, start_seed=0, workers=None, sampling="plain",
+                         group_size=None, SILENT=False):
+    """Estimates each policy's mean pathway values, simulating more seeds only for the policies that need them.
+
+    Every round, each policy that hasn't stopped yet gets a new batch of seeds, and all of the round's pathways
+    run together through SWM.simulate_parallel(). After each round, a policy stops as soon as every metric in
+    half_widths has a confidence interval no wider than its target (Stopped="Converged"), or once it has used
+    max_seeds seeds (Stopped="Budget"). The next batch for a policy is sized from its current variance, to
+    about the number of seeds it looks like it still needs (but at least batch_size, and at most as many
+    again as it has already used, since early variance estimates are rough).
+
+    All policies use the same seeds (start_seed, start_seed + 1, ...), so that comparisons between them
+    share their random fires.
+
+    With a sampling mode other than "plain", each seed draws a whole group of pathways (see sampling_tapes()),
+    the estimates are built from the group means, and batches are rounded up to whole groups.
+
+    PARAMETERS
+    ----------
+    timesteps: integer; the length of each pathway.
+
+    policies: a list of policies, each anything SWM.sanitize_policy() accepts.
+
+    model_parameters: see SWM.simulate()
+
+    half_widths: dictionary of the target confidence interval half-width of any of MONTE_CARLO_METRICS.
+         Metrics that aren't given are estimated, but don't affect when a policy stops.
+
+    confidence: the coverage of the confidence intervals. Default=0.95
+
+    batch_size: integer; the smallest batch of pathways, and the size of every policy's first batch.
+
+    max_seeds: integer; the most pathways any one policy may use.
+
+    workers: integer; the number of worker processes. See SWM.simulate_parallel()
+
+    sampling, group_size: how the pathways' random numbers are drawn. See sampling_tapes(). Default="plain"
+
+    SILENT: boolean; Should the runner suppress its progress reports to standard out. Default=False
+
+
+    RETURNS
+    -------
+    A list with one dictionary per policy (in the same order) holding its "Policy", the "Seeds" (pathways) it
+    used, the "Groups" they were drawn in, the "Seconds" spent simulating them (each round's time, shared
+    between the policies in proportion to their pathways in it), the wall-clock "Elapsed Seconds" from the
+    start of the run until it stopped, why it "Stopped", and for
+    each of MONTE_CARLO_METRICS, a dictionary of its "Mean", "STD" (of the group means), "Half Width" and
+    "Samples" (groups).
+    """
+    for metric in half_widths:
+        if metric not in MONTE_CARLO_METRICS:
+            raise ValueError("Can't target the half-width of " + repr(metric) + "; use one of " + str(MONTE_CARLO_METRICS))
+    size = _group_size(sampling, group_size)
+    #at least two groups are needed to estimate the spread between them
+    batch_groups = max(2, int(math.ceil(batch_size / float(size))))
+    max_groups = max(2, max_seeds // size)
+
+    start_time = time.time()
+    states = [{"Policy": policy, "Groups": 0, "Next Batch": batch_groups, "Stopped": None, "Seconds": 0.0,
+               "Elapsed Seconds": 0.0, "Estimates": dict((m, OnlineEstimate()) for m in MONTE_CARLO_METRICS)} for policy in policies]
+
+    round_number = 0
+    while True:
+        active = [s for s in states if s["Stopped"] is None]
+        if len(active) == 0: break
+
+        job_policies = []
+        job_tapes = []
+        for s in active:
+            count = min(s["Next Batch"], max_groups - s["Groups"])
+            for g in range(start_seed + s["Groups"], start_seed + s["Groups"] + count):
+                job_tapes.extend(sampling_tapes(timesteps, sampling, size, g))
+            job_policies.extend([s["Policy"]] * (count * size))
+            s["Batch"] = count
+        round_start = time.time()
+        results = SWM.simulate_parallel(timesteps, job_policies, None, model_parameters, workers=workers, tapes=job_tapes)
+        round_seconds = time.time() - round_start
+
+        position = 0
+        for s in active:
+            batch = results[position:position + s["Batch"]*size]
+            position += s["Batch"]*size
+            s["Groups"] += s["Batch"]
+            #the policies' pathways all ran together, so each is charged its share of the round
+            s["Seconds"] += round_seconds * len(batch) / float(len(results))
+            for m in MONTE_CARLO_METRICS:
+                s["Estimates"][m].update(_group_means([r[m] for r in batch], size))
+            _check_stop(s, half_widths, confidence, batch_groups, max_groups)
+            if s["Stopped"] is not None:
+                s["Elapsed Seconds"] = time.time() - start_time
+
+        round_number += 1
+        if not SILENT:
+            print("Round " + str(round_number) + ": " + str(len(job_tapes)) + " pathways, " +
+                  str(len([s for s in states if s["Stopped"] is None])) + " of " + str(len(states)) + " policies still running")
+
+    reports = []
+    for s in states:
+        report = {"Policy": s["Policy"], "Seeds": s["Groups"] * size, "Groups": s["Groups"], "Seconds": s["Seconds"],
+                  "Elapsed Seconds": s["Elapsed Seconds"], "Stopped": s["Stopped"]}
+        for m in MONTE_CARLO_METRICS:
+            report[m] = s["Estimates"][m].report(confidence)
+        reports.append(report)
+
+        if not SILENT:
+            tpv = report["Total Pathway Value"]
+            print(str(report["Policy"]).ljust(16) + str(round(tpv["Mean"], 2)).rjust(12) + " +/- " +
+                  str(round(tpv["Half Width"], 2)).ljust(10) + str(report["Seeds"]).rjust(8) + " seeds " +
+                  str(round(report["Seconds"], 2)).rjust(8) + "s  " + report["Stopped"])
+
+    return reports
+
+
+def compare_sampling(timesteps=200, policy="CT", pathways=512, model_parameters={}, modes=None, group_size=None,
+                     start_seed=0, confidence=0.95, workers=None, SILENT=False):
+    """Estimates one policy's mean values with each sampling mode, from the same number of pathways, and
+    measures how much each mode reduces the variance of the estimates compared to plain Monte Carlo.
+
+    PARAMETERS
+    ----------
+    pathways: integer; the number of pathways per mode, rounded down to whole groups.
+
+    modes: a list of SAMPLING_MODES to compare. Default=None, which compares all of them. "plain" is always
+         included, as the reference.
+
+    The other arguements are as in adaptive_monte_carlo()
+
+
+    RETURNS
+    -------
+    A dictionary holding, for each mode, its "Pathways", "Groups" and "Seconds", and for each of
+    MONTE_CARLO_METRICS, a dictionary of its "Mean", "Half Width", "Variance" (the estimated variance of the
+    mean), and "Gain": the plain variance divided by the mode's. A gain of 4 means plain Monte Carlo would
+    need about four times as many pathways for the same precision.
+    """
+    if modes is None: modes = sorted(SAMPLING_MODES)
+    modes = ["plain"] + [m for m in modes if m != "plain"]
+
+    results = {}
+    for mode in modes:
+        start_time = time.time()
+        size = _group_size(mode, group_size)
+        groups = max(2, pathways // size)
+        tapes = []
+        for g in range(start_seed, start_seed + groups):
+            tapes.extend(sampling_tapes(timesteps, mode, size, g))
+        summaries = SWM.simulate_parallel(timesteps, policy, None, model_parameters, workers=workers, tapes=tapes)
+
+        results[mode] = {"Pathways": len(tapes), "Groups": groups}
+        for m in MONTE_CARLO_METRICS:
+            estimate = OnlineEstimate()
+            estimate.update(_group_means([r[m] for r in summaries], size))
+            variance = estimate.std()**2 / estimate.count
+            plain = results["plain"][m]["Variance"] if mode != "plain" else variance
+            results[mode][m] = {"Mean": estimate.mean, "Half Width": estimate.half_width(confidence),
+                                "Variance": variance, "Gain": _gain(plain, variance)}
+        results[mode]["Seconds"] = time.time() - start_time
+
+    if not SILENT:
+        print("Sampling      " + "".join((m + " (gain)").rjust(32) for m in MONTE_CARLO_METRICS))
+        for mode in modes:
+            print(mode.ljust(14) + "".join((str(round(results[mode][m]["Mean"], 2)) + " +/- " +
+                                            str(round(results[mode][m]["Half Width"], 2)) + " (" +
+                                            str(round(results[mode][m]["Gain"], 1)) + ")").rjust(32)
+                                           for m in MONTE_CARLO_METRICS))
+
+    return results
+
+
+def _group_size(sampling, group_size):
+    """Returns the number of pathways in each group of a sampling mode"""
+    if sampling not in SAMPLING_MODES:
+        raise ValueError("Unknown sampling mode " + repr(sampling) + "; use one of " + str(sorted(SAMPLING_MODES)))
+    if sampling in ("plain", "antithetic") or group_size is None:
+        return SAMPLING_MODES[sampling]
+    group_size = int(group_size)
+    if group_size < 1 or (sampling == "sobol" and group_size & (group_size - 1) != 0):
+        raise ValueError("Sobol' groups need a power of two pathways, not " + str(group_size))
+    return group_size
+
+
+def _gain(plain, variance):
+    """plain / variance, treating variances within rounding error of zero as zero"""
+    if plain <= 0 and variance <= 0: return 1.0
+    if variance <= 1e-12 * plain: return float("inf")
+    if plain <= 1e-12 * variance: return 0.0 if variance > 0 else 1.0
+    return plain / variance
+
+
+def _group_means(values, size):
+    """The mean of each consecutive group of size values"""
+    return numpy.asarray(values, dtype=float).reshape(-1, size).mean(axis=1)
+
+
+def _check_stop(s, half_widths, confidence, batch_size, max_groups):
+    """Marks a policy as stopped if its targets or its budget are reached, and otherwise sizes its next batch
+    (all in groups)"""
+    needed = 0
+    for metric, target in half_widths.items():
+        estimate = s["Estimates"][metric]
+        if estimate.count < 2:
+            needed = max(needed, 2 - estimate.count)
+        elif estimate.half_width(confidence) > target:
+            #groups needed for the half-width to shrink to the target, at the current standard deviation
+            z = scipy.stats.norm.ppf(0.5 + confidence/2.0)
+            needed = max(needed, int(math.ceil((z * estimate.std() / target)**2)) - estimate.count)
+            needed = max(needed, 1)
+
+    if needed == 0:
+        s["Stopped"] = "Converged"
+    elif s["Groups"] >= max_groups:
+        s["Stopped"] = "Budget"
+    else:
+        s["Next Batch"] = min(max(batch_size, needed), s["Groups"], max_groups - s["Groups"])
+        s["Next Batch"] = max(s["Next Batch"], 1)
@@ -0,0 +1,157 @@
+"""Policy-gradient optimizer for SWM v1.3's two-weight logistic suppression policy"""
+
+import json, os, time, numpy
+import concurrent.futures
+import SWMv1_3 as SWM
+
+
+def policy_gradient(timesteps=200, start_policy=[0,0], iterations=50, rollouts=64, learning_rate=0.05,
+                    start_seed=0, model_parameters={}, workers=None, checkpoint_file=None, SILENT=False):
+    """Optimizes SWM's logistic suppression policy with a REINFORCE-style policy gradient
+
+    Each iteration simulates a batch of rollouts under the current policy in parallel, with
+    "Probabilistic Choices" turned on so that the policy is a true stochastic policy. The gradient
+    of the expected pathway value is then estimated from the recorded ev, choice and policy_value
+    fields, and the policy weights take one step up it.
+
+    PARAMETERS
+    ----------
+    timesteps: integer; the length of each rollout.
+
+    start_policy: list of two numbers; the logistic policy weights to start from.
+
+    iterations: integer; how many gradient steps to take (in total, including any from a checkpoint).
+
+    rollouts: integer; how many pathways to simulate for each gradient estimate.
+
+    learning_rate: the step size applied to the gradient. The gradient is averaged over rollouts and
+         timesteps, so this does not need to change with either.
+
+    start_seed: iteration i uses the seeds start_seed + i*rollouts up to start_seed + (i+1)*rollouts,
+         so that a run (and a resumed run) is reproducible.
+
+    model_parameters: see SWM.simulate(). "Probabilistic Choices" is always set to "True".
+
+    workers: integer; the number of worker processes for the rollouts. One pool of them is started for the
+         whole run, rather than one per iteration. See SWM.simulate_parallel()
+
+    checkpoint_file: optional path to a JSON file. The weights and history are written to it after every
+         iteration, and if it already exists, the run resumes from it. The checkpoint also records timesteps,
+         rollouts, learning_rate, start_seed and model_parameters, and resuming with different ones raises
+         a ValueError, rather than mixing two runs.
+
+    SILENT: boolean; Should the optimizer suppress its progress reports to standard out. Default=False
+
+
+    RETURNS
+    -------
+    A list with one dictionary per iteration, holding the policy used, the mean "Total Pathway Value" and
+    "Average Habitat Value" of its rollouts, the gradient, the wall-clock time and the rollouts per second.
+    """
+
+    params = dict(model_parameters)
+    params["Probabilistic Choices"] = "True"
+
+    #as they read back from a checkpoint, so they can be compared with one
+    settings = json.loads(json.dumps(SWM._plain_values({"Timesteps": int(timesteps), "Rollouts": int(rollouts),
+                                                         "Learning Rate": learning_rate, "Start Seed": start_seed,
+                                                         "Model Parameters": params})))
+
+    policy = [float(b) for b in SWM.sanitize_policy(start_policy)[:2]]
+    history = []
+    if (checkpoint_file is not None) and os.path.exists(checkpoint_file):
+        policy, history = load_checkpoint(checkpoint_file, settings)
+
+    if workers is None: workers = os.cpu_count() or 1
+    executor = None
+    if workers > 1 and len(history) < iterations:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        for i in range(len(history), iterations):
+            start_time = time.time()
+
+            seeds = range(start_seed + i*rollouts, start_seed + (i+1)*rollouts)
+            results = SWM.simulate_parallel(timesteps, policy, seeds, params, workers=workers, KEEP_STATES=True,
+                                            COLUMNAR=True, executor=executor)
+            grad = policy_gradient_estimate(results)
+
+            elapsed = time.time() - start_time
+            record = {
+                        "Iteration": i,
+                        "Policy": policy[:],
+                        "Average Total Pathway Value": float(numpy.mean([r["Total Pathway Value"] for r in results])),
+                        "Average Habitat Value": float(numpy.mean([r["Average Habitat Value"] for r in results])),
+                        "Gradient": grad.tolist(),
+                        "Seconds": elapsed,
+                        "Rollouts per Second": rollouts / elapsed if elapsed > 0 else float("inf")
+                     }
+            history.append(record)
+
+            policy = (numpy.array(policy) + learning_rate * grad).tolist()
+
+            if checkpoint_file is not None:
+                save_checkpoint(checkpoint_file, policy, history, settings)
+
+            if not SILENT:
+                print("Iteration " + str(i) + ": policy " + str([round(b,3) for b in record["Policy"]]) +
+                      "   value " + str(round(record["Average Total Pathway Value"],1)) +
+                      "   " + str(round(elapsed,2)) + "s  (" + str(round(record["Rollouts per Second"],1)) + " rollouts/s)")
+    finally:
+        if executor is not None: executor.shutdown()
+
+    return history
+
+
+def policy_gradient_estimate(results):
+    """Returns the REINFORCE estimate of the gradient of the mean pathway value with respect to the
+    two logistic policy weights, given a list of simulate() results with their "States"
+
+    For the logistic policy P(suppress) = logistic(b0 + b1*ev), the gradient of the log-probability of
+    each choice is (choice - policy_value) * [1, ev]. Each of these is weighted by the reward still to
+    come in its pathway, less the mean of that value over the batch at the same timestep.
+    """
+    ev = _stack(results, 2)
+    choice = _stack(results, 3).astype(float)
+    policy_value = _stack(results, 5)
+    reward = _stack(results, 6)
+
+    #reward-to-go, and a per-timestep baseline
+    reward_to_go = numpy.cumsum(reward[:,::-1], axis=1)[:,::-1]
+    advantage = reward_to_go - reward_to_go.mean(axis=0)
+
+    score = (choice - policy_value) * advantage
+    timesteps = max(1, reward.shape[1])
+    return numpy.array([score.sum(axis=1).mean(), (score * ev).sum(axis=1).mean()]) / timesteps
+
+
+def save_checkpoint(checkpoint_file, policy, history, settings=None):
+    """Writes the current policy and the iteration history to a JSON file, with the run's settings (a
+    dictionary checked by load_checkpoint())"""
+    with open(checkpoint_file + ".tmp", "w") as f:
+        json.dump({"Policy": policy, "History": history, "Settings": settings}, f)
+    #replace the old checkpoint in one step, so a crash can't leave a half-written file
+    os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+
+def load_checkpoint(checkpoint_file, settings=None):
+    """Returns the policy and iteration history saved by save_checkpoint(). If settings are given, raises a
+    ValueError if the checkpoint was saved with different ones"""
+    with open(checkpoint_file) as f:
+        saved = json.load(f)
+    saved_settings = saved.get("Settings")
+    if settings is not None and saved_settings is not None:
+        changed = [key for key in sorted(set(settings) | set(saved_settings))
+                   if settings.get(key) != saved_settings.get(key)]
+        if len(changed) > 0:
+            raise ValueError("The checkpoint in " + checkpoint_file + " is for a run with different settings: " +
+                             ", ".join(key + " " + repr(saved_settings.get(key)) + " != " + repr(settings.get(key))
+                                       for key in changed))
+    return saved["Policy"], saved["History"]
+
+
+def _stack(results, k):
+    """Returns a (pathways x timesteps) array of field k of each result's States"""
+    if len(results) > 0 and isinstance(results[0]["States"], SWM.PathwayStates):
+        return numpy.array([r["States"].column(k) for r in results], dtype=float)
+    return numpy.array([[s[k] for s in r["States"]] for r in results], dtype=float)
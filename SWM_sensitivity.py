@@ -0,0 +1,235 @@
+"""Global sensitivity analysis of SWM v1.3's pathway values to its model parameters"""
+
+import math, time, numpy, scipy.stats.qmc
+import SWMv1_3 as SWM
+
+
+#the summary values whose sensitivity can be measured
+SENSITIVITY_METRICS = ["Total Pathway Value", "Average Habitat Value", "Suppression Rate"]
+
+#design points are simulated this many pathways at a time, to bound the memory a batch needs
+DESIGN_CHUNK_PATHWAYS = 50000
+
+
+def sobol_indices(parameter_ranges, samples=1024, timesteps=100, policy="CT", seeds=4, start_seed=0, model_parameters={},
+                  metric="Total Pathway Value", bootstrap=500, confidence=0.95, design_seed=0, workers=None, SILENT=False):
+    """Estimates the first-order and total Sobol indices of each model parameter, with Saltelli's design.
+
+    Two scrambled Sobol' sample matrices, A and B, are drawn over the parameter ranges. Each parameter i
+    also gets the matrix AB_i, which is A with its column i taken from B, so the design has
+    samples * (parameters + 2) points. The first-order index of i (the share of the metric's variance due to
+    i alone) is estimated with Saltelli et al. (2010)'s estimator, and its total index (the share due to i
+    and all of its interactions) with Jansen's. Confidence intervals come from resampling the rows of the
+    design (the percentile bootstrap).
+
+    Each design point's value is the mean of metric over the same seeds (start_seed to start_seed + seeds),
+    so every point faces the same fires and only the parameters differ between them.
+
+    PARAMETERS
+    ----------
+    parameter_ranges: dictionary of model parameter name: [low, high]. Each is sampled uniformly in its range.
+         Any of SWM.MODEL_PARAMETER_KEYS can be used, except "Probabilistic Choices".
+
+    samples: integer; the number of rows in A and B, rounded up to a power of two.
+
+    timesteps: integer; the length of each pathway.
+
+    policy: the policy every pathway is simulated under. See SWM.sanitize_policy()
+
+    seeds: integer; the number of pathways simulated at each design point.
+
+    model_parameters: model parameters held fixed for every design point. See SWM.simulate()
+
+    metric: the summary value analysed, from SENSITIVITY_METRICS
+
+    bootstrap: integer; the number of bootstrap resamples.
+
+    confidence: the coverage of the confidence intervals. Default=0.95
+
+    design_seed: seeds the scrambling of the Sobol' sequence, and the bootstrap.
+
+    workers: integer; the number of worker processes. See SWM.simulate_parallel()
+
+    SILENT: boolean; Should the analysis suppress its progress reports to standard out. Default=False
+
+
+    RETURNS
+    -------
+    A dictionary holding, for each parameter, a dictionary of its "First Order" and "Total" indices and their
+    "First Order CI" and "Total CI" [low, high] intervals, along with the "Variance" of the metric over the
+    design, the number of design point "Evaluations", the "Pathways" simulated, and the wall-clock "Seconds".
+    """
+    start_time = time.time()
+    names, lows, highs = _parameter_bounds(parameter_ranges, metric)
+    d = len(names)
+
+    #one Sobol' sequence of twice the dimension gives A and B, as Saltelli recommends
+    sampler = scipy.stats.qmc.Sobol(d=2*d, scramble=True, seed=design_seed)
+    unit = sampler.random_base2(int(math.ceil(math.log(max(samples, 2), 2))))
+    n = len(unit)
+    A = lows + (highs - lows) * unit[:,:d]
+    B = lows + (highs - lows) * unit[:,d:]
+    design = [A, B]
+    for i in range(d):
+        AB = A.copy()
+        AB[:,i] = B[:,i]
+        design.append(AB)
+
+    values = evaluate_design(numpy.vstack(design), names, timesteps, policy, seeds, start_seed, model_parameters,
+                             metric, workers, SILENT)
+    fA = values[:n]
+    fB = values[n:2*n]
+    fAB = values[2*n:].reshape(d, n)
+
+    rng = numpy.random.RandomState(design_seed)
+    resamples = [rng.randint(0, n, n) for b in range(bootstrap)]
+    alpha = 100 * (1 - confidence) / 2.0
+
+    results = {}
+    for i, name in enumerate(names):
+        first, total = _sobol_estimates(fA, fB, fAB[i])
+        boot = numpy.array([_sobol_estimates(fA[r], fB[r], fAB[i][r]) for r in resamples]).reshape(-1, 2)
+        results[name] = {"First Order": first, "Total": total}
+        if bootstrap > 0:
+            results[name]["First Order CI"] = [float(x) for x in numpy.percentile(boot[:,0], [alpha, 100 - alpha])]
+            results[name]["Total CI"] = [float(x) for x in numpy.percentile(boot[:,1], [alpha, 100 - alpha])]
+
+    results["Variance"] = float(numpy.var(numpy.concatenate([fA, fB])))
+    results["Evaluations"] = len(values)
+    results["Pathways"] = len(values) * seeds
+    results["Seconds"] = time.time() - start_time
+
+    if not SILENT: _print_indices(results, names, ["First Order", "Total"], 1)
+    return results
+
+
+def morris_screening(parameter_ranges, trajectories=20, levels=4, timesteps=100, policy="CT", seeds=4, start_seed=0,
+                     model_parameters={}, metric="Total Pathway Value", bootstrap=500, confidence=0.95, design_seed=0,
+                     workers=None, SILENT=False):
+    """Screens the model parameters with Morris' elementary effects, a much cheaper first look than
+    sobol_indices(): trajectories * (parameters + 1) design points.
+
+    Each trajectory starts at a random point on a levels x levels x ... grid over the (scaled) parameter
+    ranges, and moves one parameter at a time, in a random order, by levels / (2 * (levels - 1)) of its range.
+    The change in metric at each move, divided by the step, is one elementary effect of that parameter.
+    Effects are in units of the metric per whole parameter range.
+
+    Arguements are as in sobol_indices(), with:
+    trajectories: integer; the number of trajectories, each giving one elementary effect per parameter.
+    levels: integer; the number of grid levels per parameter (an even number, at least 2)
+
+    Returns a dictionary holding, for each parameter, a dictionary of its "Mu" (the mean effect), "Mu Star"
+    (the mean absolute effect, which ranks importance) with its bootstrap "Mu Star CI", and "Sigma" (the
+    spread of the effects, which is large for parameters with nonlinear effects or interactions), along with
+    the design point "Evaluations", the "Pathways" simulated, and the wall-clock "Seconds".
+    """
+    start_time = time.time()
+    names, lows, highs = _parameter_bounds(parameter_ranges, metric)
+    d = len(names)
+    delta = levels / (2.0 * (levels - 1))
+
+    rng = numpy.random.RandomState(design_seed)
+    unit = numpy.empty((trajectories, d + 1, d))
+    orders = numpy.empty((trajectories, d), dtype=int)
+    signs = numpy.empty((trajectories, d))
+    for t in range(trajectories):
+        x = rng.randint(0, levels, d) / float(levels - 1)
+        orders[t] = rng.permutation(d)
+        unit[t,0] = x
+        for k, i in enumerate(orders[t]):
+            #step up unless that would leave the range
+            signs[t,k] = 1.0 if x[i] + delta <= 1.0 + 1e-12 else -1.0
+            x = x.copy()
+            x[i] += signs[t,k] * delta
+            unit[t,k+1] = x
+
+    points = lows + (highs - lows) * unit.reshape(-1, d)
+    values = evaluate_design(points, names, timesteps, policy, seeds, start_seed, model_parameters, metric, workers,
+                             SILENT).reshape(trajectories, d + 1)
+
+    effects = numpy.empty((trajectories, d))
+    for t in range(trajectories):
+        effects[t, orders[t]] = (values[t,1:] - values[t,:-1]) * signs[t] / delta
+
+    alpha = 100 * (1 - confidence) / 2.0
+    results = {}
+    for i, name in enumerate(names):
+        e = effects[:,i]
+        results[name] = {"Mu": float(e.mean()), "Mu Star": float(numpy.abs(e).mean()),
+                         "Sigma": float(e.std(ddof=1)) if trajectories > 1 else 0.0}
+        if bootstrap > 0:
+            boot = numpy.abs(e)[rng.randint(0, trajectories, (bootstrap, trajectories))].mean(axis=1)
+            results[name]["Mu Star CI"] = [float(x) for x in numpy.percentile(boot, [alpha, 100 - alpha])]
+
+    results["Evaluations"] = len(points)
+    results["Pathways"] = len(points) * seeds
+    results["Seconds"] = time.time() - start_time
+
+    if not SILENT: _print_indices(results, names, ["Mu Star", "Sigma"], 0)
+    return results
+
+
+def evaluate_design(points, names, timesteps=100, policy="CT", seeds=4, start_seed=0, model_parameters={},
+                    metric="Total Pathway Value", workers=None, SILENT=True):
+    """Returns the mean of metric at each design point (each row of points, holding a value for each of the
+    model parameters in names), over the pathways for seeds start_seed to start_seed + seeds.
+
+    Every pathway of every design point runs in the same simulate_parallel() batches, with its parameters
+    passed per pathway, so that a large design costs a few array operations per timestep rather than a
+    simulate() call per point. The random draws for each seed are made once, as an EventTape, and replayed
+    at every design point.
+    """
+    points = numpy.asarray(points, dtype=float)
+    tapes = [SWM.EventTape(timesteps, s) for s in range(start_seed, start_seed + seeds)]
+    chunk_points = max(1, DESIGN_CHUNK_PATHWAYS // seeds)
+    values = numpy.empty(len(points))
+
+    for start in range(0, len(points), chunk_points):
+        chunk = points[start:start + chunk_points]
+        mp = dict(model_parameters)
+        for k, name in enumerate(names):
+            #each design point's value, repeated for each of its seeds
+            mp[name] = numpy.repeat(chunk[:,k], seeds)
+        results = SWM.simulate_parallel(timesteps, policy, None, mp, workers=workers, tapes=tapes * len(chunk))
+        values[start:start + len(chunk)] = numpy.array([r[metric] for r in results], dtype=float).reshape(-1, seeds).mean(axis=1)
+        if not SILENT:
+            print("Evaluated " + str(start + len(chunk)) + " of " + str(len(points)) + " design points")
+
+    return values
+
+
+def _parameter_bounds(parameter_ranges, metric):
+    """Checks the parameter ranges and metric, and returns the parameter names with arrays of their bounds"""
+    if metric not in SENSITIVITY_METRICS:
+        raise ValueError("Can't analyse " + repr(metric) + "; use one of " + str(SENSITIVITY_METRICS))
+    names = sorted(parameter_ranges)
+    if len(names) == 0:
+        raise ValueError("No parameter ranges were given")
+    for name in names:
+        if name not in SWM.MODEL_PARAMETER_KEYS or name == "Probabilistic Choices":
+            raise ValueError("Can't vary " + repr(name) + "; it isn't a numeric SWM model parameter")
+        low, high = parameter_ranges[name]
+        if not low < high:
+            raise ValueError("The range of " + repr(name) + " must be [low, high], with low < high")
+    lows = numpy.array([parameter_ranges[name][0] for name in names], dtype=float)
+    highs = numpy.array([parameter_ranges[name][1] for name in names], dtype=float)
+    return names, lows, highs
+
+
+def _sobol_estimates(fA, fB, fAB):
+    """Returns the (first order, total) index estimates of one parameter"""
+    variance = numpy.var(numpy.concatenate([fA, fB]))
+    if variance == 0: return 0.0, 0.0
+    first = numpy.mean(fB * (fAB - fA)) / variance
+    total = 0.5 * numpy.mean((fA - fAB)**2) / variance
+    return float(first), float(total)
+
+
+def _print_indices(results, names, columns, rank):
+    print("")
+    print("Parameter".ljust(42) + "".join(c.rjust(14) for c in columns))
+    #most important first
+    for name in sorted(names, key=lambda name: -results[name][columns[rank]]):
+        print(name.ljust(42) + "".join(str(round(results[name][c], 3)).rjust(14) for c in columns))
+    print(str(results["Evaluations"]) + " design points, " + str(results["Pathways"]) + " pathways, " +
+          str(round(results["Seconds"], 1)) + " seconds")
@@ -0,0 +1,413 @@
+"""Long-lived local simulation service for SWM v1.3, which micro-batches requests from many clients
+
+Clients connect over a Unix socket (or localhost TCP) and send one JSON request per line. Each request
+gets one JSON response line with the same "id", sent as soon as its result is ready, so responses can
+arrive in a different order than the requests. Requests:
+
+    {"id": 1, "op": "simulate", "timesteps": 200, "policy": [0,10], "seed": 5, "model_parameters": {}, "states": false}
+    {"id": 2, "op": "convert", "pathway": <a simulate() result, with its "States">, "percentage_habitat": 0}
+    {"id": 3, "op": "convert", "timesteps": 200, "policy": [0,10], "seed": 5}     (simulates, then converts)
+    {"id": 4, "op": "stats"}
+
+Responses are {"id": ..., "result": ...} or {"id": ..., "error": "..."}. A "simulate" result is the
+simulate() summary dictionary (with its "States" only if "states" is true), and a "convert" result is the
+MDP pathway as a dictionary, with its events as a list of dictionaries.
+
+Run from the command line:
+    python SWM_server.py --socket /tmp/swm.sock
+    python SWM_server.py --port 8765
+"""
+
+import argparse, asyncio, collections, concurrent.futures, json, os, socket, time, numpy
+import SWMv1_3 as SWM
+
+
+class SimulationServer:
+    def __init__(self, path=None, host="127.0.0.1", port=8765, workers=None, max_batch=256, batch_window=0.002,
+                 max_queue=4096, latency_window=10000):
+        """An asyncio server that groups concurrent small simulation requests into batches for a worker pool.
+
+        Requests go onto a bounded queue. The dispatcher takes the first waiting request, then keeps
+        collecting for up to batch_window seconds (or max_batch requests), groups what it has by operation,
+        timesteps and model parameters, and sends each group to the worker pool as one simulate_batch() call.
+        At most one batch per worker is in flight at a time. When the workers are all busy the queue fills, and
+        once it is full the server stops reading from clients until there is room, so that clients are slowed
+        down rather than the server's memory growing without bound.
+
+        Arguements:
+        path: the Unix socket path to listen on. Default=None, which listens on host:port instead.
+        host, port: the TCP address to listen on when no path is given (port 0 picks a free port).
+        workers: integer; the number of worker processes. Default=None, which uses one per CPU.
+        max_batch: the most requests sent to the workers in one batch.
+        batch_window: how long (in seconds) the dispatcher waits for more requests to join a batch.
+        max_queue: the most requests waiting to be dispatched.
+        latency_window: how many of the most recent request latencies the percentiles are taken over.
+        """
+        self.path = path
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.max_queue = max_queue
+
+        self.queue = None
+        self.executor = None
+        self.server = None
+        self.dispatcher = None
+        self.slots = None
+        self.clients = set()
+
+        self.busy_workers = 0
+        self.requests = 0
+        self.completed = 0
+        self.errors = 0
+        self.batches = 0
+        self.batch_sizes = collections.deque(maxlen=latency_window)
+        self.latencies = collections.deque(maxlen=latency_window)
+
+    async def start(self):
+        """Starts the worker pool, the dispatcher and the listening socket"""
+        self.queue = asyncio.Queue(maxsize=self.max_queue)
+        self.slots = asyncio.Semaphore(self.workers)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+        self.dispatcher = asyncio.ensure_future(self._dispatch())
+        if self.path is not None:
+            if os.path.exists(self.path): os.remove(self.path)
+            self.server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        else:
+            self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+            self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.close()
+
+    async def close(self):
+        """Stops listening, disconnects the clients, cancels the dispatcher and shuts the worker pool down"""
+        if self.server is not None:
+            self.server.close()
+        #client connections stay open after the server stops listening, so end them here
+        for task in list(self.clients): task.cancel()
+        if self.clients:
+            await asyncio.gather(*self.clients, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+        if self.dispatcher is not None:
+            self.dispatcher.cancel()
+            try:
+                await self.dispatcher
+            except asyncio.CancelledError:
+                pass
+        if self.executor is not None:
+            self.executor.shutdown()
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def stats(self):
+        """Returns the server's queue depth, batch sizes, latency percentiles (in seconds) and counters"""
+        latencies = numpy.array(self.latencies, dtype=float)
+        percentiles = {}
+        for p in [50, 90, 99]:
+            percentiles["p" + str(p)] = float(numpy.percentile(latencies, p)) if len(latencies) > 0 else 0.0
+        return {
+                "Queue Depth": self.queue.qsize() if self.queue is not None else 0,
+                "Queue Limit": self.max_queue,
+                "Busy Workers": self.busy_workers,
+                "Workers": self.workers,
+                "Requests": self.requests,
+                "Completed": self.completed,
+                "Errors": self.errors,
+                "Batches": self.batches,
+                "Mean Batch Size": float(numpy.mean(self.batch_sizes)) if len(self.batch_sizes) > 0 else 0.0,
+                "Max Batch Size": int(max(self.batch_sizes)) if len(self.batch_sizes) > 0 else 0,
+                "Latency": percentiles
+               }
+
+    async def _handle_client(self, reader, writer):
+        lock = asyncio.Lock()
+        pending = set()
+        task = asyncio.current_task()
+        self.clients.add(task)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                try:
+                    request = json.loads(line)
+                    request_id = request.get("id")
+                except (ValueError, AttributeError):
+                    await _send(writer, lock, {"id": None, "error": "Requests must be JSON objects, one per line"})
+                    continue
+
+                self.requests += 1
+                if request.get("op") == "stats":
+                    self.completed += 1
+                    await _send(writer, lock, {"id": request_id, "result": self.stats()})
+                    continue
+
+                try:
+                    job = _make_job(request)
+                except (KeyError, TypeError, ValueError) as e:
+                    self.errors += 1
+                    await _send(writer, lock, {"id": request_id, "error": str(e)})
+                    continue
+
+                #waits here while the queue is full, which stops this client's requests being read
+                job["future"] = asyncio.get_running_loop().create_future()
+                job["received"] = time.perf_counter()
+                await self.queue.put(job)
+
+                responder = asyncio.ensure_future(self._respond(job, writer, lock))
+                pending.add(responder)
+                responder.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            #only close() cancels a client, and the connection ends here either way. Finishing normally
+            # (rather than cancelled) keeps asyncio from logging the cancellation as an error
+            pass
+        finally:
+            for responder in pending: responder.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            writer.close()
+            self.clients.discard(task)
+
+    async def _respond(self, job, writer, lock):
+        try:
+            result = await job["future"]
+            response = {"id": job["id"], "result": result}
+        except Exception as e:
+            self.errors += 1
+            response = {"id": job["id"], "error": type(e).__name__ + ": " + str(e)}
+        self.completed += 1
+        self.latencies.append(time.perf_counter() - job["received"])
+        await _send(writer, lock, response)
+
+    async def _dispatch(self):
+        """Collects waiting requests into batches and hands them to the worker pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self.queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(jobs) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    jobs.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = collections.OrderedDict()
+            for job in jobs:
+                groups.setdefault(job["group"], []).append(job)
+
+            for group, group_jobs in groups.items():
+                #one batch per worker at a time; while they're all busy, requests wait in the queue
+                await self.slots.acquire()
+                self.busy_workers += 1
+                self.batches += 1
+                self.batch_sizes.append(len(group_jobs))
+                future = loop.run_in_executor(self.executor, _run_batch, group, [job["args"] for job in group_jobs])
+                future.add_done_callback(lambda f, group_jobs=group_jobs: self._finish_batch(f, group_jobs))
+
+    def _finish_batch(self, future, jobs):
+        self.busy_workers -= 1
+        self.slots.release()
+        try:
+            results = future.result()
+        except Exception as e:
+            for job in jobs:
+                if not job["future"].done(): job["future"].set_exception(e)
+            return
+        for job, result in zip(jobs, results):
+            if job["future"].done(): continue
+            if isinstance(result, Exception):
+                job["future"].set_exception(result)
+            else:
+                job["future"].set_result(result)
+
+
+class SimulationClient:
+    def __init__(self, path=None, host="127.0.0.1", port=8765):
+        """A simple blocking client for SimulationServer, sending one request at a time. To keep many requests
+        in flight, open several clients (e.g. one per thread), or write JSON lines to the socket directly."""
+        if path is not None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.connect(path)
+        else:
+            self.socket = socket.create_connection((host, port))
+        self.file = self.socket.makefile("rwb")
+        self.next_id = 0
+
+    def request(self, request):
+        """Sends one request dictionary and returns its result, raising a RuntimeError if it failed"""
+        self.next_id += 1
+        request = dict(request, id=self.next_id)
+        self.file.write(json.dumps(request).encode("utf-8") + b"\n")
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if "error" in response: raise RuntimeError(response["error"])
+        return response["result"]
+
+    def simulate(self, timesteps, policy=[0,0], random_seed=0, model_parameters={}, KEEP_STATES=False):
+        return self.request({"op": "simulate", "timesteps": timesteps, "policy": policy, "seed": random_seed,
+                             "model_parameters": model_parameters, "states": KEEP_STATES})
+
+    def convert(self, pathway, VALUE_ON_HABITAT=False, percentage_habitat=0):
+        return self.request({"op": "convert", "pathway": pathway, "VALUE_ON_HABITAT": VALUE_ON_HABITAT,
+                             "percentage_habitat": percentage_habitat})
+
+    def stats(self):
+        return self.request({"op": "stats"})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+def serve(path=None, host="127.0.0.1", port=8765, workers=None, max_batch=256, batch_window=0.002, max_queue=4096):
+    """Runs a SimulationServer until interrupted. See SimulationServer for the arguements."""
+    server = SimulationServer(path, host, port, workers, max_batch, batch_window, max_queue)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+async def _send(writer, lock, response):
+    """Writes one response line, waiting for the client to read if its buffer is full"""
+    async with lock:
+        writer.write(json.dumps(response, default=_json_default).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+def _make_job(request):
+    """Checks a request and returns its job: the batch group it belongs to, and its own arguements"""
+    op = request.get("op")
+    convert_args = {"VALUE_ON_HABITAT": bool(request.get("VALUE_ON_HABITAT", False)),
+                    "percentage_habitat": request.get("percentage_habitat", 0)}
+
+    if op == "convert" and "pathway" in request:
+        if not isinstance(request["pathway"], dict) or "States" not in request["pathway"]:
+            raise ValueError('"pathway" must be a simulate() result, with its "States"')
+        return {"id": request.get("id"), "group": ("convert pathway",),
+                "args": (request["pathway"], convert_args)}
+
+    if op not in ("simulate", "convert"):
+        raise ValueError("Unknown op: " + repr(op))
+
+    timesteps = int(request["timesteps"])
+    if timesteps < 1:
+        raise ValueError('"timesteps" must be at least 1')
+    model_parameters = request.get("model_parameters", {})
+    if not isinstance(model_parameters, dict):
+        raise ValueError('"model_parameters" must be a JSON object')
+    SWM.validate_model_parameters(model_parameters)
+    policy = _check_policy(request.get("policy", [0,0]))
+    seed = request.get("seed", 0)
+    if not (seed is None or isinstance(seed, (int, float, str))):
+        raise ValueError('"seed" must be a number or a string, not ' + repr(seed))
+    KEEP_STATES = bool(request.get("states", False)) or op == "convert"
+    group = (op, timesteps, json.dumps(model_parameters, sort_keys=True), KEEP_STATES)
+    return {"id": request.get("id"), "group": group, "args": (policy, seed, convert_args)}
+
+
+def _check_policy(policy):
+    """Returns a request's policy, raising a ValueError if simulate() can't use it. Policies are passed on
+    as given (not sanitized), so that results report the same "Generation Policy" as simulate() would."""
+    if isinstance(policy, str):
+        return policy
+    if not isinstance(policy, list) or len(policy) < 2 or \
+            any(isinstance(b, bool) or not isinstance(b, (int, float)) for b in policy):
+        raise ValueError('"policy" must be a list of at least two numbers, or a policy name like "CT", not ' +
+                         repr(policy))
+    return policy
+
+
+def _run_batch(group, args):
+    """Worker function: runs one group of jobs, and returns one JSON-ready result (or exception) per job.
+    If the batch as a whole fails, its jobs are run again one at a time, so that a bad request only
+    fails itself and not the other requests batched with it."""
+    try:
+        return _run_group(group, args)
+    except Exception:
+        if len(args) == 1: raise
+    results = []
+    for job_args in args:
+        try:
+            results.extend(_run_group(group, [job_args]))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _run_group(group, args):
+    if group[0] == "convert pathway":
+        return [_convert(pathway, convert_args) for pathway, convert_args in args]
+
+    op, timesteps, model_parameters, KEEP_STATES = group
+    policies = [policy for policy, seed, convert_args in args]
+    seeds = [seed for policy, seed, convert_args in args]
+    results = SWM.simulate_batch(timesteps, policies, seeds, json.loads(model_parameters), KEEP_STATES=KEEP_STATES)
+    if op == "simulate":
+        return results
+    return [_convert(result, convert_args) for result, (policy, seed, convert_args) in zip(results, args)]
+
+
+def _convert(pathway, convert_args):
+    try:
+        return _MDP_pathway_record(SWM.convert_to_MDP_pathway(pathway, **convert_args))
+    except Exception as e:
+        return e
+
+
+def _MDP_pathway_record(pw):
+    """Returns an MDP_Pathway as a JSON-ready dictionary"""
+    record = {
+              "policy_length": pw.policy_length,
+              "ID_number": pw.ID_number,
+              "net_value": pw.net_value,
+              "generation_policy_parameters": pw.generation_policy_parameters,
+              "generation_joint_prob": pw.generation_joint_prob,
+              "generation_log_joint_prob": pw.generation_log_joint_prob,
+              "actions_0_taken": pw.actions_0_taken,
+              "actions_1_taken": pw.actions_1_taken,
+              "discount_rate": pw.discount_rate,
+              "metadata": pw.metadata
+             }
+    record["events"] = [{
+                         "sequence_index": e.sequence_index,
+                         "state": e.state,
+                         "action": e.action,
+                         "action_prob": e.action_prob,
+                         "decision_prob": e.decision_prob,
+                         "rewards": e.rewards
+                        } for e in pw.events]
+    return record
+
+
+def _json_default(value):
+    if isinstance(value, numpy.ndarray): return value.tolist()
+    if isinstance(value, numpy.generic): return value.item()
+    raise TypeError("Can't send a " + type(value).__name__ + " as JSON")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SWM v1.3 simulation server")
+    parser.add_argument("--socket", help="listen on this Unix socket path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--batch-window", type=float, default=0.002, help="seconds to wait for a batch to fill")
+    parser.add_argument("--max-queue", type=int, default=4096)
+    args = parser.parse_args()
+    serve(args.socket, args.host, args.port, args.workers, args.max_batch, args.batch_window, args.max_queue)
@@ -0,0 +1,480 @@
+"""Discretized dynamic-programming solver for SWM v1.3, giving an optimal-policy baseline"""
+
+import numpy, scipy.optimize, scipy.sparse
+import SWMv1_3 as SWM
+
+
+class DiscreteSWM:
+    def __init__(self, model_parameters={}, vulnerability_points=21, timber_points=11, habitat_points=11):
+        """SWM v1.3's dynamics on a grid, for value iteration.
+
+        The state is (vulnerability, timber, habitat, time since mild, time since severe). Vulnerability,
+        timber and habitat are continuous, so each is put on an evenly spaced grid between its bounds, and
+        a value that falls between two grid points is split between them by linear interpolation. The
+        timers are exact: every time since mild above the habitat's mild maximum affects habitat the same
+        way, as does every time since severe above the severe maximum, so they are capped one past those.
+
+        Each timestep's fire is mild or severe (severe when ev >= 1 - vulnerability), and the choice to
+        suppress is made after ev is seen. Given the severity and the choice, each state variable moves
+        on its own, so the transition tensor is stored in factored form: a small matrix over the
+        vulnerability grid, one over the timber grid, and a sparse matrix over (habitat, time since mild,
+        time since severe). The full transition matrix, which would be far too large at useful
+        resolutions, is never built. And when habitat isn't part of the reward, habitat and the timers
+        can't affect the value or the optimal choice, so they are dropped from the solve altogether.
+
+        Arguements:
+        model_parameters: see SWM.simulate(). "Probabilistic Choices" only affects evaluate_policy().
+        vulnerability_points, timber_points, habitat_points: the grid resolution of each continuous
+             state variable (at least 2 each)
+        """
+        SWM.validate_model_parameters(model_parameters)
+        self.model_parameters = dict(model_parameters)
+        c = SWM._parse_model_parameters(model_parameters)
+        self.c = c
+
+        self.vulnerability_grid = numpy.linspace(c["vuln_min"], c["vuln_max"], int(vulnerability_points))
+        self.timber_grid = numpy.linspace(c["timber_min"], c["timber_max"], int(timber_points))
+        self.habitat_grid = numpy.linspace(c["habitat_min"], c["habitat_max"], int(habitat_points))
+        self.mild_timer_count = int(c["habitat_mild_maximum"]) + 2
+        self.severe_timer_count = int(c["habitat_severe_maximum"]) + 2
+        self.shape = (len(self.vulnerability_grid), len(self.timber_grid), len(self.habitat_grid),
+                      self.mild_timer_count, self.severe_timer_count)
+
+        #probability of a severe fire at each vulnerability grid point
+        event_range = c["event_max"] - c["event_min"]
+        threshold = numpy.clip(1 - self.vulnerability_grid, c["event_min"], c["event_max"])
+        self.p_severe = (c["event_max"] - threshold) / event_range
+
+        #the three distinct transitions: suppression (whatever the severity), and letting a mild or
+        # a severe fire burn
+        self.vulnerability_transitions = {
+            "suppress": _grid_transition(self.vulnerability_grid, c["vuln_change_after_suppression"]),
+            "mild": _grid_transition(self.vulnerability_grid, c["vuln_change_after_mild"]),
+            "severe": _grid_transition(self.vulnerability_grid, c["vuln_change_after_severe"])
+        }
+        self.timber_transitions = {
+            "suppress": _grid_transition(self.timber_grid, c["timber_change_after_suppression"]),
+            "mild": _grid_transition(self.timber_grid, c["timber_change_after_mild"]),
+            "severe": _grid_transition(self.timber_grid, c["timber_change_after_severe"])
+        }
+        self.habitat_transitions = {
+            "suppress": self._habitat_transition(1, 1),
+            "mild": self._habitat_transition(None, 1),
+            "severe": self._habitat_transition(1, None)
+        }
+
+    def size(self):
+        """Returns the number of discrete states"""
+        return int(numpy.prod(self.shape))
+
+    def value_iteration(self, discount=0.96, tolerance=1e-4, max_iterations=10000, habitat_weight=0, SILENT=True):
+        """Solves the discretized model for its optimal policy, by value iteration
+
+        PARAMETERS
+        ----------
+        discount: the per-timestep discount factor (less than 1).
+
+        tolerance: stop when no state's value changes by more than this in an iteration.
+
+        max_iterations: stop after this many iterations, converged or not.
+
+        habitat_weight: the reward is (1 - habitat_weight) times SWM's state value plus habitat_weight
+             times the habitat value, like convert_to_MDP_pathway()'s percentage_habitat. Default=0
+
+        SILENT: boolean; Should the solver suppress its progress reports to standard out. Default=True
+
+
+        RETURNS
+        -------
+        A dictionary holding the optimal "Value" of every state (an array shaped like the grid, as in
+        DiscreteSWM.shape, but with length-1 habitat and timer axes when habitat_weight is 0), whether it is optimal to "Suppress Mild" and "Suppress Severe" fires in each
+        state, the "Start Value" (the mean optimal value over SWM's starting distribution), the discounted
+        "Occupancy" of each state under the optimal policy, the number of "Iterations", the final
+        "Residual", whether it "Converged", the "Logistic Fit" (the logistic policy whose choices best fit
+        the optimal ones) and its "Logistic Fit Start Value", the "Logistic Policy" with the highest start
+        value found by optimize_logistic() from that fit, the "Logistic Start Value" it achieves, and the
+        "Logistic Agreement" (the share of occupancy where its choice matches the optimal one).
+        """
+        REDUCED = (habitat_weight == 0)
+        V = numpy.zeros(self._flat_shape(REDUCED))
+        residual = numpy.inf
+        iterations = 0
+        for iterations in range(1, int(max_iterations) + 1):
+            V_new, suppress_mild, suppress_severe = self._bellman(V, discount, habitat_weight)
+            residual = numpy.max(numpy.abs(V_new - V))
+            V = V_new
+            if not SILENT and iterations % 50 == 0:
+                print("Iteration " + str(iterations) + ": residual " + str(residual))
+            if residual <= tolerance: break
+
+        #one more pass, so the choices are greedy with respect to the final values
+        V_new, suppress_mild, suppress_severe = self._bellman(V, discount, habitat_weight)
+
+        occupancy = self.occupancy(suppress_mild, suppress_severe, discount)
+        logistic_fit = self.fit_logistic(suppress_mild, suppress_severe, occupancy)
+        fit_value = self.evaluate_policy(logistic_fit, discount, tolerance, max_iterations, habitat_weight)
+        logistic_policy, logistic_value = self.optimize_logistic(logistic_fit, discount, tolerance, max_iterations,
+                                                                 habitat_weight)
+        agreement = self._agreement(logistic_policy, suppress_mild, suppress_severe, occupancy)
+
+        shape = self._output_shape(REDUCED)
+        return {
+                "Value": V.reshape(shape),
+                "Suppress Mild": suppress_mild.reshape(shape),
+                "Suppress Severe": suppress_severe.reshape(shape),
+                "Start Value": self.start_value(V),
+                "Occupancy": occupancy.reshape(shape),
+                "Iterations": iterations,
+                "Residual": float(residual),
+                "Converged": bool(residual <= tolerance),
+                "Logistic Fit": logistic_fit,
+                "Logistic Fit Start Value": fit_value["Start Value"],
+                "Logistic Policy": logistic_policy,
+                "Logistic Start Value": logistic_value["Start Value"],
+                "Logistic Agreement": agreement
+               }
+
+    def evaluate_policy(self, policy, discount=0.96, tolerance=1e-4, max_iterations=10000, habitat_weight=0):
+        """Returns the discounted value of following a logistic policy on the discretized model
+
+        The policy sees only ev, as in SWM.simulate(): with "Probabilistic Choices" it suppresses with
+        probability logistic(b0 + b1*ev), and otherwise whenever that is at least 0.5. Any policy that
+        sanitize_policy() accepts will do, including 'LB', 'SA' and 'CT'.
+
+        RETURNS
+        -------
+        A dictionary with the "Value" of every state and the "Start Value", as in value_iteration()
+        """
+        q_mild, q_severe = self._policy_suppression_probs(policy)
+
+        REDUCED = (habitat_weight == 0)
+        V = numpy.zeros(self._flat_shape(REDUCED))
+        for i in range(int(max_iterations)):
+            V_new = self._policy_backup(V, q_mild, q_severe, discount, habitat_weight)
+            residual = numpy.max(numpy.abs(V_new - V))
+            V = V_new
+            if residual <= tolerance: break
+
+        return {"Value": V.reshape(self._output_shape(REDUCED)), "Start Value": self.start_value(V)}
+
+    def start_value(self, V):
+        """Returns the mean of V (over the full grid, or without habitat and the timers) over SWM's
+        starting distribution"""
+        REDUCED = (numpy.size(V) == self.shape[0] * self.shape[1])
+        return float(numpy.sum(self.start_distribution(REDUCED) * V.reshape(self._flat_shape(REDUCED))))
+
+    def start_distribution(self, REDUCED=False):
+        """Returns the starting distribution over the grid: SWM draws vulnerability from [0.2,0.8], and
+        timber and habitat from [2,8] (unless they are set in the model parameters), with both timers at 0.
+        With REDUCED, habitat and the timers are summed out."""
+        c = self.c
+        v = _start_weights(self.vulnerability_grid, 0.2, 0.8, c["starting_vulnerability"])
+        t = _start_weights(self.timber_grid, 2, 8, c["starting_timber"])
+        if REDUCED:
+            return v[:,None,None] * t[None,:,None]
+        h = _start_weights(self.habitat_grid, 2, 8, c["starting_habitat"])
+
+        timers = numpy.zeros((self.mild_timer_count, self.severe_timer_count))
+        timers[0,0] = 1.0
+        H = (h[:,None,None] * timers[None,:,:]).ravel()
+        return v[:,None,None] * t[None,:,None] * H[None,None,:]
+
+    def occupancy(self, suppress_mild, suppress_severe, discount=0.96, tolerance=1e-8, max_iterations=10000):
+        """Returns the discounted state occupancy of a policy from the starting distribution, normalized
+        to sum to 1. The policy is given by boolean (or probability) arrays of whether it suppresses mild
+        and severe fires in each state (or, if they don't depend on them, each vulnerability and timber value)."""
+        REDUCED = (numpy.size(suppress_mild) == self.shape[0] * self.shape[1])
+        suppress_mild = numpy.asarray(suppress_mild, dtype=float).reshape(self._flat_shape(REDUCED))
+        suppress_severe = numpy.asarray(suppress_severe, dtype=float).reshape(self._flat_shape(REDUCED))
+        p = self.p_severe[:,None,None]
+
+        start = self.start_distribution(REDUCED)
+        d = start.copy()
+        flow = start.copy()
+        for i in range(int(max_iterations)):
+            flow = discount * (self._expect(flow * ((1-p)*suppress_mild + p*suppress_severe), "suppress", TRANSPOSE=True) +
+                               self._expect(flow * (1-p) * (1-suppress_mild), "mild", TRANSPOSE=True) +
+                               self._expect(flow * p * (1-suppress_severe), "severe", TRANSPOSE=True))
+            d += flow
+            if numpy.sum(flow) <= tolerance: break
+
+        return (d / numpy.sum(d)).reshape(self._output_shape(REDUCED))
+
+    def fit_logistic(self, suppress_mild, suppress_severe, occupancy, ev_points=200, regularization=1e-4):
+        """Returns the logistic policy [b0, b1] that best fits a policy's choices, by weighted logistic
+        regression of the choice on ev over the occupancy (and the uniform distribution of ev)
+
+        regularization: a small ridge penalty on the weights, which keeps them finite when the choices are
+             perfectly separable in ev
+        """
+        ev, supp_mass, total_mass = self._ev_choice_masses(suppress_mild, suppress_severe, occupancy, ev_points)
+
+        X = numpy.column_stack([numpy.ones(len(ev)), ev])
+        b = numpy.zeros(2)
+        for i in range(100):
+            pv = 1.0 / (1.0 + numpy.exp(-numpy.clip(X.dot(b), -100, 100)))
+            grad = X.T.dot(supp_mass - total_mass*pv) - regularization*b
+            hess = (X.T * (total_mass*pv*(1-pv))).dot(X) + regularization*numpy.eye(2)
+            step = numpy.linalg.solve(hess, grad)
+            b += step
+            if numpy.max(numpy.abs(step)) < 1e-10: break
+
+        return b.tolist()
+
+    def optimize_logistic(self, start_policy, discount=0.96, tolerance=1e-4, max_iterations=10000, habitat_weight=0,
+                          max_evaluations=200):
+        """Returns the logistic policy [b0, b1] with the highest start value found by a Nelder-Mead search
+        from start_policy, and its evaluate_policy() dictionary.
+
+        The optimal policy sees the whole state, but a logistic policy sees only ev, so the logistic policy
+        that best fits the optimal choices (fit_logistic()) can be worth far less than the best logistic
+        policy. Starting from that fit, this maximizes the policy's value directly. Without "Probabilistic
+        Choices", the value only changes where a choice flips, so the search is derivative-free. The policy
+        returned is never worse than start_policy.
+
+        max_evaluations: the most evaluate_policy() calls the search makes. Default=200
+        """
+        start = [float(b) for b in SWM.sanitize_policy(start_policy)[:2]]
+        values = {}
+        def loss(b):
+            key = tuple(b)
+            if key not in values:
+                values[key] = self.evaluate_policy(list(b), discount, tolerance, max_iterations, habitat_weight)
+            return -values[key]["Start Value"]
+
+        #steps of 1 in each weight move the choice threshold across a good part of the (unit) ev range
+        simplex = numpy.array([start, [start[0] + 1, start[1]], [start[0], start[1] + 1]])
+        best = scipy.optimize.minimize(loss, start, method="Nelder-Mead",
+                                       options={"initial_simplex": simplex, "maxfev": max_evaluations,
+                                                "xatol": 1e-3, "fatol": tolerance})
+        policy = [float(b) for b in best.x]
+        if loss(policy) > loss(start): policy = start
+        return policy, values[tuple(policy)]
+
+    def _flat_shape(self, REDUCED=False):
+        """The shape the solver works in: (vulnerability, timber, habitat and timers), with a length-1
+        last axis when habitat and the timers are dropped"""
+        if REDUCED:
+            return (self.shape[0], self.shape[1], 1)
+        return (self.shape[0], self.shape[1], self.shape[2] * self.shape[3] * self.shape[4])
+
+    def _output_shape(self, REDUCED=False):
+        if REDUCED:
+            return (self.shape[0], self.shape[1], 1, 1, 1)
+        return self.shape
+
+    def _expect(self, V, transition, TRANSPOSE=False):
+        """Returns the expectation of V (in _flat_shape()) over the next state, for every current state,
+        under one of the three transitions. With TRANSPOSE, pushes a distribution forward instead."""
+        Pv = self.vulnerability_transitions[transition]
+        Pt = self.timber_transitions[transition]
+        PH = self.habitat_transitions[transition]
+        if TRANSPOSE:
+            Pv, Pt, PH = Pv.T, Pt.T, PH.T
+
+        nv, nt, nH = V.shape
+        W = V
+        if nH > 1:
+            W = (PH.dot(V.reshape(nv*nt, nH).T)).T
+        W = numpy.matmul(Pt, W.reshape(nv, nt, nH))
+        W = Pv.dot(W.reshape(nv, nt*nH))
+        return W.reshape(nv, nt, nH)
+
+    def _base_reward(self, habitat_weight):
+        """Returns the reward before any suppression or burn costs, broadcastable to _flat_shape()"""
+        if habitat_weight == 0:
+            return (10 + self.timber_grid)[None,:,None]
+        H_habitat = numpy.repeat(self.habitat_grid, self.mild_timer_count * self.severe_timer_count)
+        return ((1 - habitat_weight) * (10 + self.timber_grid)[None,:,None] +
+                habitat_weight * H_habitat[None,None,:])
+
+    def _bellman(self, V, discount, habitat_weight):
+        """One value iteration backup. Returns the new values and the greedy choices for mild and severe fires."""
+        c = self.c
+        cost_weight = 1 - habitat_weight
+        base = self._base_reward(habitat_weight)
+        p = self.p_severe[:,None,None]
+
+        EV_suppress = discount * self._expect(V, "suppress")
+        q_mild_suppress = base - cost_weight*c["supp_cost_mild"] + EV_suppress
+        q_mild_burn = base + discount * self._expect(V, "mild")
+        q_severe_suppress = base - cost_weight*c["supp_cost_severe"] + EV_suppress
+        q_severe_burn = base - cost_weight*c["burn_cost"] + discount * self._expect(V, "severe")
+
+        suppress_mild = q_mild_suppress > q_mild_burn
+        suppress_severe = q_severe_suppress > q_severe_burn
+        V_new = ((1-p) * numpy.maximum(q_mild_suppress, q_mild_burn) +
+                 p * numpy.maximum(q_severe_suppress, q_severe_burn))
+        return V_new, suppress_mild, suppress_severe
+
+    def _policy_backup(self, V, q_mild, q_severe, discount, habitat_weight):
+        """One backup of V under a fixed policy that suppresses with probability q_mild (or q_severe)
+        at each vulnerability grid point"""
+        c = self.c
+        cost_weight = 1 - habitat_weight
+        base = self._base_reward(habitat_weight)
+        p = self.p_severe[:,None,None]
+        q_mild = q_mild[:,None,None]
+        q_severe = q_severe[:,None,None]
+
+        EV_suppress = discount * self._expect(V, "suppress")
+        mild = (q_mild * (base - cost_weight*c["supp_cost_mild"] + EV_suppress) +
+                (1-q_mild) * (base + discount * self._expect(V, "mild")))
+        severe = (q_severe * (base - cost_weight*c["supp_cost_severe"] + EV_suppress) +
+                  (1-q_severe) * (base - cost_weight*c["burn_cost"] + discount * self._expect(V, "severe")))
+        return (1-p) * mild + p * severe
+
+    def _ev_points(self, ev_points):
+        """Returns the midpoints of ev_points equal bins over the event range, and whether each is a
+        severe fire at each vulnerability grid point"""
+        c = self.c
+        width = (c["event_max"] - c["event_min"]) / ev_points
+        ev = c["event_min"] + width * (numpy.arange(ev_points) + 0.5)
+        severe = ev[None,:] >= (1 - self.vulnerability_grid)[:,None]
+        return ev, severe
+
+    def _policy_suppression_probs(self, policy, ev_points=1000):
+        """Returns a logistic policy's probability of suppressing mild and severe fires at each
+        vulnerability grid point, averaged over the ev values that give each severity"""
+        pol = SWM.sanitize_policy(policy)
+        ev, severe = self._ev_points(ev_points)
+
+        crossproduct = numpy.clip(pol[0] + pol[1]*ev, -100, 100)
+        policy_value = 1.0 / (1.0 + numpy.exp(-crossproduct))
+        if self.c["PROBABILISTIC_CHOICES"]:
+            suppress = policy_value
+        else:
+            suppress = (policy_value >= 0.5).astype(float)
+
+        mild = ~severe
+        q_mild = (mild * suppress).sum(axis=1) / numpy.maximum(mild.sum(axis=1), 1)
+        q_severe = (severe * suppress).sum(axis=1) / numpy.maximum(severe.sum(axis=1), 1)
+        return q_mild, q_severe
+
+    def _ev_choice_masses(self, suppress_mild, suppress_severe, occupancy, ev_points):
+        """Returns ev bin midpoints, the occupancy mass choosing to suppress in each bin, and the total mass"""
+        shape = self._flat_shape(numpy.size(occupancy) == self.shape[0] * self.shape[1])
+        occupancy = occupancy.reshape(shape)
+        by_vuln = occupancy.sum(axis=(1,2))
+        supp_mild = (occupancy * suppress_mild.reshape(shape)).sum(axis=(1,2))
+        supp_severe = (occupancy * suppress_severe.reshape(shape)).sum(axis=(1,2))
+
+        ev, severe = self._ev_points(ev_points)
+        supp_mass = numpy.where(severe, supp_severe[:,None], supp_mild[:,None]).sum(axis=0) / ev_points
+        total_mass = numpy.repeat(by_vuln.sum() / ev_points, ev_points)
+        return ev, supp_mass, total_mass
+
+    def _agreement(self, policy, suppress_mild, suppress_severe, occupancy, ev_points=1000):
+        """Returns the share of occupancy (and ev) where a logistic policy's deterministic choice
+        matches the given choices"""
+        q_mild, q_severe = self._policy_suppression_probs(policy, ev_points)
+        if self.c["PROBABILISTIC_CHOICES"]:
+            #agreement is about the choice rule, so compare the deterministic version of the policy
+            ev, severe = self._ev_points(ev_points)
+            pol = SWM.sanitize_policy(policy)
+            suppress = (pol[0] + pol[1]*ev) >= 0
+            q_mild = (~severe * suppress).sum(axis=1) / numpy.maximum((~severe).sum(axis=1), 1)
+            q_severe = (severe * suppress).sum(axis=1) / numpy.maximum(severe.sum(axis=1), 1)
+
+        shape = self._flat_shape(numpy.size(occupancy) == self.shape[0] * self.shape[1])
+        d = occupancy.reshape(shape)
+        p = self.p_severe[:,None,None]
+        sm = suppress_mild.reshape(shape)
+        ss = suppress_severe.reshape(shape)
+        q_mild = q_mild[:,None,None]
+        q_severe = q_severe[:,None,None]
+        agree = ((1-p) * numpy.where(sm, q_mild, 1-q_mild) + p * numpy.where(ss, q_severe, 1-q_severe))
+        return float(numpy.sum(d * agree) / numpy.sum(d))
+
+    def _habitat_transition(self, mild_increment, severe_increment):
+        """Returns the sparse transition matrix over (habitat, time since mild, time since severe) for
+        one choice and severity. A timer increment of None means that timer is reset to 0."""
+        c = self.c
+        nh = len(self.habitat_grid)
+        nm = self.mild_timer_count
+        ns = self.severe_timer_count
+
+        h, m, s = numpy.meshgrid(numpy.arange(nh), numpy.arange(nm), numpy.arange(ns), indexing="ij")
+        h = h.ravel()
+        m = m.ravel()
+        s = s.ravel()
+
+        #timers are capped one past the habitat maxima; beyond that, their exact values don't matter
+        if mild_increment is None: m_next = numpy.zeros_like(m)
+        else: m_next = numpy.minimum(m + mild_increment, nm - 1)
+        if severe_increment is None: s_next = numpy.zeros_like(s)
+        else: s_next = numpy.minimum(s + severe_increment, ns - 1)
+
+        mild_ok = (m_next <= c["habitat_mild_maximum"]) & (m_next >= c["habitat_mild_minimum"])
+        severe_ok = (s_next <= c["habitat_severe_maximum"]) & (s_next >= c["habitat_severe_minimum"])
+        change = numpy.where(mild_ok & severe_ok, c["habitat_gain"],
+                             -c["habitat_loss_if_no_mild"] * (~mild_ok) - c["habitat_loss_if_no_severe"] * (~severe_ok))
+
+        lo, hi, w = _interpolation(self.habitat_grid, self.habitat_grid[h] + change)
+        rows = numpy.arange(len(h))
+        cols_lo = (lo * nm + m_next) * ns + s_next
+        cols_hi = (hi * nm + m_next) * ns + s_next
+        size = nh * nm * ns
+        return scipy.sparse.csr_matrix((numpy.concatenate([1-w, w]),
+                                        (numpy.concatenate([rows, rows]), numpy.concatenate([cols_lo, cols_hi]))),
+                                       shape=(size, size))
+
+
+def solve(model_parameters={}, vulnerability_points=21, timber_points=11, habitat_points=11, discount=0.96,
+          tolerance=1e-4, habitat_weight=0, SILENT=False):
+    """Builds a DiscreteSWM and solves it by value iteration. Prints the optimal start value, the start values
+    of the fitted and the optimized logistic policies, and SWM's hand-picked policies for comparison, unless
+    SILENT. Returns the dictionary from DiscreteSWM.value_iteration()"""
+    model = DiscreteSWM(model_parameters, vulnerability_points, timber_points, habitat_points)
+    result = model.value_iteration(discount, tolerance, habitat_weight=habitat_weight)
+
+    if not SILENT:
+        print("States: " + str(model.size()) + "   iterations: " + str(result["Iterations"]))
+        print("Optimal start value:  " + str(round(result["Start Value"],3)))
+        print("Logistic fit " + str([round(b,3) for b in result["Logistic Fit"]]) + ": " +
+              str(round(result["Logistic Fit Start Value"],3)))
+        print("Best logistic " + str([round(b,3) for b in result["Logistic Policy"]]) + ": " +
+              str(round(result["Logistic Start Value"],3)) +
+              "   (agrees with the optimal choice " + str(round(100*result["Logistic Agreement"],1)) + "% of the time)")
+        for policy in ["LB", "SA", "CT"]:
+            value = model.evaluate_policy(policy, discount, tolerance, habitat_weight=habitat_weight)
+            print(policy + ": " + str(round(value["Start Value"],3)))
+
+    return result
+
+
+def _interpolation(grid, x):
+    """Returns the lower and upper grid indices around each x (clipped to the grid) and the weight of the upper one"""
+    x = numpy.clip(x, grid[0], grid[-1])
+    hi = numpy.clip(numpy.searchsorted(grid, x, side="right"), 1, len(grid) - 1)
+    lo = hi - 1
+    w = (x - grid[lo]) / (grid[hi] - grid[lo])
+    return lo, hi, w
+
+
+def _grid_transition(grid, change):
+    """Returns the (dense, but banded) matrix moving each grid point by change, clipped to the grid's bounds"""
+    n = len(grid)
+    lo, hi, w = _interpolation(grid, grid + change)
+    P = numpy.zeros((n, n))
+    numpy.add.at(P, (numpy.arange(n), lo), 1 - w)
+    numpy.add.at(P, (numpy.arange(n), hi), w)
+    return P
+
+
+def _start_weights(grid, low, high, fixed=None):
+    """Returns weights over a grid for a uniform draw from [low, high], or for a fixed value"""
+    if fixed is not None:
+        lo, hi, w = _interpolation(grid, numpy.array([fixed], dtype=float))
+        weights = numpy.zeros(len(grid))
+        weights[lo[0]] += 1 - w[0]
+        weights[hi[0]] += w[0]
+        return weights
+
+    #integrate the uniform density against each grid point's interpolation "tent"
+    x = numpy.linspace(low, high, 2001)
+    lo, hi, w = _interpolation(grid, x)
+    weights = numpy.zeros(len(grid))
+    numpy.add.at(weights, lo, 1 - w)
+    numpy.add.at(weights, hi, w)
+    return weights / weights.sum()
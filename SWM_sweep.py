@@ -0,0 +1,283 @@
+"""Adaptive sweep of SWM v1.3's value over the two logistic policy weights"""
+
+import json, math, os, numpy, scipy.stats
+import SWMv1_3 as SWM
+
+
+#the summary values recorded at each policy
+SWEEP_METRICS = ["Total Pathway Value", "Average Habitat Value"]
+
+
+class PolicySweep:
+    def __init__(self, timesteps=200, b0_range=[-20,20], b1_range=[-20,20], coarse_points=5, max_depth=4, seeds=32,
+                 start_seed=0, model_parameters={}, tolerance=None, metric="Total Pathway Value", confidence=0.95):
+        """Maps the mean and spread of SWM's pathway values over policy=[b0, b1], spending most of the
+        simulation on the regions where the value changes quickly or is uncertain.
+
+        The sweep starts with a coarse_points x coarse_points grid. Each square cell of the grid is scored
+        by how much the mean of metric changes across its corners, or by the widest confidence interval
+        at its corners, whichever is larger. Cells scoring above tolerance are split into four (by
+        evaluating their center and edge midpoints), most important first, until the budget given to
+        run() is spent, no cell is above tolerance, or every cell is max_depth splits deep.
+
+        Every policy is evaluated on the same seeds (start_seed up to start_seed + seeds), so the
+        differences between neighbouring points are not masked by seed-to-seed noise.
+
+        Arguements:
+        timesteps: the length of each pathway.
+        b0_range, b1_range: the [low, high] range of each policy weight.
+        coarse_points: the number of points along each axis of the starting grid (at least 2)
+        max_depth: the most times a coarse cell can be split.
+        seeds: the number of pathways simulated at each policy.
+        model_parameters: see SWM.simulate()
+        tolerance: cells whose score is above this are refined. Default=None, which uses a tenth of the
+             range of metric over the coarse grid.
+        metric: the summary value used to score cells, from SWEEP_METRICS
+        confidence: the coverage of the confidence intervals. Default=0.95
+        """
+        self.timesteps = int(timesteps)
+        self.b0_range = [float(b) for b in b0_range]
+        self.b1_range = [float(b) for b in b1_range]
+        self.coarse_points = int(coarse_points)
+        self.max_depth = int(max_depth)
+        self.seeds = int(seeds)
+        self.start_seed = start_seed
+        self.model_parameters = dict(model_parameters)
+        self.tolerance = tolerance
+        self.metric = metric
+        self.confidence = confidence
+
+        #points are keyed by their integer coordinates on the finest (max_depth) lattice. Each holds
+        # [count, mean, sum of squared deviations] for every metric
+        self.points = {}
+
+        #the unsplit cells, as (depth, i, j) for the cell whose lower corner is lattice point
+        # (i, j) * 2**(max_depth - depth)
+        self.cells = [(0, i, j) for i in range(self.coarse_points - 1) for j in range(self.coarse_points - 1)]
+
+    def run(self, budget=500, workers=None, sweep_file=None, SILENT=False):
+        """Evaluates the coarse grid (if it hasn't been yet), then refines cells until budget policy points
+        (each simulated on every seed) have been evaluated in total. Calling run() again with a larger budget,
+        on this sweep or one loaded from sweep_file, picks up where it left off.
+
+        workers: integer; the number of worker processes. See SWM.simulate_parallel()
+        sweep_file: optional path to a JSON file, which the sweep is saved to after every round
+
+        Returns the dictionary from surface()
+        """
+        step = self._step(0)
+        coarse = [(i*step, j*step) for i in range(self.coarse_points) for j in range(self.coarse_points)]
+        self._evaluate([p for p in coarse if p not in self.points], workers)
+        if sweep_file is not None: self.save(sweep_file)
+
+        if self.tolerance is None:
+            means = [self.points[p][self.metric][1] for p in coarse]
+            self.tolerance = 0.1 * (max(means) - min(means))
+
+        while len(self.points) < budget:
+            #score the cells that can still be split, most important first
+            scored = []
+            for cell in self.cells:
+                if cell[0] < self.max_depth:
+                    score = self._score(cell)
+                    if score > self.tolerance: scored.append((score, cell))
+            if len(scored) == 0: break
+            scored.sort(reverse=True)
+
+            #split as many as the budget allows, evaluating all of their new points together
+            to_split = []
+            new_points = set()
+            for score, cell in scored:
+                cell_points = set(self._new_points(cell)) - set(self.points)
+                if len(self.points) + len(new_points | cell_points) > budget: break
+                to_split.append(cell)
+                new_points |= cell_points
+            if len(to_split) == 0: break
+
+            self._evaluate(sorted(new_points), workers)
+            for cell in to_split:
+                self.cells.remove(cell)
+                self.cells.extend(self._children(cell))
+            if sweep_file is not None: self.save(sweep_file)
+
+            if not SILENT:
+                print("Split " + str(len(to_split)) + " cells: " + str(len(self.points)) + " of " + str(budget) +
+                      " policies evaluated, " + str(len(self.cells)) + " cells")
+
+        return self.surface()
+
+    def surface(self):
+        """Returns the sweep as a grid over the finest lattice that has been evaluated.
+
+        RETURNS
+        -------
+        A dictionary with the "b0" and "b1" axes, an "Evaluated" mask (b0 by b1), and for each metric
+        in SWEEP_METRICS, its "Mean", "STD", "CI Low" and "CI High" arrays, as "Mean Total Pathway Value"
+        and so on. Lattice points that were not evaluated are interpolated (bilinearly) from the corners of
+        the cell they lie in. "Points" lists every evaluated point as a dictionary of the same values.
+        """
+        depth = max(cell[0] for cell in self.cells)
+        step = self._step(depth)
+        n = (self.coarse_points - 1) * 2**depth + 1
+        b0 = numpy.linspace(self.b0_range[0], self.b0_range[1], n)
+        b1 = numpy.linspace(self.b1_range[0], self.b1_range[1], n)
+
+        fields = {}
+        for m in SWEEP_METRICS:
+            for name in ["Mean", "STD", "CI Low", "CI High"]:
+                fields[name + " " + m] = numpy.zeros((n, n))
+        evaluated = numpy.zeros((n, n), dtype=bool)
+
+        point_values = dict((p, self._point_values(p)) for p in self.points)
+        for cell in self.cells:
+            cell_step = self._step(cell[0])
+            corners = self._corners(cell)
+            i0, j0 = corners[0]
+            for di in range(0, cell_step + 1, step):
+                for dj in range(0, cell_step + 1, step):
+                    x, y = di / float(cell_step), dj / float(cell_step)
+                    weights = [(1-x)*(1-y), x*(1-y), (1-x)*y, x*y]
+                    gi, gj = (i0 + di) // step, (j0 + dj) // step
+                    if (i0 + di, j0 + dj) in point_values:
+                        values = point_values[(i0 + di, j0 + dj)]
+                        evaluated[gi, gj] = True
+                    else:
+                        values = dict((k, sum(w * point_values[c][k] for w, c in zip(weights, corners))) for k in fields)
+                    for k in fields:
+                        fields[k][gi, gj] = values[k]
+
+        points = []
+        for p in sorted(self.points):
+            record = {"Policy": self._policy(p), "Seeds": self.points[p][self.metric][0]}
+            record.update(point_values[p])
+            points.append(record)
+
+        result = {"b0": b0, "b1": b1, "Evaluated": evaluated, "Points": points}
+        result.update(fields)
+        return result
+
+    def save(self, sweep_file):
+        """Writes the sweep's settings, points and cells to a JSON file"""
+        saved = {
+                 "Settings": self._settings(),
+                 "Points": [[p[0], p[1], self.points[p]] for p in sorted(self.points)],
+                 "Cells": [list(cell) for cell in self.cells]
+                }
+        with open(sweep_file + ".tmp", "w") as f:
+            json.dump(saved, f)
+        #replace the old file in one step, so a crash can't leave a half-written one
+        os.replace(sweep_file + ".tmp", sweep_file)
+
+    @classmethod
+    def load(cls, sweep_file):
+        """Returns the PolicySweep saved in sweep_file, ready to run() further"""
+        with open(sweep_file) as f:
+            saved = json.load(f)
+        sweep = cls(**saved["Settings"])
+        sweep.points = dict(((i, j), stats) for i, j, stats in saved["Points"])
+        sweep.cells = [tuple(cell) for cell in saved["Cells"]]
+        return sweep
+
+    def _settings(self):
+        return {
+                "timesteps": self.timesteps,
+                "b0_range": self.b0_range,
+                "b1_range": self.b1_range,
+                "coarse_points": self.coarse_points,
+                "max_depth": self.max_depth,
+                "seeds": self.seeds,
+                "start_seed": self.start_seed,
+                "model_parameters": self.model_parameters,
+                "tolerance": self.tolerance,
+                "metric": self.metric,
+                "confidence": self.confidence
+               }
+
+    def _step(self, depth):
+        """The lattice spacing of a cell at the given depth"""
+        return 2**(self.max_depth - depth)
+
+    def _policy(self, point):
+        """Returns the [b0, b1] policy at a lattice point"""
+        n = (self.coarse_points - 1) * 2**self.max_depth
+        return [self.b0_range[0] + (self.b0_range[1] - self.b0_range[0]) * point[0] / float(n),
+                self.b1_range[0] + (self.b1_range[1] - self.b1_range[0]) * point[1] / float(n)]
+
+    def _corners(self, cell):
+        step = self._step(cell[0])
+        i0, j0 = cell[1]*step, cell[2]*step
+        return [(i0, j0), (i0+step, j0), (i0, j0+step), (i0+step, j0+step)]
+
+    def _new_points(self, cell):
+        """The center and edge midpoints that splitting a cell adds"""
+        half = self._step(cell[0]) // 2
+        i0, j0 = cell[1]*2*half, cell[2]*2*half
+        return [(i0+half, j0+half), (i0+half, j0), (i0+half, j0+2*half), (i0, j0+half), (i0+2*half, j0+half)]
+
+    def _children(self, cell):
+        depth, i, j = cell
+        return [(depth+1, 2*i+di, 2*j+dj) for di in (0,1) for dj in (0,1)]
+
+    def _score(self, cell):
+        """The larger of the change in the mean of metric across a cell's corners, and its corners' widest
+        confidence interval half-width"""
+        corners = [self.points[p][self.metric] for p in self._corners(cell)]
+        means = [c[1] for c in corners]
+        return max(max(means) - min(means), max(self._half_width(c) for c in corners))
+
+    def _half_width(self, stats):
+        count, mean, M2 = stats
+        if count < 2: return float("inf")
+        return float(scipy.stats.t.ppf(0.5 + self.confidence/2.0, count - 1)) * math.sqrt(M2 / (count - 1) / count)
+
+    def _point_values(self, point):
+        values = {}
+        for m in SWEEP_METRICS:
+            stats = self.points[point][m]
+            count, mean, M2 = stats
+            half_width = self._half_width(stats)
+            values["Mean " + m] = mean
+            values["STD " + m] = math.sqrt(M2 / (count - 1)) if count > 1 else 0.0
+            values["CI Low " + m] = mean - half_width
+            values["CI High " + m] = mean + half_width
+        return values
+
+    def _evaluate(self, new_points, workers):
+        """Simulates every seed at each of the new points, in one parallel batch"""
+        if len(new_points) == 0: return
+        seeds = list(range(self.start_seed, self.start_seed + self.seeds))
+        policies = [self._policy(p) for p in new_points for s in seeds]
+        results = SWM.simulate_parallel(self.timesteps, policies, seeds * len(new_points), self.model_parameters,
+                                        workers=workers)
+
+        for k, p in enumerate(new_points):
+            block = results[k*self.seeds:(k+1)*self.seeds]
+            self.points[p] = {}
+            for m in SWEEP_METRICS:
+                values = numpy.array([r[m] for r in block], dtype=float)
+                self.points[p][m] = [len(values), float(values.mean()), float(((values - values.mean())**2).sum())]
+
+
+def policy_sweep(timesteps=200, b0_range=[-20,20], b1_range=[-20,20], coarse_points=5, max_depth=4, seeds=32,
+                 budget=500, start_seed=0, model_parameters={}, tolerance=None, workers=None, sweep_file=None,
+                 SILENT=False):
+    """Runs an adaptive PolicySweep (see PolicySweep for the arguements) and returns its surface(). If
+    sweep_file already exists, the sweep is loaded from it and resumed, and a ValueError is raised if it
+    was saved with different settings (tolerance=None accepts whichever tolerance the saved sweep chose)."""
+    sweep = PolicySweep(timesteps, b0_range, b1_range, coarse_points, max_depth, seeds, start_seed,
+                        model_parameters, tolerance)
+    if (sweep_file is not None) and os.path.exists(sweep_file):
+        saved = PolicySweep.load(sweep_file)
+        #compared as they read back from the file
+        settings = json.loads(json.dumps(SWM._plain_values(sweep._settings())))
+        saved_settings = saved._settings()
+        if tolerance is None:
+            settings.pop("tolerance")
+            saved_settings.pop("tolerance")
+        changed = [key for key in sorted(settings) if settings[key] != saved_settings[key]]
+        if len(changed) > 0:
+            raise ValueError("The sweep in " + sweep_file + " was saved with different settings: " +
+                             ", ".join(key + " " + repr(saved_settings[key]) + " != " + repr(settings[key])
+                                       for key in changed))
+        sweep = saved
+    return sweep.run(budget, workers, sweep_file, SILENT)
@@ -1,8 +1,30 @@
 """SWM, A Simple Wildfire-inspired MDP model. Version 1.3"""
 
-import random, math, numpy, MDP
-
-def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT=False):
+import random, math, os, time, json, numpy, MDP
+import concurrent.futures
+
+#identifies the model dynamics, for anything (e.g. a result cache) that needs to know when they change
+MODEL_VERSION = "1.3"
+
+#every key simulate() reads from its model_parameters dictionary
+MODEL_PARAMETER_KEYS = [
+                        "Suppression Cost - Mild Event",
+                        "Suppression Cost - Severe Event",
+                        "Severe Burn Cost",
+                        "Vulnerability Change After Suppression",
+                        "Vulnerability Change After Mild",
+                        "Vulnerability Change After Severe",
+                        "Timber Value Change After Suppression",
+                        "Timber Value Change After Mild",
+                        "Timber Value Change After Severe",
+                        "Probabilistic Choices",
+                        "Starting Vulnerability",
+                        "Starting Timber Value",
+                        "Starting Habitat Value"
+                       ]
+
+def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT=False, COLUMNAR=False, tape=None,
+             stats=None):
     """SWM v1.3 simulation function
 
     PARAMETERS
@@ -48,92 +70,1066 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
 
     SILENT: boolean; Should the model suppress it's results to standard out. Default=False
 
+    COLUMNAR: boolean; If True, the states are recorded in a PathwayStates object, which holds one typed
+         numpy array per field instead of one list per timestep. It can still be indexed as States[i][k].
+         Default=False
+
+    tape: optional EventTape. If given, the pathway replays the tape's pre-drawn random numbers instead
+         of seeding the random module, and the tape's random_seed is reported as its "ID Number".
+         Default=None
+
+    stats: optional SimulationStats object. If given, the model loop adds its per-phase timings and
+         counters to stats (with the same results).
+         Default=None, which runs the uninstrumented loop, so the instrumentation costs nothing.
+
 
     RETURNS
     -------
     A dictionary containing all information about the simulation. 
     """    
     
-    random.seed(random_seed)
-    
-    #range of the randomly drawn, uniformally distributed "event" that corresponds to fire severity
-    event_max = 1.0
-    event_min = 0.0
+    if tape is None:
+        random.seed(random_seed)
+        rng = random
+    else:
+        random_seed = tape.random_seed
+        rng = tape.reader(timesteps)
 
-    #state variable bounds
-    vuln_max = 1.0
-    vuln_min = 0.02
+    timesteps = int(timesteps)
 
-    timber_max = 10.0
-    timber_min = 0.0
-    
 
+    #sanitize policy
+    pol = sanitize_policy(policy)
 
 
-    timesteps = int(timesteps)
+    #model constants, with any values given in model_parameters
+    c = _parse_model_parameters(model_parameters)
 
+    #without a tape, the random module itself is passed as the generator, so simulate() draws from
+    # the global sequence it has just seeded
+    if stats is None:
+        steps = _simulate_steps(timesteps, pol, c, rng)
+        summary, vals, hab = _run_pathway(steps, timesteps, random_seed, policy, c, COLUMNAR)
+    else:
+        summary, vals, hab = _run_pathway_instrumented(timesteps, pol, c, rng, random_seed, policy, COLUMNAR, stats)
 
-    #sanitize policy
+    if not SILENT:
+        _print_summary(summary, vals, hab)
+
+    return summary
+
+
+def simulate_iter(timesteps, policy=[0,0], random_seed=0, model_parameters={}, summary=None, tape=None):
+    """Generator version of simulate(), which yields each timestep's state as soon as it is simulated,
+    without holding the rest of the pathway in memory.
+
+    PARAMETERS
+    ----------
+    timesteps, policy, random_seed, model_parameters: see simulate(). The draws come from a private
+         random.Random(random_seed) generator, which produces the same sequence simulate() does, but
+         leaves the global random module alone.
+
+    summary: optional RunningSummary object. Each state is added to it before being yielded, so that
+         summary.summary() gives the same aggregates as simulate() (to within floating-point rounding)
+         for however many timesteps were consumed.
+
+    tape: optional EventTape to replay instead of drawing from random_seed. See simulate()
+
+
+    YIELDS
+    ------
+    One state list per timestep, in the same format as simulate()'s "States" entries:
+        [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
+    """
+
+    timesteps = int(timesteps)
     pol = sanitize_policy(policy)
+    c = _parse_model_parameters(model_parameters)
 
+    if tape is None:
+        rng = random.Random(random_seed)
+    else:
+        random_seed = tape.random_seed
+        rng = tape.reader(timesteps)
 
-    #REWARD STRUCTURE
-    
-    #cost of suppression in a mild event
-    supp_cost_mild = 9
-    if "Suppression Cost - Mild Event" in model_parameters.keys(): supp_cost_mild = model_parameters["Suppression Cost - Mild Event"]
+    if summary is not None:
+        summary.start(random_seed, policy, c)
 
-    #cost of suppresion in a severe event
-    supp_cost_severe = 13
-    if "Suppression Cost - Severe Event" in model_parameters.keys(): supp_cost_severe = model_parameters["Suppression Cost - Severe Event"]
+    for state in _simulate_steps(timesteps, pol, c, rng):
+        if summary is not None:
+            summary.update(state)
+        yield state
 
-    #cost of a severe fire on the next timestep
-    burn_cost = 40
-    if "Severe Burn Cost" in model_parameters.keys(): burn_cost = model_parameters["Severe Burn Cost"]
 
+def simulate_batch(timesteps, policies, seeds, model_parameters={}, KEEP_STATES=True, EXACT=True, COLUMNAR=False,
+                   tapes=None):
+    """Simulates many SWM v1.3 pathways in lockstep, holding each state variable as a numpy array
+    over all of the pathways, so that every timestep is a handful of array operations.
 
-    #TRANSITION VARIABLES
+    PARAMETERS
+    ----------
+    timesteps: integer; how many timesteps to move each pathway forward.
 
-    vuln_change_after_suppression = 0.01
-    vuln_change_after_mild = -0.01
-    vuln_change_after_severe = -0.015
-    if "Vulnerability Change After Suppression" in model_parameters.keys(): vuln_change_after_suppression = model_parameters["Vulnerability Change After Suppression"]
-    if "Vulnerability Change After Mild" in model_parameters.keys(): vuln_change_after_mild = model_parameters["Vulnerability Change After Mild"]
-    if "Vulnerability Change After Severe" in model_parameters.keys(): vuln_change_after_severe = model_parameters["Vulnerability Change After Severe"]
+    policies: either a single policy, which is used for every pathway, or a list containing one
+         policy per seed. Each policy can be anything that sanitize_policy() accepts.
 
-    timber_change_after_suppression = 0.1
-    timber_change_after_mild = 0.1
-    timber_change_after_severe = -5.0
-    if "Timber Value Change After Suppression" in model_parameters.keys(): timber_change_after_suppression = model_parameters["Timber Value Change After Suppression"]
-    if "Timber Value Change After Mild" in model_parameters.keys(): timber_change_after_mild = model_parameters["Timber Value Change After Mild"]
-    if "Timber Value Change After Severe" in model_parameters.keys(): timber_change_after_severe = model_parameters["Timber Value Change After Severe"]
+    seeds: a list of random seeds, one per pathway. Each pathway draws exactly the same random
+         numbers that simulate() would draw for that seed, without touching the global random module.
 
+    model_parameters: see simulate(). Any value except "Probabilistic Choices" can also be a sequence
+         holding one value per pathway, so that one batch can cover many parameter settings.
 
-    PROBABILISTIC_CHOICES = False
-    if "Probabilistic Choices" in model_parameters.keys():
-        if model_parameters["Probabilistic Choices"] == "True":
-            PROBABILISTIC_CHOICES = True
+    KEEP_STATES: boolean; if True, each summary includes a "States" list in the same format as
+         simulate(). Building those lists is the slowest part of a batch, so set this to False when
+         only the summary values are needed. Default=True
+
+    EXACT: boolean; if True, the logistic policy function is evaluated with math.exp for each event,
+         so that all values are bit-identical to simulate(). If False, numpy.exp is used instead, which
+         is faster but can differ from simulate() in the last digit of the probabilities. Default=True
+
+    COLUMNAR: boolean; if True, each "States" entry is a PathwayStates object whose columns are views
+         into the batch's arrays, rather than a list of lists. Default=False
+
+    tapes: optional EventTape, or list of one EventTape per pathway. Pathways replay their tape instead
+         of drawing from their seed; seeds can then be None, to use each tape's random_seed.
+
+
+    RETURNS
+    -------
+    A list of dictionaries, one per seed and in the same order, each with the same keys as the
+    dictionary returned by simulate().
+    """
+
+    timesteps = int(timesteps)
+    tapes, seeds = _expand_tapes(tapes, seeds, timesteps)
+    pathway_count = len(seeds)
+    policy_list = _expand_policies(policies, pathway_count)
+    if pathway_count == 0: return []
+
+    pols = [sanitize_policy(p) for p in policy_list]
+    b0 = numpy.array([p[0] for p in pols], dtype=float)
+    b1 = numpy.array([p[1] for p in pols], dtype=float)
+
+    c = _per_pathway_constants(model_parameters, pathway_count)
+
+    #the three starting values are always drawn, even when model_parameters overrides them
+    if tapes is None:
+        #each pathway gets its own generator, seeded the same way as simulate() seeds the random module
+        generators = [_numpy_random_state(s) for s in seeds]
+        starts = numpy.array([g.random_sample(3) for g in generators])
+    else:
+        starts = numpy.array([t.starts for t in tapes])
+    current_vulnerability = 0.2 + (0.8 - 0.2) * starts[:,0]
+    if c["starting_vulnerability"] is not None:
+        current_vulnerability = numpy.full(pathway_count, c["starting_vulnerability"], dtype=float)
+    current_timber = 2.0 + (8.0 - 2.0) * starts[:,1]
+    if c["starting_timber"] is not None:
+        current_timber = numpy.full(pathway_count, c["starting_timber"], dtype=float)
+    current_habitat = 2.0 + (8.0 - 2.0) * starts[:,2]
+    if c["starting_habitat"] is not None:
+        current_habitat = numpy.full(pathway_count, c["starting_habitat"], dtype=float)
+    time_since_severe = numpy.zeros(pathway_count, dtype=int)
+    time_since_mild = numpy.zeros(pathway_count, dtype=int)
+
+    #per-step records, one row per pathway
+    rewards = numpy.empty((pathway_count, timesteps))
+    habitats = numpy.empty((pathway_count, timesteps))
+    if KEEP_STATES:
+        vulnerabilities = numpy.empty((pathway_count, timesteps))
+        timbers = numpy.empty((pathway_count, timesteps))
+        evs = numpy.empty((pathway_count, timesteps))
+        choices = numpy.empty((pathway_count, timesteps), dtype=bool)
+        choice_probs = numpy.empty((pathway_count, timesteps))
+        policy_values = numpy.empty((pathway_count, timesteps))
+
+    #running summary values, accumulated in the same order as simulate()
+    suppressions = numpy.zeros(pathway_count)
+    joint_prob = numpy.ones(pathway_count)
+    log_joint_prob = numpy.zeros(pathway_count)
+    prob_sum = numpy.zeros(pathway_count)
+
+    for i in range(timesteps):
+
+        #random numbers are drawn in blocks, to keep the per-pathway generator calls out of the step loop
+        j = i % _DRAW_BLOCK
+        if j == 0:
+            steps = min(_DRAW_BLOCK, timesteps - i)
+            if tapes is None:
+                draws = numpy.array([g.random_sample(2 * steps) for g in generators])
+                ev_block = draws[:,0::2]
+                roll_block = draws[:,1::2]
+            else:
+                ev_block = numpy.array([t.ev[i:i+steps] for t in tapes])
+                roll_block = numpy.array([t.choice_roll[i:i+steps] for t in tapes])
+
+        ev = c["event_min"] + (c["event_max"] - c["event_min"]) * ev_block[:,j]
+        severe = ev >= (1 - current_vulnerability)
+
+        #logistic function for the policy choice
+        policy_crossproduct = numpy.clip(b0 + b1*ev, -100, 100)
+        if EXACT:
+            policy_value = 1.0 / (1.0 + _exact_exp(-policy_crossproduct).astype(float))
+        else:
+            policy_value = 1.0 / (1.0 + numpy.exp(-policy_crossproduct))
+
+        choice_roll = roll_block[:,j]
+        if c["PROBABILISTIC_CHOICES"]:
+            choice = choice_roll < policy_value
         else:
-            PROBABILISTIC_CHOICES = False
+            choice = policy_value >= 0.5
+        choice_prob = numpy.where(choice, policy_value, 1.0 - policy_value)
 
+        ### CALCULATE REWARD ###
+        supp_cost = numpy.where(choice, numpy.where(severe, c["supp_cost_severe"], c["supp_cost_mild"]), 0)
+        burn_penalty = numpy.where(~choice & severe, c["burn_cost"], 0)
+        rewards[:,i] = 10 + current_timber - supp_cost - burn_penalty
+        habitats[:,i] = current_habitat
+        if KEEP_STATES:
+            vulnerabilities[:,i] = current_vulnerability
+            timbers[:,i] = current_timber
+            evs[:,i] = ev
+            choices[:,i] = choice
+            choice_probs[:,i] = choice_prob
+            policy_values[:,i] = policy_value
+
+        suppressions += choice
+        joint_prob *= choice_prob
+        with numpy.errstate(divide="ignore"):
+            log_joint_prob += numpy.log(choice_prob)
+        prob_sum += choice_prob
 
-    #habitat transition variables
-    habitat_mild_maximum = 15
-    habitat_mild_minimum = 0
-    habitat_severe_maximum = 40
-    habitat_severe_minimum = 10
-    habitat_loss_if_no_mild = 0.2
-    habitat_loss_if_no_severe = 0.2
-    habitat_gain = 0.1
+        ### TRANSITION ###
+        burned_severe = ~choice & severe
+        burned_mild = ~choice & ~severe
+        current_vulnerability += numpy.where(choice, c["vuln_change_after_suppression"],
+                                 numpy.where(severe, c["vuln_change_after_severe"], c["vuln_change_after_mild"]))
+        current_timber += numpy.where(choice, c["timber_change_after_suppression"],
+                          numpy.where(severe, c["timber_change_after_severe"], c["timber_change_after_mild"]))
+        time_since_severe = numpy.where(burned_severe, 0, time_since_severe + 1)
+        time_since_mild = numpy.where(burned_mild, 0, time_since_mild + 1)
+
+        #check for habitat changes. The two losses are applied one after the other, as in simulate()
+        no_mild = (time_since_mild > c["habitat_mild_maximum"]) | (time_since_mild < c["habitat_mild_minimum"])
+        no_severe = (time_since_severe > c["habitat_severe_maximum"]) | (time_since_severe < c["habitat_severe_minimum"])
+        current_habitat = numpy.where(~no_mild & ~no_severe, current_habitat + c["habitat_gain"], current_habitat)
+        current_habitat = numpy.where(no_mild, current_habitat - c["habitat_loss_if_no_mild"], current_habitat)
+        current_habitat = numpy.where(no_severe, current_habitat - c["habitat_loss_if_no_severe"], current_habitat)
+
+        #Enforce state variable bounds
+        current_vulnerability = numpy.maximum(numpy.minimum(current_vulnerability, c["vuln_max"]), c["vuln_min"])
+        current_timber = numpy.maximum(numpy.minimum(current_timber, c["timber_max"]), c["timber_min"])
+        current_habitat = numpy.maximum(numpy.minimum(current_habitat, c["habitat_max"]), c["habitat_min"])
+
+
+    #finished simulations, build a summary for each pathway
+    results = [None] * pathway_count
+    for n in range(pathway_count):
+        summary = _build_summary(rewards[n], habitats[n], float(suppressions[n]), float(joint_prob[n]),
+                                 float(log_joint_prob[n]), float(prob_sum[n]), seeds[n], timesteps,
+                                 policy_list[n], _pathway_constants(c, n))
+        if KEEP_STATES and COLUMNAR:
+            summary["States"] = PathwayStates(columns={"vulnerability": vulnerabilities[n], "timber": timbers[n],
+                                                       "ev": evs[n], "choice": choices[n],
+                                                       "choice_prob": choice_probs[n],
+                                                       "policy_value": policy_values[n], "reward": rewards[n],
+                                                       "habitat": habitats[n]})
+        elif KEEP_STATES:
+            summary["States"] = [list(s) for s in zip(vulnerabilities[n].tolist(), timbers[n].tolist(),
+                                                      evs[n].tolist(), choices[n].tolist(),
+                                                      choice_probs[n].tolist(), policy_values[n].tolist(),
+                                                      rewards[n].tolist(), habitats[n].tolist(),
+                                                      range(timesteps))]
+        results[n] = summary
+
+    return results
+
+
+def simulate_parallel(timesteps, policies, seeds, model_parameters={}, workers=None, chunk_size=None, KEEP_STATES=False,
+                      COLUMNAR=False, tapes=None, executor=None):
+    """Simulates one pathway per seed across a pool of worker processes
+
+    The (policy, seed) jobs are split into contiguous chunks, and each worker runs its chunk through
+    simulate_batch(). Every pathway is seeded only from its own seed, so the results do not depend on
+    the number of workers or the chunk size, and are identical to calling simulate() on each job in turn.
+
+    PARAMETERS
+    ----------
+    timesteps: integer; how many timesteps to move each pathway forward.
+
+    policies: either a single policy, which is used for every pathway, or a list containing one
+         policy per seed. See simulate_batch()
+
+    seeds: a list of random seeds, one per pathway.
+
+    model_parameters: see simulate_batch()
+
+    workers: integer; the number of worker processes. Default=None, which uses one per CPU. A value of 1
+         runs every chunk in this process, without a pool.
+
+    chunk_size: integer; how many pathways are sent to a worker at once. Default=None, which splits
+         the jobs into about four chunks per worker.
+
+    KEEP_STATES: boolean; if True, each summary includes its "States" list. These are large, and have to
+         be copied back from the workers, so this defaults to False.
+
+    COLUMNAR: boolean; if True, each "States" entry is a PathwayStates object. These are much cheaper
+         to copy back from the workers than lists of lists. Default=False
+
+    tapes: optional EventTape, or list of one EventTape per pathway, to replay. See simulate_batch()
+
+    executor: optional concurrent.futures executor (e.g. a ProcessPoolExecutor) to run the chunks on. Keeping
+         one open across many calls saves starting a new pool of processes for each call, which can take
+         longer than a small batch itself. workers then only sets the chunk size. Default=None
+
+
+    RETURNS
+    -------
+    A list of summary dictionaries, one per seed and in the same order as seeds.
+    """
+    tapes, seeds = _expand_tapes(tapes, seeds, timesteps)
+    policy_list = _expand_policies(policies, len(seeds))
+    if len(seeds) == 0: return []
+
+    if workers is None: workers = os.cpu_count() or 1
+    if chunk_size is None: chunk_size = max(1, int(math.ceil(len(seeds) / float(workers * 4))))
+
+    shards = []
+    for start in range(0, len(seeds), chunk_size):
+        shard_tapes = None if tapes is None else tapes[start:start+chunk_size]
+        shards.append((timesteps, policy_list[start:start+chunk_size], seeds[start:start+chunk_size],
+                       _slice_model_parameters(model_parameters, start, start+chunk_size), KEEP_STATES, COLUMNAR,
+                       shard_tapes))
+
+    if executor is not None:
+        #executor.map returns results in submission order, regardless of which finishes first
+        shard_results = list(executor.map(_simulate_shard, shards))
+    elif workers == 1:
+        shard_results = map(_simulate_shard, shards)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            #executor.map returns results in submission order, regardless of which finishes first
+            shard_results = list(executor.map(_simulate_shard, shards))
+
+    results = []
+    for r in shard_results:
+        results.extend(r)
+
+    return results
 
 
-    #starting_condition = 0.8
-    starting_Vulnerability = random.uniform(0.2,0.8)
-    if "Starting Vulnerability" in model_parameters.keys(): starting_condition = model_parameters["Starting Condition"]
-    starting_timber = random.uniform(2,8)
-    if "Starting Timber Value" in model_parameters.keys(): starting_timber = model_parameters["Starting Timber Value"]
-    starting_habitat = random.uniform(2,8)
-    if "Starting Habitat Value" in model_parameters.keys(): starting_habitat = model_parameters["Starting Habitat Value"]
+def simulate_all_policies(timesteps=10000, start_seed=0, workers=1):
+    """Simulates and prints the coin-toss, suppress-all, let-burn and "known" policies on the same seed.
+    All four replay one EventTape, so they face exactly the same fires (common random numbers).
+    Setting workers to more than 1 runs the four pathways in parallel, with the same results."""
+
+    policies = [[0,0,0.0], [-20,0,0.0], [20,0,0.0], [0,20,-0.8]]
+    tape = EventTape(timesteps, start_seed)
+    result_CT, result_LB, result_SA, result_KNOWN = simulate_parallel(timesteps, policies, None, workers=workers,
+                                                                      tapes=[tape]*4)
+
+    result_CT["Name"] = "Coin-Toss:    "
+    result_SA["Name"] = "Suppress-All: "
+    result_LB["Name"] = "Let-burn:     "
+    result_KNOWN["Name"] = "Known:        "
+
+    results = [result_CT, result_SA, result_LB, result_KNOWN]
+    print("Policy            Ave    STD    SupRate  AveProb  JointProb")
+    for r in results:
+        print(r["Name"] + "   "),
+        print(str(r["Average State Value"]) + "   "),
+        print(str(r["STD State Value"]) + "   "),
+        print(str(r["Suppression Rate"]) + "      "),
+        print(str(r["Average Probability"]) + "    "),
+        print(str(r["Joint Probability"]))
+
+class EventTape:
+    def __init__(self, timesteps=0, random_seed=0, starts=None, ev=None, choice_roll=None):
+        """Pre-drawn random numbers for one pathway, for replaying under any number of policies.
+
+        Each SWM timestep uses two uniform draws, the event value and the choice roll, and every pathway
+        starts with three more (for its starting vulnerability, timber and habitat). A tape draws all of
+        them at once as numpy arrays, in the same order simulate() draws them, so replaying the tape for
+        random_seed gives exactly the same pathway as simulate() with that seed. Replaying one tape under
+        several policies compares them with common random numbers by construction.
+
+        Arguements:
+        timesteps: integer: the longest horizon this tape can be replayed for
+        random_seed: any value random.seed() accepts. It is reported as the "ID Number" of pathways replayed
+          from this tape
+        starts, ev, choice_roll: optional arrays of uniform [0,1) draws to use instead of drawing them from
+          random_seed: three starting draws, and one event draw and one choice roll per timestep
+        """
+        self.random_seed = random_seed
+        if ev is None:
+            draws = _numpy_random_state(random_seed).random_sample(3 + 2*int(timesteps))
+            self.starts = draws[:3]
+            self.ev = draws[3::2]
+            self.choice_roll = draws[4::2]
+        else:
+            self.starts = numpy.asarray(starts, dtype=float)
+            self.ev = numpy.asarray(ev, dtype=float)
+            self.choice_roll = numpy.asarray(choice_roll, dtype=float)
+
+    def __len__(self):
+        return len(self.ev)
+
+    def reader(self, timesteps):
+        """Returns an object with a uniform(a,b) method, like the random module's, that hands out
+        this tape's draws in order. Used by simulate() and simulate_iter()."""
+        if len(self) < timesteps:
+            raise ValueError("An EventTape of " + str(len(self)) + " timesteps can't be replayed for " + str(timesteps) + " timesteps")
+        draws = numpy.empty(3 + 2*len(self))
+        draws[:3] = self.starts
+        draws[3::2] = self.ev
+        draws[4::2] = self.choice_roll
+        return _TapeReader(draws)
+
+
+class _TapeReader:
+    def __init__(self, draws):
+        self._next = iter(draws.tolist()).__next__
+
+    def uniform(self, a, b):
+        return a + (b-a) * self._next()
+
+
+class PathwayStates:
+    """Columnar storage for the per-timestep states of one SWM pathway.
+
+    Each field is held in its own preallocated, typed numpy array, with one entry per timestep. Indexing
+    with a timestep returns that timestep's state as a list in the same order simulate() uses, so code
+    written for States[i][k] still works:
+
+        [vulnerability, timber, ev, choice, choice_prob, policy_value, reward, habitat, index]
+    """
+
+    fields = ["vulnerability", "timber", "ev", "choice", "choice_prob", "policy_value", "reward", "habitat", "index"]
+
+    def __init__(self, timesteps=0, columns=None):
+        """Instantiation
+        Arguements:
+        timesteps: integer: the number of timesteps to allocate space for.
+        columns: optional dictionary of existing arrays, keyed by field name, to use instead of allocating
+          new ones. These are used as-is, without copying. The "index" field can be left out.
+        """
+        if columns is None:
+            self.vulnerability = numpy.empty(timesteps)
+            self.timber = numpy.empty(timesteps)
+            self.ev = numpy.empty(timesteps)
+            self.choice = numpy.zeros(timesteps, dtype=bool)
+            self.choice_prob = numpy.empty(timesteps)
+            self.policy_value = numpy.empty(timesteps)
+            self.reward = numpy.empty(timesteps)
+            self.habitat = numpy.empty(timesteps)
+            self.index = numpy.arange(timesteps)
+        else:
+            for f in self.fields:
+                if f in columns: setattr(self, f, columns[f])
+            if "index" not in columns: self.index = numpy.arange(len(self.reward))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return [float(self.vulnerability[i]), float(self.timber[i]), float(self.ev[i]), bool(self.choice[i]),
+                float(self.choice_prob[i]), float(self.policy_value[i]), float(self.reward[i]),
+                float(self.habitat[i]), int(self.index[i])]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def set_state(self, state):
+        """Records a state list, in the simulate() format, at the timestep given by its index"""
+        i = state[8]
+        self.vulnerability[i] = state[0]
+        self.timber[i] = state[1]
+        self.ev[i] = state[2]
+        self.choice[i] = state[3]
+        self.choice_prob[i] = state[4]
+        self.policy_value[i] = state[5]
+        self.reward[i] = state[6]
+        self.habitat[i] = state[7]
+
+    def prefix(self, timesteps):
+        """Returns a PathwayStates holding the first timesteps states, as views of this one's arrays"""
+        return PathwayStates(columns=dict((f, getattr(self, f)[:timesteps]) for f in self.fields))
+
+    def column(self, k):
+        """Returns the array for position k of the States[i][k] list format"""
+        return getattr(self, self.fields[k])
+
+    def totals(self):
+        """Returns the number of suppressions, the joint probability and the sum of the probabilities of
+        the choices made. The product and sum are accumulated in timestep order, so they match a loop."""
+        if len(self) == 0: return 0.0, 1.0, 0.0
+        suppressions = float(numpy.count_nonzero(self.choice))
+        joint_prob = float(numpy.multiply.accumulate(self.choice_prob)[-1])
+        prob_sum = float(numpy.add.accumulate(self.choice_prob)[-1])
+        return suppressions, joint_prob, prob_sum
+
+    def to_list(self):
+        """Returns the states as a list of lists, in the format simulate() uses by default"""
+        return list(self)
+
+
+class RunningSummary:
+    """Online summary statistics for one SWM pathway, updated one state at a time in constant memory.
+
+    The state values' mean and variance are kept with Welford's method, alongside running counts of
+    suppressions, the joint and log-joint probabilities and the sum of choice probabilities. summary()
+    returns a dictionary with the same keys and rounding as simulate()'s (other than "States"). Its values
+    equal simulate()'s to within floating-point rounding: Welford's mean and variance can differ from numpy's
+    in the last digit, which can occasionally change a rounded value.
+    """
+
+    def __init__(self, random_seed=0, policy=[0,0], model_parameters={}):
+        self.start(random_seed, policy, _parse_model_parameters(model_parameters))
+
+    def start(self, random_seed, policy, c):
+        """Clears the running values, and records the pathway details reported in the summary"""
+        self.random_seed = random_seed
+        self.policy = policy
+        self.c = c
+
+        self.timesteps = 0
+        self.value_mean = 0.0
+        self.value_m2 = 0.0
+        self.value_total = 0.0
+        self.habitat_total = 0.0
+        self.suppressions = 0.0
+        self.joint_prob = 1.0
+        self.log_joint_prob = 0.0
+        self.prob_sum = 0.0
+
+    def update(self, state):
+        """Adds one state list, in the simulate() format, to the running values"""
+        self.timesteps += 1
+        value = state[6]
+        delta = value - self.value_mean
+        self.value_mean += delta / self.timesteps
+        self.value_m2 += delta * (value - self.value_mean)
+        self.value_total += value
+
+        self.habitat_total += state[7]
+        if state[3]: self.suppressions += 1
+        self.joint_prob *= state[4]
+        self.log_joint_prob += numpy.log(state[4]) if state[4] > 0 else -numpy.inf
+        self.prob_sum += state[4]
+
+    def accumulators(self):
+        """Returns the running values as a dictionary, e.g. for a checkpoint. See restore()"""
+        return dict((name, getattr(self, name)) for name in _SUMMARY_ACCUMULATORS)
+
+    def restore(self, accumulators):
+        """Sets the running values back to those returned by accumulators()"""
+        for name in _SUMMARY_ACCUMULATORS:
+            setattr(self, name, accumulators[name])
+
+    def std(self):
+        """Returns the (population) standard deviation of the state values so far"""
+        if self.timesteps == 0: return 0.0
+        return math.sqrt(self.value_m2 / self.timesteps)
+
+    def summary(self):
+        """Returns the summary dictionary of the states added so far. Raises a ValueError if none have been"""
+        if self.timesteps == 0:
+            raise ValueError("There is no summary of an empty pathway; no states have been added yet")
+        return _summary_from_stats(self.value_mean, self.value_total, self.std(),
+                                   self.habitat_total / self.timesteps, self.suppressions, self.joint_prob,
+                                   float(self.log_joint_prob), self.prob_sum, self.random_seed, self.timesteps,
+                                   self.policy, self.c)
+
+
+class SimulationStats:
+    """Per-phase timings and event counters for instrumented simulate() runs.
+
+    Pass one as simulate(..., stats=...) to have the hooks in the model loop record into it. The same object
+    can be passed to any number of runs, and adds them all up. Timings are in seconds, from
+    time.perf_counter(), and include the timer calls themselves (a fraction of a microsecond per phase per
+    timestep), so compare them with each other rather than with uninstrumented runs.
+
+    If a sink is given, it is called with the report() of each finished pathway (e.g. to log them, or to
+    push them to a monitoring system), and then the object is reset for the next one.
+    """
+
+    #the phases of each timestep, and then of the whole pathway, in the order they run
+    PHASES = ["RNG Draws", "Policy", "Reward", "Transition", "Habitat", "Bounds", "Summary"]
+
+    #how often each state variable bound was enforced
+    BOUNDS = ["Vulnerability Max", "Vulnerability Min", "Timber Max", "Timber Min", "Habitat Max", "Habitat Min"]
+
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.reset()
+
+    def reset(self):
+        """Zeroes every timer and counter"""
+        self.pathways = 0
+        self.timesteps = 0
+        self.timers = dict((phase, 0.0) for phase in self.PHASES)
+        self.counts = {
+                       "RNG Draws": 0,
+                       "Policy Evaluations": 0,
+                       "Policy Clamps High": 0,
+                       "Policy Clamps Low": 0,
+                       "Suppressions": 0,
+                       "Severe Fires": 0,
+                       "Habitat Gains": 0,
+                       "Habitat Losses": 0
+                      }
+        self.saturations = dict((bound, 0) for bound in self.BOUNDS)
+
+    def merge(self, other):
+        """Adds another SimulationStats' timers and counters to this one's"""
+        self.pathways += other.pathways
+        self.timesteps += other.timesteps
+        for k in other.timers: self.timers[k] += other.timers[k]
+        for k in other.counts: self.counts[k] += other.counts[k]
+        for k in other.saturations: self.saturations[k] += other.saturations[k]
+
+    def report(self):
+        """Returns a dictionary of the timers ("Seconds"), their share of the total time ("Fraction"),
+        the counters ("Counts"), the bound saturation counts ("Saturations"), and the number of "Pathways"
+        and "Timesteps" (with the overall "Timesteps per Second") they cover"""
+        total = sum(self.timers.values())
+        return {
+                "Pathways": self.pathways,
+                "Timesteps": self.timesteps,
+                "Timesteps per Second": self.timesteps / total if total > 0 else 0.0,
+                "Seconds": dict(self.timers),
+                "Fraction": dict((k, v / total if total > 0 else 0.0) for k, v in self.timers.items()),
+                "Counts": dict(self.counts),
+                "Saturations": dict(self.saturations)
+               }
+
+    def _finish_pathway(self):
+        self.pathways += 1
+        if self.sink is not None:
+            self.sink(self.report())
+            self.reset()
+
+
+class SWMSimulator:
+    def __init__(self, model_parameters={}, policy=[0,0]):
+        """A reusable SWM v1.3 simulator, with its model parameters validated and compiled once.
+
+        Each instance owns its own random.Random generator, which it reseeds for every pathway, so it
+        never touches the global random module. Its pathways are the same as simulate()'s for the same
+        seed. Instances are independent of one another, so any number of them can run at once in a
+        thread pool (but a single instance should only be used by one thread at a time).
+
+        Arguements:
+        model_parameters: see simulate(). Unknown keys, and values of the wrong type, raise a ValueError.
+        policy: the default policy for this simulator's pathways. See simulate()
+        """
+        validate_model_parameters(model_parameters)
+        self.model_parameters = dict(model_parameters)
+        self.c = _parse_model_parameters(self.model_parameters)
+        self.policy = policy
+        self.pol = sanitize_policy(policy)
+        self.rng = random.Random()
+
+    def simulate(self, timesteps, random_seed=0, policy=None, COLUMNAR=False, stats=None):
+        """Simulates one pathway and returns the same dictionary as simulate() would
+
+        timesteps, random_seed, COLUMNAR, stats: see simulate()
+        policy: the policy for this pathway. Default=None, which uses the simulator's policy
+        """
+        if policy is None:
+            policy, pol = self.policy, self.pol
+        else:
+            pol = sanitize_policy(policy)
+
+        timesteps = int(timesteps)
+        self.rng.seed(random_seed)
+        if stats is None:
+            summary, vals, hab = _run_pathway(_simulate_steps(timesteps, pol, self.c, self.rng), timesteps,
+                                              random_seed, policy, self.c, COLUMNAR)
+        else:
+            summary, vals, hab = _run_pathway_instrumented(timesteps, pol, self.c, self.rng, random_seed, policy,
+                                                           COLUMNAR, stats)
+        return summary
+
+    def simulate_iter(self, timesteps, random_seed=0, policy=None, summary=None):
+        """Generator of one pathway's states, like simulate_iter(). See simulate() and simulate_iter()"""
+        if policy is None:
+            policy, pol = self.policy, self.pol
+        else:
+            pol = sanitize_policy(policy)
+
+        rng = random.Random(random_seed)
+        if summary is not None:
+            summary.start(random_seed, policy, self.c)
+        for state in _simulate_steps(int(timesteps), pol, self.c, rng):
+            if summary is not None:
+                summary.update(state)
+            yield state
+
+
+class ResumableSimulation:
+    def __init__(self, timesteps, policy=[0,0], random_seed=0, model_parameters={}, KEEP_STATES=False):
+        """One SWM v1.3 pathway that can be run a piece at a time, and checkpointed between pieces.
+
+        Everything the pathway needs to continue (its random.Random state, the current vulnerability, timber
+        and habitat, both fire timers, and the running summary values) is kept between calls to run(), so
+        a pathway can be saved, loaded in another process, and continued, giving bit-for-bit the same
+        result as running it without stopping. The draws are the same as simulate()'s for the same seed.
+
+        Arguements:
+        timesteps, policy, random_seed, model_parameters: see simulate(). random_seed and policy must be
+          JSON-serializable for the pathway to be saved.
+        KEEP_STATES: boolean; if True, every state list is kept (and saved in checkpoints), and summary()
+          returns exactly what simulate() would, "States" included. If False, only the RunningSummary
+          values are kept, so that very long pathways need constant memory. Default=False
+        """
+        validate_model_parameters(model_parameters)
+        self.timesteps = int(timesteps)
+        self.policy = policy
+        self.random_seed = random_seed
+        self.model_parameters = dict(model_parameters)
+        self.KEEP_STATES = KEEP_STATES
+
+        self.c = _parse_model_parameters(self.model_parameters)
+        #as plain values, so a resumed pathway computes exactly what this one does
+        self.pol = sanitize_policy(_plain_values(policy))
+        self.rng = random.Random(random_seed)
+
+        #the state after the last simulated timestep, or None before the pathway has started
+        self.position = None
+        self.running = RunningSummary()
+        self.running.start(random_seed, policy, self.c)
+        self.states = [] if KEEP_STATES else None
+
+    def timestep(self):
+        """The number of timesteps simulated so far"""
+        if self.position is None: return 0
+        return self.position["Timestep"]
+
+    def finished(self):
+        return self.timestep() >= self.timesteps
+
+    def run(self, steps=None, checkpoint_file=None, checkpoint_every=None):
+        """Simulates up to steps more timesteps (Default=None, which runs to the end of the pathway).
+
+        If checkpoint_file is given, the pathway is saved to it every checkpoint_every timesteps (counted
+        from the start of the pathway), and once more when this call stops. Returns finished()
+        """
+        target = self.timesteps if steps is None else min(self.timesteps, self.timestep() + int(steps))
+        while self.timestep() < target:
+            chunk = target - self.timestep()
+            if checkpoint_every is not None:
+                chunk = min(chunk, checkpoint_every - self.timestep() % checkpoint_every)
+            self._advance(chunk)
+            if checkpoint_file is not None:
+                self.save(checkpoint_file)
+        return self.finished()
+
+    def summary(self):
+        """Returns the summary dictionary of the timesteps simulated so far"""
+        if self.KEEP_STATES:
+            summary, vals, hab = _run_pathway(list(self.states), self.timestep(), self.random_seed, self.policy,
+                                              self.c, False)
+            return summary
+        return self.running.summary()
+
+    def checkpoint(self):
+        """Returns everything needed to continue the pathway, as a JSON-serializable dictionary. See
+        from_checkpoint()"""
+        rng_state = self.rng.getstate()
+        #numpy values (e.g. parameters taken from a sampled array) are converted to the Python values they hold
+        return _plain_values({
+                "Model Version": MODEL_VERSION,
+                "Timesteps": self.timesteps,
+                "Policy": self.policy,
+                "Random Seed": self.random_seed,
+                "Model Parameters": self.model_parameters,
+                "KEEP_STATES": self.KEEP_STATES,
+                "RNG State": [rng_state[0], list(rng_state[1]), rng_state[2]],
+                "Position": self.position,
+                "Summary": self.running.accumulators(),
+                "States": self.states
+               })
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint):
+        """Returns the ResumableSimulation that checkpoint() described, ready to run() further"""
+        if checkpoint["Model Version"] != MODEL_VERSION:
+            raise ValueError("This checkpoint is from SWM version " + str(checkpoint["Model Version"]) +
+                             ", not " + MODEL_VERSION)
+        sim = cls(checkpoint["Timesteps"], checkpoint["Policy"], checkpoint["Random Seed"],
+                  checkpoint["Model Parameters"], checkpoint["KEEP_STATES"])
+        rng_state = checkpoint["RNG State"]
+        sim.rng.setstate((rng_state[0], tuple(rng_state[1]), rng_state[2]))
+        sim.position = checkpoint["Position"]
+        sim.running.restore(checkpoint["Summary"])
+        if sim.KEEP_STATES:
+            sim.states = checkpoint["States"]
+        return sim
+
+    def save(self, checkpoint_file):
+        """Writes checkpoint() to a JSON file"""
+        try:
+            with open(checkpoint_file + ".tmp", "w") as f:
+                json.dump(self.checkpoint(), f)
+        except BaseException:
+            #leave the last good checkpoint, and no partial one beside it
+            if os.path.exists(checkpoint_file + ".tmp"):
+                os.remove(checkpoint_file + ".tmp")
+            raise
+        #replace the old file in one step, so a crash can't leave a half-written one
+        os.replace(checkpoint_file + ".tmp", checkpoint_file)
+
+    @classmethod
+    def load(cls, checkpoint_file):
+        """Returns the ResumableSimulation saved in checkpoint_file"""
+        with open(checkpoint_file) as f:
+            return cls.from_checkpoint(json.load(f))
+
+    def _advance(self, steps):
+        end = {}
+        for state in _simulate_steps(steps, self.pol, self.c, self.rng, self.position, end):
+            if self.KEEP_STATES:
+                self.states.append(state)
+            else:
+                self.running.update(state)
+        self.position = end
+
+
+def simulate_resumable(timesteps, policy=[0,0], random_seed=0, model_parameters={}, checkpoint_file=None,
+                       checkpoint_every=10000, KEEP_STATES=False, SILENT=False):
+    """Simulates one pathway, saving a checkpoint to checkpoint_file every checkpoint_every timesteps. If
+    checkpoint_file already exists, the pathway picks up where it left off instead of starting again, and
+    the result is exactly the same as if it had never stopped. See ResumableSimulation.
+
+    Returns the pathway's summary dictionary (with "States" only if KEEP_STATES)
+    """
+    if (checkpoint_file is not None) and os.path.exists(checkpoint_file):
+        sim = ResumableSimulation.load(checkpoint_file)
+        if ((sim.timesteps, sim.policy, sim.random_seed, sim.model_parameters) !=
+            _plain_values((int(timesteps), policy, random_seed, dict(model_parameters)))):
+            raise ValueError("The checkpoint in " + checkpoint_file + " is for a different pathway")
+        if not SILENT:
+            print("Resuming from timestep " + str(sim.timestep()) + " of " + str(sim.timesteps))
+    else:
+        sim = ResumableSimulation(timesteps, policy, random_seed, model_parameters, KEEP_STATES)
+
+    sim.run(checkpoint_file=checkpoint_file, checkpoint_every=checkpoint_every)
+    summary = sim.summary()
+
+    if not SILENT:
+        if KEEP_STATES:
+            _print_summary(summary, [s[6] for s in summary["States"]], [s[7] for s in summary["States"]])
+        else:
+            print("Simulation Complete - Pathway " + str(summary["ID Number"]) + ": Average State Value " +
+                  str(summary["Average State Value"]) + ", Average Habitat Value " + str(summary["Average Habitat Value"]))
+    return summary
+
+
+def validate_model_parameters(model_parameters):
+    """Raises a ValueError if model_parameters has a key simulate() doesn't know, or a value it can't use"""
+    for key, value in model_parameters.items():
+        if key not in MODEL_PARAMETER_KEYS:
+            raise ValueError("Unknown SWM model parameter: " + repr(key))
+        if key == "Probabilistic Choices":
+            if value not in ("True", "False"):
+                raise ValueError('"Probabilistic Choices" must be the string "True" or "False", not ' + repr(value))
+        elif isinstance(value, bool) or not isinstance(value, (int, float, numpy.number)):
+            raise ValueError("SWM model parameter " + repr(key) + " must be a number, not " + repr(value))
+
+    if "Starting Vulnerability" in model_parameters:
+        if not (0 <= model_parameters["Starting Vulnerability"] <= 1):
+            raise ValueError('"Starting Vulnerability" is a probability, so must be between 0 and 1')
+
+
+def sanitize_policy(policy):
+    pol = []
+    if isinstance(policy, list):
+        #it's probably length-2, so just assign it
+        pol = policy[:]
+    else:
+        #it's not a list, so find out what string it is
+        if policy == 'LB':    pol = [-20,0]
+        elif policy == 'SA':  pol = [ 20,0]
+        elif policy == 'CT':  pol = [  0,0]
+        else: pol = [0,0] #using CT as a catch-all for when the string is "MIXED_CT" or whatnot
+
+    return pol
+
+def convert_to_MDP_pathway(SWMv1_3_pathway,VALUE_ON_HABITAT=False, percentage_habitat=0):
+    """ Converts a SWMv1_3 pathway into a generic MDP_Pathway object and returns it"""
+    
+    #create a new MDP pathway object, with policy length = 2
+    new_MDP_pw = MDP.MDP_Pathway(2)
+    
+    new_MDP_pw.ID_number = SWMv1_3_pathway["ID Number"]
+    new_MDP_pw.net_value = SWMv1_3_pathway["Total Pathway Value"]
+    new_MDP_pw.actions_1_taken = SWMv1_3_pathway["Suppressions"]
+    new_MDP_pw.actions_0_taken = SWMv1_3_pathway["Timesteps"] - SWMv1_3_pathway["Suppressions"]
+    new_MDP_pw.generation_joint_prob = SWMv1_3_pathway["Joint Probability"]
+    new_MDP_pw.set_generation_policy_parameters(SWMv1_3_pathway["Generation Policy"][:])
+    
+    for i in range(len(SWMv1_3_pathway["States"])):
+        event = MDP.MDP_Event(i)
+        
+        #in SWIMM, the states are each in the following format:
+        #states[i] = [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
+        event.state_length = 2
+        event.state = [1, SWMv1_3_pathway["States"][i][2]]
+        event.action = SWMv1_3_pathway["States"][i][3]
+        event.decision_prob = SWMv1_3_pathway["States"][i][4]
+        event.action_prob = SWMv1_3_pathway["States"][i][5]
+        if (VALUE_ON_HABITAT) or (percentage_habitat >= 1):
+            #just report habitat values
+            event.rewards = [SWMv1_3_pathway["States"][i][7]]
+        else:
+            if percentage_habitat > 0 :
+                #non-zero percentage, so report the appropriate mix of habitat and budget values
+                parts_hab = [SWMv1_3_pathway["States"][i][7]] * percentage_habitat
+                parts_budg = [SWMv1_3_pathway["States"][i][6]] * (1-percentage_habitat)
+                event.rewards = parts_hab + parts_budg
+            else:
+                event.rewards = [SWMv1_3_pathway["States"][i][6]]
+        
+        new_MDP_pw.events.append(event)
+
+    #pathways from older versions don't carry a log joint probability, so rebuild it from the events
+    if "Log Joint Probability" in SWMv1_3_pathway:
+        new_MDP_pw.generation_log_joint_prob = SWMv1_3_pathway["Log Joint Probability"]
+    else:
+        new_MDP_pw.generation_log_joint_prob = MDP.log_joint_prob([e.decision_prob for e in new_MDP_pw.events])
+
+    #everything needed for the MDP object has been filled in, so now
+    # remove the states (at least) and add the rest of the SWM dictionary's entries as metadata
+    SWMv1_3_pathway.pop("States",None)
+    new_MDP_pw.metadata=SWMv1_3_pathway
+    
+    return new_MDP_pw
+
+
+def convert_to_MDP_dataset(SWMv1_3_pathways, VALUE_ON_HABITAT=False, percentage_habitat=0):
+    """ Converts a list of SWMv1_3 pathways into a single array-backed MDP.MDP_Dataset and returns it.
+
+    This gives the same events and pathway values as calling convert_to_MDP_pathway() on each pathway,
+    but stacks the states straight into the dataset's arrays instead of creating an MDP_Event per step.
+    Unlike convert_to_MDP_pathway(), the pathway dictionaries are not modified. When 0 < percentage_habitat < 1,
+    each event gets two rewards: its habitat value times percentage_habitat, and its state value times
+    (1 - percentage_habitat).
+    """
+
+    lengths = [len(pw["States"]) for pw in SWMv1_3_pathways]
+    columns = []
+    for pw in SWMv1_3_pathways:
+        if isinstance(pw["States"], PathwayStates):
+            columns.append(numpy.column_stack([pw["States"].column(k) for k in range(9)]))
+        else:
+            columns.append(numpy.array(pw["States"], dtype=float).reshape(-1, 9))
+    states = numpy.concatenate(columns) if len(columns) > 0 else numpy.zeros((0, 9))
+
+    #in SWIMM, the states are each in the following format:
+    #states[i] = [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
+    if (VALUE_ON_HABITAT) or (percentage_habitat >= 1):
+        rewards = states[:,7]
+    elif percentage_habitat > 0:
+        rewards = numpy.column_stack((states[:,7] * percentage_habitat, states[:,6] * (1-percentage_habitat)))
+    else:
+        rewards = states[:,6]
+
+    dataset = MDP.MDP_Dataset(2, lengths,
+                              numpy.column_stack((numpy.ones(len(states)), states[:,2])),
+                              states[:,3] != 0, states[:,5], states[:,4], rewards)
+
+    for pw, new_MDP_pw in zip(SWMv1_3_pathways, dataset):
+        new_MDP_pw.ID_number = pw["ID Number"]
+        new_MDP_pw.net_value = pw["Total Pathway Value"]
+        new_MDP_pw.actions_1_taken = pw["Suppressions"]
+        new_MDP_pw.actions_0_taken = pw["Timesteps"] - pw["Suppressions"]
+        new_MDP_pw.generation_joint_prob = pw["Joint Probability"]
+        new_MDP_pw.set_generation_policy_parameters(pw["Generation Policy"][:])
+        if "Log Joint Probability" in pw:
+            new_MDP_pw.generation_log_joint_prob = pw["Log Joint Probability"]
+        else:
+            new_MDP_pw.generation_log_joint_prob = MDP.log_joint_prob(new_MDP_pw.decision_probs)
+
+        new_MDP_pw.metadata = dict((k, v) for k, v in pw.items() if k != "States")
+
+    return dataset
+    
+
+
+#################################################################
+# MODULE-LEVEL HELPERS
+#################################################################
+
+#the RunningSummary values saved in a ResumableSimulation checkpoint
+_SUMMARY_ACCUMULATORS = ["timesteps", "value_mean", "value_m2", "value_total", "habitat_total", "suppressions",
+                         "joint_prob", "log_joint_prob", "prob_sum"]
+
+#number of timesteps' worth of random numbers that simulate_batch() draws at once for each pathway
+_DRAW_BLOCK = 256
+
+#math.exp applied element-wise, for when numpy.exp's last-digit differences matter
+_exact_exp = numpy.frompyfunc(math.exp, 1, 1)
+
+def _simulate_steps(timesteps, pol, c, rng, start=None, end=None, stats=None):
+    """Generator holding SWM's dynamics. Yields the state list of each timestep in turn:
+        [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
+
+    pol is a sanitized policy, c is the dictionary from _parse_model_parameters(), and rng is any object
+    with a uniform(a,b) method (e.g. the random module, or a random.Random instance).
+
+    start is an optional dictionary of the state to continue from (as filled in by end), instead of
+    drawing a starting state. If end is given, the state after the last timestep is written into it
+    once the generator is exhausted.
+
+    stats is an optional SimulationStats object, which gets the time spent in each phase of each timestep
+    and the event counters added to it. Without it, the only cost of the hooks is checking TIMED. Either
+    way the arithmetic is the same, so the states are identical.
+    """
+    TIMED = stats is not None
+    if TIMED:
+        clock = time.perf_counter
+        timers = stats.timers
+        counts = stats.counts
+        saturations = stats.saturations
+
+    #range of the randomly drawn, uniformally distributed "event" that corresponds to fire severity
+    event_max = c["event_max"]
+    event_min = c["event_min"]
+
+    #state variable bounds
+    vuln_max = c["vuln_max"]
+    vuln_min = c["vuln_min"]
+    timber_max = c["timber_max"]
+    timber_min = c["timber_min"]
+    habitat_max = c["habitat_max"]
+    habitat_min = c["habitat_min"]
+
+    #REWARD STRUCTURE
+    supp_cost_mild = c["supp_cost_mild"]
+    supp_cost_severe = c["supp_cost_severe"]
+    burn_cost = c["burn_cost"]
+
+    #TRANSITION VARIABLES
+    vuln_change_after_suppression = c["vuln_change_after_suppression"]
+    vuln_change_after_mild = c["vuln_change_after_mild"]
+    vuln_change_after_severe = c["vuln_change_after_severe"]
+    timber_change_after_suppression = c["timber_change_after_suppression"]
+    timber_change_after_mild = c["timber_change_after_mild"]
+    timber_change_after_severe = c["timber_change_after_severe"]
+
+    PROBABILISTIC_CHOICES = c["PROBABILISTIC_CHOICES"]
+
+    #habitat transition variables
+    habitat_mild_maximum = c["habitat_mild_maximum"]
+    habitat_mild_minimum = c["habitat_mild_minimum"]
+    habitat_severe_maximum = c["habitat_severe_maximum"]
+    habitat_severe_minimum = c["habitat_severe_minimum"]
+    habitat_loss_if_no_mild = c["habitat_loss_if_no_mild"]
+    habitat_loss_if_no_severe = c["habitat_loss_if_no_severe"]
+    habitat_gain = c["habitat_gain"]
 
 
     #setting 'enums'
@@ -141,21 +1137,42 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
     SEVERE=1
 
 
-    #starting simulations
-    states = [None] * timesteps
-
-    #start current condition randomly among the three states
-    current_vulnerability = starting_Vulnerability
-    current_timber = starting_timber
-    current_habitat = starting_habitat
-    time_since_severe = 0
-    time_since_mild = 0
+    if start is None:
+        #the starting values are always drawn, even when they are set in the model parameters, so that
+        # the rest of the pathway's draws stay the same
+        if TIMED: t0 = clock()
+        starting_Vulnerability = rng.uniform(0.2,0.8)
+        if c["starting_vulnerability"] is not None: starting_Vulnerability = c["starting_vulnerability"]
+        starting_timber = rng.uniform(2,8)
+        if c["starting_timber"] is not None: starting_timber = c["starting_timber"]
+        starting_habitat = rng.uniform(2,8)
+        if c["starting_habitat"] is not None: starting_habitat = c["starting_habitat"]
+        if TIMED:
+            timers["RNG Draws"] += clock() - t0
+            counts["RNG Draws"] += 3
+
+        #start current condition randomly among the three states
+        current_vulnerability = starting_Vulnerability
+        current_timber = starting_timber
+        current_habitat = starting_habitat
+        time_since_severe = 0
+        time_since_mild = 0
+        first_step = 0
+    else:
+        current_vulnerability = start["Vulnerability"]
+        current_timber = start["Timber"]
+        current_habitat = start["Habitat"]
+        time_since_severe = start["Time Since Severe"]
+        time_since_mild = start["Time Since Mild"]
+        first_step = start["Timestep"]
 
 
-    for i in range(timesteps):
+    for i in range(first_step, first_step + timesteps):
 
         #event value is the single "feature" of events in this MDP
-        ev = random.uniform(event_min, event_max)
+        if TIMED: t0 = clock()
+        ev = rng.uniform(event_min, event_max)
+        if TIMED: t1 = clock()
 
         #severity is meant to be a hidden, "black box" variable inside the MDP
         # and not available to the logistic function as a parameter
@@ -168,12 +1185,18 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
         #modified logistic policy function
         #                     CONSTANT       COEFFICIENT       SHIFT
         #policy_crossproduct = pol[0] + ( pol[1] * (ev + pol[2]) )
-        if policy_crossproduct > 100: policy_crossproduct = 100
-        if policy_crossproduct < -100: policy_crossproduct = -100
+        if policy_crossproduct > 100:
+            policy_crossproduct = 100
+            if TIMED: counts["Policy Clamps High"] += 1
+        if policy_crossproduct < -100:
+            policy_crossproduct = -100
+            if TIMED: counts["Policy Clamps Low"] += 1
 
         policy_value = 1.0 / (1.0 + math.exp(-1*(policy_crossproduct)))
 
-        choice_roll = random.uniform(0,1)
+        if TIMED: t2 = clock()
+        choice_roll = rng.uniform(0,1)
+        if TIMED: t3 = clock()
         #assume let-burn
         choice = False
         choice_prob = 1.0 - policy_value
@@ -188,6 +1211,8 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
                 choice_prob = policy_value
 
 
+        if TIMED: t4 = clock()
+
         ### CALCULATE REWARD ###
         supp_cost = 0
         burn_penalty = 0
@@ -208,13 +1233,24 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
 
 
         current_reward = 10 + current_timber - supp_cost - burn_penalty
+
+        if TIMED:
+            t5 = clock()
+            timers["RNG Draws"] += (t1 - t0) + (t3 - t2)
+            timers["Policy"] += (t2 - t1) + (t4 - t3)
+            timers["Reward"] += t5 - t4
+            counts["RNG Draws"] += 2
+            counts["Policy Evaluations"] += 1
+            if choice: counts["Suppressions"] += 1
+            if severity == SEVERE: counts["Severe Fires"] += 1
                 
 
-        states[i] = [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
+        yield [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
 
 
 
         ### TRANSITION ###
+        if TIMED: t0 = clock()
         if not choice:
             #no suppression
             if severity == SEVERE:
@@ -241,6 +1277,7 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
             time_since_mild += 1
             time_since_severe += 1
 
+        if TIMED: t1 = clock()
 
         #check for habitat changes. 
         #Note to self: suppression effects are already taken into account above
@@ -251,164 +1288,325 @@ def simulate(timesteps, policy=[0,0], random_seed=0, model_parameters={}, SILENT
 
             #this fire is happy on all counts
             current_habitat += habitat_gain
+            if TIMED: counts["Habitat Gains"] += 1
         else:
             #this fire is unhappy in some way.
+            if TIMED: counts["Habitat Losses"] += 1
             if (time_since_mild > habitat_mild_maximum) or (time_since_mild < habitat_mild_minimum):
                 current_habitat -= habitat_loss_if_no_mild
             if (time_since_severe > habitat_severe_maximum) or (time_since_severe < habitat_severe_minimum):
                 current_habitat -= habitat_loss_if_no_severe
 
 
+        if TIMED: t2 = clock()
 
         #Enforce state variable bounds
-        if current_vulnerability > vuln_max: current_vulnerability = vuln_max
-        if current_vulnerability < vuln_min: current_vulnerability = vuln_min
-        if current_timber > timber_max: current_timber = timber_max
-        if current_timber < timber_min: current_timber = timber_min
-        if current_habitat > 10: current_habitat = 10
-        if current_habitat < 0: current_habitat = 0
+        if current_vulnerability > vuln_max:
+            current_vulnerability = vuln_max
+            if TIMED: saturations["Vulnerability Max"] += 1
+        if current_vulnerability < vuln_min:
+            current_vulnerability = vuln_min
+            if TIMED: saturations["Vulnerability Min"] += 1
+        if current_timber > timber_max:
+            current_timber = timber_max
+            if TIMED: saturations["Timber Max"] += 1
+        if current_timber < timber_min:
+            current_timber = timber_min
+            if TIMED: saturations["Timber Min"] += 1
+        if current_habitat > habitat_max:
+            current_habitat = habitat_max
+            if TIMED: saturations["Habitat Max"] += 1
+        if current_habitat < habitat_min:
+            current_habitat = habitat_min
+            if TIMED: saturations["Habitat Min"] += 1
+
+        if TIMED:
+            t3 = clock()
+            timers["Transition"] += t1 - t0
+            timers["Habitat"] += t2 - t1
+            timers["Bounds"] += t3 - t2
+            stats.timesteps += 1
+
+
+    if end is not None:
+        end["Vulnerability"] = current_vulnerability
+        end["Timber"] = current_timber
+        end["Habitat"] = current_habitat
+        end["Time Since Severe"] = time_since_severe
+        end["Time Since Mild"] = time_since_mild
+        end["Timestep"] = first_step + timesteps
+
+
+def _run_pathway(steps, timesteps, random_seed, policy, c, COLUMNAR):
+    """Runs a _simulate_steps() generator to the end, and returns the pathway's summary dictionary (with
+    its "States") along with its list or array of state values and of habitat values"""
+    if COLUMNAR:
+        states = PathwayStates(timesteps)
+        for state in steps:
+            states.set_state(state)
+    else:
+        states = list(steps)
 
 
-        
+    #finished simulations, report some values
+    if COLUMNAR:
+        vals = states.reward
+        hab = states.habitat
+        summary = _summarize_columns(states, random_seed, policy, c)
+    else:
+        vals = []
+        hab = []
+        suppressions = 0.0
+        joint_prob = 1.0
+        prob_sum = 0.0
+        for i in range(timesteps):
+            if states[i][3]: suppressions += 1
+            joint_prob *= states[i][4]
+            prob_sum += states[i][4]
+            vals.append(states[i][6])
+            hab.append(states[i][7])
+        log_joint_prob = _log_joint_prob([s[4] for s in states])
+
+        summary = _build_summary(vals, hab, suppressions, joint_prob, log_joint_prob, prob_sum, random_seed, timesteps, policy, c)
 
+    summary["States"] = states
 
-    #finished simulations, report some values
-    vals = []
-    hab = []
-    suppressions = 0.0
-    joint_prob = 1.0
-    prob_sum = 0.0
-    for i in range(timesteps):
-        if states[i][3]: suppressions += 1
-        joint_prob *= states[i][4]
-        prob_sum += states[i][4]
-        vals.append(states[i][6])
-        hab.append(states[i][7])
-    ave_prob = prob_sum / timesteps
+    return summary, vals, hab
 
-    summary = {
-                "Average State Value": round(numpy.mean(vals),2),
-                "Total Pathway Value": round(numpy.sum(vals),0),
-                "STD State Value": round(numpy.std(vals),2),
-                "Average Habitat Value": round(numpy.mean(hab),2),
-                "Suppressions": suppressions,
-                "Suppression Rate": round((float(suppressions)/timesteps),2),
-                "Joint Probability": joint_prob,
-                "Average Probability": round(ave_prob, 3),
-                "ID Number": random_seed,
-                "Timesteps": timesteps,
-                "Generation Policy": policy,
-                "Version": "1.2",
-                "Vulnerability Min": vuln_min,
-                "Vulnerability Max": vuln_max,
-                "Vulnerability Change After Suppression": vuln_change_after_suppression,
-                "Vulnerability Change After Mild": vuln_change_after_mild,
-                "Vulnerability Change After Severe": vuln_change_after_severe,
-                "Timber Value Min": timber_min,
-                "Timber Value Max": timber_max,
-                "Timber Value Change After Suppression": timber_change_after_suppression,
-                "Timber Value Change After Mild": timber_change_after_mild,
-                "Timber Value Change After Severe": timber_change_after_severe,
-                "Suppression Cost - Mild": supp_cost_mild,
-                "Suppression Cost - Severe": supp_cost_severe,
-                "Severe Burn Cost": burn_cost
-              }
+def _run_pathway_instrumented(timesteps, pol, c, rng, random_seed, policy, COLUMNAR, stats):
+    """Same as _run_pathway(_simulate_steps(...), ...), but with stats passed to _simulate_steps(), and the
+    summary construction timed too"""
+    states = list(_simulate_steps(timesteps, pol, c, rng, stats=stats))
 
-    if not SILENT:
-        print("")
-        print("Simulation Complete - Pathway " + str(random_seed))
-        print("Average State Value: " + str(round(numpy.mean(vals),1)) + "   STD: " + str(round(numpy.std(vals),1)))
-        print("Average Habitat Value: " + str(round(numpy.mean(hab),1)) )
-        print("Suppressions: " + str(suppressions))
-        print("Suppression Rate: " + str(round((float(suppressions)/timesteps),2)))
-        print("Joint Probability:" + str(joint_prob))
-        print("Average Probability: " + str(round(ave_prob, 3)))
-        print("")
+    t0 = time.perf_counter()
+    result = _run_pathway(states, timesteps, random_seed, policy, c, COLUMNAR)
+    stats.timers["Summary"] += time.perf_counter() - t0
 
+    stats._finish_pathway()
+    return result
 
-    summary["States"] = states
+def _parse_model_parameters(model_parameters):
+    """Returns a dictionary of SWM's model constants, using the default value of each unless it is
+    given in model_parameters"""
 
-    return summary
+    c = {}
 
+    #range of the randomly drawn, uniformally distributed "event" that corresponds to fire severity
+    c["event_max"] = 1.0
+    c["event_min"] = 0.0
 
-def simulate_all_policies(timesteps=10000, start_seed=0):
+    #state variable bounds
+    c["vuln_max"] = 1.0
+    c["vuln_min"] = 0.02
+    c["timber_max"] = 10.0
+    c["timber_min"] = 0.0
+    c["habitat_max"] = 10
+    c["habitat_min"] = 0
 
+    #REWARD STRUCTURE
 
-    result_CT =    simulate(timesteps, policy=[  0,  0, 0.0], random_seed=start_seed, SILENT=True)
-    result_LB =    simulate(timesteps, policy=[-20,  0, 0.0], random_seed=start_seed, SILENT=True)
-    result_SA =    simulate(timesteps, policy=[ 20,  0, 0.0], random_seed=start_seed, SILENT=True)
-    result_KNOWN = simulate(timesteps, policy=[  0, 20,-0.8], random_seed=start_seed, SILENT=True)
+    #cost of suppression in a mild event
+    c["supp_cost_mild"] = 9
+    if "Suppression Cost - Mild Event" in model_parameters.keys(): c["supp_cost_mild"] = model_parameters["Suppression Cost - Mild Event"]
 
-    result_CT["Name"] = "Coin-Toss:    "
-    result_SA["Name"] = "Suppress-All: "
-    result_LB["Name"] = "Let-burn:     "
-    result_KNOWN["Name"] = "Known:        "
+    #cost of suppresion in a severe event
+    c["supp_cost_severe"] = 13
+    if "Suppression Cost - Severe Event" in model_parameters.keys(): c["supp_cost_severe"] = model_parameters["Suppression Cost - Severe Event"]
 
-    results = [result_CT, result_SA, result_LB, result_KNOWN]
-    print("Policy            Ave    STD    SupRate  AveProb  JointProb")
-    for r in results:
-        print(r["Name"] + "   "),
-        print(str(r["Average State Value"]) + "   "),
-        print(str(r["STD State Value"]) + "   "),
-        print(str(r["Suppression Rate"]) + "      "),
-        print(str(r["Average Probability"]) + "    "),
-        print(str(r["Joint Probability"]))
+    #cost of a severe fire on the next timestep
+    c["burn_cost"] = 40
+    if "Severe Burn Cost" in model_parameters.keys(): c["burn_cost"] = model_parameters["Severe Burn Cost"]
 
-def sanitize_policy(policy):
-    pol = []
-    if isinstance(policy, list):
-        #it's probably length-2, so just assign it
-        pol = policy[:]
-    else:
-        #it's not a list, so find out what string it is
-        if policy == 'LB':    pol = [-20,0]
-        elif policy == 'SA':  pol = [ 20,0]
-        elif policy == 'CT':  pol = [  0,0]
-        else: pol = [0,0] #using CT as a catch-all for when the string is "MIXED_CT" or whatnot
 
-    return pol
+    #TRANSITION VARIABLES
 
-def convert_to_MDP_pathway(SWMv1_3_pathway,VALUE_ON_HABITAT=False, percentage_habitat=0):
-    """ Converts a SWMv1_3 pathway into a generic MDP_Pathway object and returns it"""
-    
-    #create a new MDP pathway object, with policy length = 2
-    new_MDP_pw = MDP.MDP_Pathway(2)
-    
-    new_MDP_pw.ID_number = SWMv1_3_pathway["ID Number"]
-    new_MDP_pw.net_value = SWMv1_3_pathway["Total Pathway Value"]
-    new_MDP_pw.actions_1_taken = SWMv1_3_pathway["Suppressions"]
-    new_MDP_pw.actions_0_taken = SWMv1_3_pathway["Timesteps"] - SWMv1_3_pathway["Suppressions"]
-    new_MDP_pw.generation_joint_prob = SWMv1_3_pathway["Joint Probability"]
-    new_MDP_pw.set_generation_policy_parameters(SWMv1_3_pathway["Generation Policy"][:])
-    
-    for i in range(len(SWMv1_3_pathway["States"])):
-        event = MDP.MDP_Event(i)
-        
-        #in SWIMM, the states are each in the following format:
-        #states[i] = [current_vulnerability, current_timber, ev, choice, choice_prob, policy_value, current_reward, current_habitat, i]
-        event.state_length = 2
-        event.state = [1, SWMv1_3_pathway["States"][i][2]]
-        event.action = SWMv1_3_pathway["States"][i][3]
-        event.decision_prob = SWMv1_3_pathway["States"][i][4]
-        event.action_prob = SWMv1_3_pathway["States"][i][5]
-        if (VALUE_ON_HABITAT) or (percentage_habitat >= 1):
-            #just report habitat values
-            event.rewards = [SWMv1_3_pathway["States"][i][7]]
+    c["vuln_change_after_suppression"] = 0.01
+    c["vuln_change_after_mild"] = -0.01
+    c["vuln_change_after_severe"] = -0.015
+    if "Vulnerability Change After Suppression" in model_parameters.keys(): c["vuln_change_after_suppression"] = model_parameters["Vulnerability Change After Suppression"]
+    if "Vulnerability Change After Mild" in model_parameters.keys(): c["vuln_change_after_mild"] = model_parameters["Vulnerability Change After Mild"]
+    if "Vulnerability Change After Severe" in model_parameters.keys(): c["vuln_change_after_severe"] = model_parameters["Vulnerability Change After Severe"]
+
+    c["timber_change_after_suppression"] = 0.1
+    c["timber_change_after_mild"] = 0.1
+    c["timber_change_after_severe"] = -5.0
+    if "Timber Value Change After Suppression" in model_parameters.keys(): c["timber_change_after_suppression"] = model_parameters["Timber Value Change After Suppression"]
+    if "Timber Value Change After Mild" in model_parameters.keys(): c["timber_change_after_mild"] = model_parameters["Timber Value Change After Mild"]
+    if "Timber Value Change After Severe" in model_parameters.keys(): c["timber_change_after_severe"] = model_parameters["Timber Value Change After Severe"]
+
+
+    c["PROBABILISTIC_CHOICES"] = False
+    if "Probabilistic Choices" in model_parameters.keys():
+        if model_parameters["Probabilistic Choices"] == "True":
+            c["PROBABILISTIC_CHOICES"] = True
         else:
-            if percentage_habitat > 0 :
-                #non-zero percentage, so report the appropriate mix of habitat and budget values
-                parts_hab = [SWMv1_3_pathway["States"][i][7]] * percentage_habitat
-                parts_budg = [SWMv1_3_pathway["States"][i][6]] * (1-percentage_habitat)
-                event.rewards = parts_hab + parts_budg
-            else:
-                event.rewards = [SWMv1_3_pathway["States"][i][6]]
-        
-        new_MDP_pw.events.append(event)
+            c["PROBABILISTIC_CHOICES"] = False
 
-    #everything needed for the MDP object has been filled in, so now
-    # remove the states (at least) and add the rest of the SWM dictionary's entries as metadata
-    SWMv1_3_pathway.pop("States",None)
-    new_MDP_pw.metadata=SWMv1_3_pathway
-    
-    return new_MDP_pw
-    
\ No newline at end of file
+
+    #habitat transition variables
+    c["habitat_mild_maximum"] = 15
+    c["habitat_mild_minimum"] = 0
+    c["habitat_severe_maximum"] = 40
+    c["habitat_severe_minimum"] = 10
+    c["habitat_loss_if_no_mild"] = 0.2
+    c["habitat_loss_if_no_severe"] = 0.2
+    c["habitat_gain"] = 0.1
+
+
+    #starting conditions. None means the value is drawn at random
+    c["starting_vulnerability"] = None
+    c["starting_timber"] = None
+    c["starting_habitat"] = None
+    if "Starting Vulnerability" in model_parameters.keys(): c["starting_vulnerability"] = model_parameters["Starting Vulnerability"]
+    if "Starting Timber Value" in model_parameters.keys(): c["starting_timber"] = model_parameters["Starting Timber Value"]
+    if "Starting Habitat Value" in model_parameters.keys(): c["starting_habitat"] = model_parameters["Starting Habitat Value"]
+
+    return c
+
+def _build_summary(vals, hab, suppressions, joint_prob, log_joint_prob, prob_sum, random_seed, timesteps, policy, c):
+    """Returns the summary dictionary of a finished pathway, given its per-step state values and
+    habitat values, its running totals, and the model constants it was simulated with"""
+
+    return _summary_from_stats(numpy.mean(vals), numpy.sum(vals), numpy.std(vals), numpy.mean(hab), suppressions,
+                               joint_prob, log_joint_prob, prob_sum, random_seed, timesteps, policy, c)
+
+def _summarize_columns(columns, random_seed, policy, c):
+    """Returns the summary dictionary of a pathway held in a PathwayStates object"""
+    suppressions, joint_prob, prob_sum = columns.totals()
+    return _build_summary(columns.reward, columns.habitat, suppressions, joint_prob,
+                          _log_joint_prob(columns.choice_prob), prob_sum, random_seed, len(columns), policy, c)
+
+def _summary_from_stats(mean_val, total_val, std_val, mean_hab, suppressions, joint_prob, log_joint_prob,
+                        prob_sum, random_seed, timesteps, policy, c):
+    """Returns the summary dictionary of a finished pathway, given the mean, total and standard deviation
+    of its state values, its mean habitat value, and its running totals"""
+
+    ave_prob = prob_sum / timesteps
+
+    summary = {
+                "Average State Value": round(mean_val,2),
+                "Total Pathway Value": round(total_val,0),
+                "STD State Value": round(std_val,2),
+                "Average Habitat Value": round(mean_hab,2),
+                "Suppressions": suppressions,
+                "Suppression Rate": round((float(suppressions)/timesteps),2),
+                "Joint Probability": joint_prob,
+                "Log Joint Probability": log_joint_prob,
+                "Average Probability": round(ave_prob, 3),
+                "ID Number": random_seed,
+                "Timesteps": timesteps,
+                "Generation Policy": policy,
+                "Version": "1.2",
+                "Vulnerability Min": c["vuln_min"],
+                "Vulnerability Max": c["vuln_max"],
+                "Vulnerability Change After Suppression": c["vuln_change_after_suppression"],
+                "Vulnerability Change After Mild": c["vuln_change_after_mild"],
+                "Vulnerability Change After Severe": c["vuln_change_after_severe"],
+                "Timber Value Min": c["timber_min"],
+                "Timber Value Max": c["timber_max"],
+                "Timber Value Change After Suppression": c["timber_change_after_suppression"],
+                "Timber Value Change After Mild": c["timber_change_after_mild"],
+                "Timber Value Change After Severe": c["timber_change_after_severe"],
+                "Suppression Cost - Mild": c["supp_cost_mild"],
+                "Suppression Cost - Severe": c["supp_cost_severe"],
+                "Severe Burn Cost": c["burn_cost"]
+              }
+
+    return summary
+
+def _print_summary(summary, vals, hab):
+    """Prints the results of a finished pathway to standard out"""
+    print("")
+    print("Simulation Complete - Pathway " + str(summary["ID Number"]))
+    print("Average State Value: " + str(round(numpy.mean(vals),1)) + "   STD: " + str(round(numpy.std(vals),1)))
+    print("Average Habitat Value: " + str(round(numpy.mean(hab),1)) )
+    print("Suppressions: " + str(summary["Suppressions"]))
+    print("Suppression Rate: " + str(summary["Suppression Rate"]))
+    print("Joint Probability:" + str(summary["Joint Probability"]))
+    print("Log Joint Probability:" + str(summary["Log Joint Probability"]))
+    print("Average Probability: " + str(summary["Average Probability"]))
+    print("")
+
+def _log_joint_prob(choice_probs):
+    """Returns the sum of the logs of a sequence of probabilities. The logs are taken with numpy and added
+    in sequence order, so simulate(), simulate_batch() and RunningSummary all get the same value"""
+    if len(choice_probs) == 0: return 0.0
+    with numpy.errstate(divide="ignore"):
+        return float(numpy.add.accumulate(numpy.log(numpy.asarray(choice_probs, dtype=float)))[-1])
+
+def _plain_values(value):
+    """Returns value with its numpy scalars and arrays replaced by Python numbers and lists, recursing into
+    dictionaries, lists and tuples (tuples are kept, so they can still be compared)"""
+    if isinstance(value, numpy.generic): return value.item()
+    if isinstance(value, numpy.ndarray): return value.tolist()
+    if isinstance(value, dict): return dict((k, _plain_values(v)) for k, v in value.items())
+    if isinstance(value, list): return [_plain_values(v) for v in value]
+    if isinstance(value, tuple): return tuple(_plain_values(v) for v in value)
+    return value
+
+def _numpy_random_state(random_seed):
+    """Returns a numpy RandomState whose uniform draws are the same as the random module's
+    after random.seed(random_seed)"""
+    internal_state = random.Random(random_seed).getstate()[1]
+    rs = numpy.random.RandomState()
+    rs.set_state(("MT19937", numpy.array(internal_state[:-1], dtype=numpy.uint32), internal_state[-1]))
+    return rs
+
+def _simulate_shard(shard):
+    """Worker function for simulate_parallel(). Takes a (timesteps, policies, seeds, model_parameters,
+    KEEP_STATES, COLUMNAR, tapes) tuple and returns the simulate_batch() results for it"""
+    timesteps, policies, seeds, model_parameters, KEEP_STATES, COLUMNAR, tapes = shard
+    return simulate_batch(timesteps, policies, seeds, model_parameters, KEEP_STATES=KEEP_STATES, COLUMNAR=COLUMNAR,
+                          tapes=tapes)
+
+def _expand_tapes(tapes, seeds, timesteps):
+    """Returns (tapes, seeds) as lists of equal length, given either of them (or both). tapes is None
+    if no tapes were given."""
+    if tapes is None:
+        return None, list(seeds)
+    if isinstance(tapes, EventTape):
+        tapes = [tapes] * len(list(seeds))
+    tapes = list(tapes)
+    if seeds is None:
+        seeds = [t.random_seed for t in tapes]
+    seeds = list(seeds)
+    if len(tapes) != len(seeds):
+        raise ValueError("Expected one tape per seed, but got " + str(len(tapes)) + " tapes for " + str(len(seeds)) + " seeds")
+    for t in tapes:
+        if len(t) < timesteps:
+            raise ValueError("An EventTape of " + str(len(t)) + " timesteps can't be replayed for " + str(timesteps) + " timesteps")
+    return tapes, seeds
+
+def _per_pathway_constants(model_parameters, count):
+    """Returns the model constants of model_parameters, with any sequence-valued ones converted to float
+    arrays, checking that each holds one value per pathway. Used by simulate_batch()"""
+    #checked before parsing, which reads anything but "True" as False
+    if isinstance(model_parameters.get("Probabilistic Choices"), (list, tuple, numpy.ndarray)):
+        raise ValueError('"Probabilistic Choices" must be the same for every pathway in a batch')
+    c = _parse_model_parameters(model_parameters)
+    for k, v in c.items():
+        if isinstance(v, (list, tuple, numpy.ndarray)):
+            v = numpy.asarray(v, dtype=float)
+            if v.shape != (count,):
+                raise ValueError("Expected one value of each per-pathway model parameter per seed, but got " +
+                                 str(len(v)) + " values for " + str(count) + " seeds")
+            c[k] = v
+    return c
+
+def _pathway_constants(c, n):
+    """Returns the model constants of pathway n of a batch, taking its own value of any per-pathway ones"""
+    return dict((k, float(v[n]) if isinstance(v, numpy.ndarray) else v) for k, v in c.items())
+
+def _slice_model_parameters(model_parameters, start, stop):
+    """Returns the model parameters of pathways start to stop, slicing any per-pathway values"""
+    return dict((k, v[start:stop] if isinstance(v, (list, tuple, numpy.ndarray)) else v)
+                for k, v in model_parameters.items())
+
+def _expand_policies(policies, count):
+    """Returns a list of count policies, given either a single policy or a list of policies"""
+    if isinstance(policies, list) and len(policies) > 0 and isinstance(policies[0], (list, str)):
+        if len(policies) != count:
+            raise ValueError("Expected one policy per seed, but got " + str(len(policies)) +
+                             " policies for " + str(count) + " seeds")
+        return policies
+    return [policies] * count
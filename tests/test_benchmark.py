@@ -0,0 +1,45 @@
+import SWM_benchmark
+
+
+def _result(seconds, median=None, peak=1000, blocks=1.0):
+    return {"Steps": 100, "Seconds": seconds, "Median Seconds": median if median is not None else seconds,
+            "Repeats": 5, "Steps per Second": 100 / seconds, "Peak Memory": peak, "Retained Blocks per Step": blocks}
+
+
+def test_measure_counts_only_retained_blocks():
+    kept = []
+    def keeps():
+        kept.append([object() for k in range(1000)])
+    def frees():
+        [object() for k in range(1000)]
+    assert SWM_benchmark.measure(keeps, 1000, repeats=2)["Retained Blocks per Step"] >= 1
+    assert SWM_benchmark.measure(frees, 1000, repeats=2)["Retained Blocks per Step"] < 0.1
+
+
+def test_measure_records_every_repeat():
+    result = SWM_benchmark.measure(lambda: sum(range(1000)), 1000, repeats=4)
+    assert result["Repeats"] == 4
+    assert result["Median Seconds"] >= result["Seconds"] > 0
+    assert result["Steps per Second"] == 1000 / result["Seconds"]
+
+
+def test_compare_flags_real_regressions():
+    baseline = {"a": _result(1.0), "b": _result(1.0), "c": _result(1.0)}
+    results = {"a": _result(1.5), "b": _result(1.0, peak=2000), "c": _result(1.0, blocks=5.0)}
+    regressions = SWM_benchmark.compare(results, baseline)
+    assert len(regressions) == 3
+    assert [r.split(":")[0] for r in regressions] == ["a", "b", "c"]
+
+
+def test_compare_allows_for_noise():
+    #within tolerance plus the noise floor
+    assert SWM_benchmark.compare({"a": _result(1.24)}, {"a": _result(1.0)}) == []
+    #beyond that, but the new runs were noisy enough to explain it
+    assert SWM_benchmark.compare({"a": _result(1.35, median=1.6)}, {"a": _result(1.0)}) == []
+    assert SWM_benchmark.compare({"a": _result(1.35)}, {"a": _result(1.0)}) != []
+
+
+def test_compare_skips_missing_cases_and_values():
+    old = _result(1.0)
+    del old["Retained Blocks per Step"]
+    assert SWM_benchmark.compare({"a": _result(1.0, blocks=50), "b": _result(9.0)}, {"a": old}) == []
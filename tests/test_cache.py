@@ -0,0 +1,66 @@
+import pytest
+import SWMv1_3 as SWM
+import SWM_cache
+
+
+MP = {"Probabilistic Choices": "True"}
+
+
+def test_hit_matches_simulate():
+    cache = SWM_cache.SimulationCache()
+    first = cache.simulate(60, "LB", 3, MP, SILENT=True)
+    second = cache.simulate(60, "LB", 3, MP, SILENT=True)
+    expected = SWM.simulate(60, "LB", 3, MP, SILENT=True)
+    assert first == expected
+    assert second == expected
+    assert cache.stats()["Hits"] == 1
+    assert cache.stats()["Misses"] == 1
+
+
+def test_serves_a_shorter_prefix():
+    cache = SWM_cache.SimulationCache()
+    cache.simulate(100, [0, 10], 5, SILENT=True)
+    short = cache.simulate(40, [0, 10], 5, SILENT=True)
+    assert short == SWM.simulate(40, [0, 10], 5, SILENT=True)
+    assert cache.stats()["Prefix Hits"] == 1
+    assert cache.stats()["Misses"] == 1
+
+
+def test_longer_request_is_a_miss():
+    cache = SWM_cache.SimulationCache()
+    cache.simulate(20, "CT", 1, SILENT=True)
+    assert cache.simulate(50, "CT", 1, SILENT=True) == SWM.simulate(50, "CT", 1, SILENT=True)
+    assert cache.stats()["Misses"] == 2
+
+
+def test_key_separates_policies_seeds_and_parameters():
+    cache = SWM_cache.SimulationCache()
+    keys = {cache.key("CT", 1, {}), cache.key("SA", 1, {}), cache.key("CT", 2, {}), cache.key("CT", "2", {}),
+            cache.key("CT", 1, MP)}
+    assert len(keys) == 5
+    #equivalent spellings of a policy share a key
+    assert cache.key("SA", 1, {}) == cache.key([20, 0], 1, {})
+
+
+def test_lru_eviction():
+    cache = SWM_cache.SimulationCache(max_entries=2)
+    for seed in range(3):
+        cache.simulate(10, "CT", seed, SILENT=True)
+    assert cache.stats()["Memory Entries"] == 2
+    cache.simulate(10, "CT", 0, SILENT=True)
+    assert cache.stats()["Misses"] == 4
+
+
+def test_disk_tier(tmp_path):
+    cache = SWM_cache.SimulationCache(directory=str(tmp_path))
+    cache.simulate(50, "LB", 7, SILENT=True)
+    fresh = SWM_cache.SimulationCache(directory=str(tmp_path))
+    result = fresh.simulate(30, "LB", 7, SILENT=True, COLUMNAR=True)
+    assert fresh.stats()["Disk Hits"] == 1
+    assert result["States"].to_list() == SWM.simulate(30, "LB", 7, SILENT=True)["States"]
+
+
+def test_returned_states_are_copies():
+    cache = SWM_cache.SimulationCache()
+    cache.simulate(10, "CT", 0, SILENT=True)["States"].clear()
+    assert len(cache.simulate(10, "CT", 0, SILENT=True)["States"]) == 10
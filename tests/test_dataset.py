@@ -0,0 +1,63 @@
+import numpy, pytest
+import MDP
+import SWMv1_3 as SWM
+
+
+@pytest.fixture(scope="module")
+def results():
+    return SWM.simulate_batch(40, [0, 10, -0.5], list(range(5)), {"Probabilistic Choices": "True"})
+
+
+@pytest.mark.parametrize("percentage_habitat", [0, 1])
+def test_dataset_matches_event_objects(results, percentage_habitat):
+    pathways = [SWM.convert_to_MDP_pathway(dict(r), percentage_habitat=percentage_habitat) for r in results]
+    dataset = SWM.convert_to_MDP_dataset(results, percentage_habitat=percentage_habitat)
+    assert len(dataset) == len(pathways)
+    assert dataset.event_count() == sum(len(pw.events) for pw in pathways)
+    for pw, array_pw in zip(pathways, dataset):
+        assert array_pw.ID_number == pw.ID_number
+        assert array_pw.net_value == pw.net_value
+        assert array_pw.generation_log_joint_prob == pytest.approx(pw.generation_log_joint_prob, rel=1e-12)
+        assert len(array_pw.events) == len(pw.events)
+        for e, view in zip(pw.events, array_pw.events):
+            assert list(view.state) == list(e.state)
+            assert view.action == bool(e.action)
+            assert view.action_prob == e.action_prob
+            assert view.decision_prob == e.decision_prob
+            assert view.sequence_index == e.sequence_index
+            assert list(view.rewards) == list(numpy.atleast_1d(e.rewards))
+
+
+def test_mixed_rewards(results):
+    dataset = SWM.convert_to_MDP_dataset(results, percentage_habitat=0.25)
+    states = numpy.array(results[0]["States"], dtype=float)
+    numpy.testing.assert_array_equal(dataset[0].rewards[:,0], states[:,7] * 0.25)
+    numpy.testing.assert_array_equal(dataset[0].rewards[:,1], states[:,6] * 0.75)
+
+
+def test_convert_pathways_round_trip(results):
+    pathways = [SWM.convert_to_MDP_pathway(dict(r)) for r in results]
+    dataset = MDP.convert_pathways_to_MDP_dataset(pathways)
+    for pw, array_pw in zip(pathways, dataset):
+        assert array_pw.ID_number == pw.ID_number
+        numpy.testing.assert_array_equal(array_pw.feature_matrix(), pw.feature_matrix())
+        numpy.testing.assert_array_equal(array_pw.action_vector(), pw.action_vector())
+
+
+def test_event_views_are_zero_copy_and_indexable(results):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    pw = dataset[2]
+    assert numpy.shares_memory(pw.states, dataset.states)
+    assert pw.events[-1].sequence_index == len(pw.events) - 1
+    assert len(pw.events[1:4]) == 3
+    with pytest.raises(IndexError):
+        pw.events[len(pw.events)]
+
+
+def test_update_net_value_discounts(results):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    pw = dataset[0]
+    pw.discount_rate = 0.9
+    pw.update_net_value()
+    expected = sum(float(r) * 0.9**i for i, r in enumerate(pw.rewards.sum(axis=1)))
+    assert pw.net_value == pytest.approx(expected, rel=1e-12)
@@ -0,0 +1,38 @@
+import math, numpy, pytest
+import MDP
+import SWMv1_3 as SWM
+
+
+@pytest.fixture(scope="module")
+def pathways():
+    results = SWM.simulate_batch(60, [0, 10, -0.5], list(range(8)), {"Probabilistic Choices": "True"})
+    return [SWM.convert_to_MDP_pathway(r) for r in results]
+
+
+def _weights(pathways, params):
+    policy = MDP.MDP_Policy(2)
+    policy.set_params(params)
+    weights = []
+    for pw in pathways:
+        log_w = sum(math.log(policy.calc_action_prob(e)) - math.log(e.decision_prob) for e in pw.events)
+        weights.append(math.exp(log_w))
+    return numpy.array(weights)
+
+
+def test_evaluate_matches_an_event_loop(pathways):
+    candidates = [[0, 10], [1, 8], [-0.5, 12]]
+    results = MDP.MDP_Evaluator(pathways).evaluate(candidates, chunk_size=2)
+    values = numpy.array([pw.net_value for pw in pathways])
+    for k, params in enumerate(candidates):
+        w = _weights(pathways, params)
+        assert results["Value"][k] == pytest.approx(numpy.mean(w * values), rel=1e-9)
+        assert results["Weighted Value"][k] == pytest.approx(numpy.sum(w * values) / numpy.sum(w), rel=1e-9)
+        assert results["Effective Sample Size"][k] == pytest.approx(w.sum()**2 / (w**2).sum(), rel=1e-9)
+
+
+def test_dataset_and_list_agree(pathways):
+    candidates = [[0, 10], [1, 8]]
+    from_list = MDP.MDP_Evaluator(pathways).evaluate(candidates)
+    from_dataset = MDP.MDP_Evaluator(MDP.convert_pathways_to_MDP_dataset(pathways)).evaluate(candidates)
+    for key in from_list:
+        numpy.testing.assert_allclose(from_list[key], from_dataset[key], rtol=1e-12)
@@ -0,0 +1,47 @@
+import random, numpy, pytest
+import SWMv1_3 as SWM
+
+
+MP = {"Probabilistic Choices": "True"}
+
+
+@pytest.mark.parametrize("seed", [0, 9, "abc"])
+@pytest.mark.parametrize("policy", ["CT", "SA", [0, 10, -0.5]])
+def test_replay_matches_seeded_simulate(seed, policy):
+    tape = SWM.EventTape(80, seed)
+    assert SWM.simulate(80, policy, None, MP, SILENT=True, tape=tape) == SWM.simulate(80, policy, seed, MP, SILENT=True)
+
+
+def test_tape_matches_the_random_module():
+    tape = SWM.EventTape(5, 42)
+    rng = random.Random(42)
+    draws = [rng.uniform(0, 1) for k in range(13)]
+    numpy.testing.assert_array_equal(tape.starts, draws[:3])
+    numpy.testing.assert_array_equal(tape.ev, draws[3::2])
+    numpy.testing.assert_array_equal(tape.choice_roll, draws[4::2])
+
+
+def test_shorter_replay_is_a_prefix():
+    tape = SWM.EventTape(100, 3)
+    short = SWM.simulate(30, "LB", None, SILENT=True, tape=tape)
+    assert short["States"] == SWM.simulate(100, "LB", None, SILENT=True, tape=tape)["States"][:30]
+
+
+def test_too_short_tape_raises():
+    with pytest.raises(ValueError):
+        SWM.simulate(20, "CT", None, SILENT=True, tape=SWM.EventTape(10, 0))
+
+
+def test_batch_and_iter_replay_the_same_tape():
+    tapes = [SWM.EventTape(50, s) for s in range(4)]
+    expected = [SWM.simulate(50, "CT", None, MP, SILENT=True, tape=t) for t in tapes]
+    batch = SWM.simulate_batch(50, "CT", None, MP, KEEP_STATES=True, tapes=tapes)
+    assert batch == expected
+    assert list(SWM.simulate_iter(50, "CT", None, MP, tape=tapes[1])) == expected[1]["States"]
+
+
+def test_explicit_draws():
+    tape = SWM.EventTape(starts=[0.5, 0.5, 0.5], ev=[0.1, 0.9], choice_roll=[0.2, 0.8], random_seed="fixed")
+    result = SWM.simulate(2, "SA", None, SILENT=True, tape=tape)
+    assert result["ID Number"] == "fixed"
+    assert [s[2] for s in result["States"]] == pytest.approx([0.1, 0.9])
@@ -0,0 +1,61 @@
+import math, pickle, numpy, pytest
+import MDP
+import SWMv1_3 as SWM
+
+
+@pytest.fixture
+def pathway():
+    result = SWM.simulate(60, [0, 10, -0.5], 3, {"Probabilistic Choices": "True"}, SILENT=True)
+    return SWM.convert_to_MDP_pathway(result)
+
+
+def _loop_probs(pathway, params):
+    policy = MDP.MDP_Policy(2)
+    policy.set_params(params)
+    return [policy.calc_action_prob(e) for e in pathway.events]
+
+
+@pytest.mark.parametrize("params", [[0, 10], [1, -3], [0.5, 2.0]])
+def test_action_probs_match_the_event_loop(pathway, params):
+    probs = pathway.calc_action_probs(params)
+    assert probs == pytest.approx(_loop_probs(pathway, params), rel=1e-12)
+    joint, log_joint = pathway.calc_joint_probs(params)
+    assert log_joint == pytest.approx(sum(math.log(p) for p in probs), rel=1e-12)
+
+
+def test_matrix_is_cached(pathway):
+    assert pathway.feature_matrix() is pathway.feature_matrix()
+    assert pathway.action_vector() is pathway.action_vector()
+
+
+def test_list_changes_drop_the_cache(pathway):
+    before = pathway.feature_matrix()
+    event = pathway.events.pop()
+    assert pathway.feature_matrix().shape == (before.shape[0] - 1, 2)
+    pathway.events.append(event)
+    assert pathway.feature_matrix().shape == before.shape
+    pathway.events[0] = pathway.events[1]
+    numpy.testing.assert_array_equal(pathway.feature_matrix()[0], pathway.feature_matrix()[1])
+    del pathway.events[:10]
+    assert len(pathway.action_vector()) == len(pathway.events)
+    pathway.events = []
+    assert pathway.feature_matrix().shape == (0, 2)
+
+
+def test_event_changes_need_invalidating(pathway):
+    pathway.feature_matrix()
+    pathway.events[0].state = [1, 0.123]
+    pathway.invalidate_feature_cache()
+    assert pathway.feature_matrix()[0,1] == 0.123
+
+
+def test_pickle_round_trip(pathway):
+    pathway.feature_matrix()
+    copy = pickle.loads(pickle.dumps(pathway))
+    copy.events.pop()
+    assert copy.feature_matrix().shape[0] == len(pathway.events) - 1
+
+
+def test_update_joint_prob(pathway):
+    pathway.set_generation_policy_parameters([0, 10], UPDATE_JOINT_PROB=True)
+    assert pathway.generation_log_joint_prob == pytest.approx(sum(math.log(p) for p in _loop_probs(pathway, [0, 10])))
@@ -0,0 +1,76 @@
+import numpy, pytest
+import SWMv1_3 as SWM
+import MDP_index
+
+
+@pytest.fixture(scope="module")
+def pathways():
+    pathways = []
+    for policy in ["LB", [0, 0], [20, 0]]:
+        for seed in range(6):
+            pathways.append(SWM.convert_to_MDP_pathway(SWM.simulate(30, policy, seed, SILENT=True)))
+    return pathways
+
+
+@pytest.fixture(scope="module")
+def index(pathways):
+    return MDP_index.MDP_MetadataIndex(pathways, policy_normalizer=SWM.sanitize_policy)
+
+
+def _scan(pathways, policy=None, seeds=None, ranges={}):
+    matched = []
+    for i, pw in enumerate(pathways):
+        if policy is not None and SWM.sanitize_policy(pw.metadata["Generation Policy"]) != SWM.sanitize_policy(policy):
+            continue
+        if seeds is not None and pw.ID_number not in seeds:
+            continue
+        if any(not (low <= pw.metadata[key] <= high) for key, (low, high) in ranges.items()):
+            continue
+        matched.append(i)
+    return matched
+
+
+def test_queries_match_a_scan(pathways, index):
+    values = sorted(pw.metadata["Total Pathway Value"] for pw in pathways)
+    ranges = {"Total Pathway Value": [values[5], values[-5]]}
+    assert list(index.query()) == list(range(len(pathways)))
+    assert list(index.query(policy=[0, 0], seed=[1, 4])) == _scan(pathways, [0, 0], [1, 4])
+    assert list(index.query(seed=2, ranges=ranges)) == _scan(pathways, seeds=[2], ranges=ranges)
+    assert list(index.query(policy="LB", ranges=ranges)) == _scan(pathways, "LB", ranges=ranges)
+
+
+def test_policy_names_match_their_values(index):
+    assert list(index.query(policy="SA")) == list(index.query(policy=[20, 0]))
+    assert list(index.query(policy=(20.0, 0.0))) == list(index.query(policy=numpy.array([20, 0])))
+    assert len(index.query(policy="SA")) == 6
+    assert list(index.query(policy=[-20, 0])) == list(range(6))
+    assert len(index.query(policy=[5, 5])) == 0
+
+
+def test_repeated_seeds_match_once(index):
+    once = index.query(seed=[3])
+    assert list(index.query(seed=[3, 3, 3])) == list(once)
+    assert list(index.query(seed=numpy.array([3, 1, 3]))) == list(index.query(seed=[1, 3]))
+    assert list(index.ids(seed=[3, 3])) == [3, 3, 3]
+
+
+def test_ranges_and_selection(pathways, index):
+    assert len(index.query(ranges={"Total Pathway Value": [None, None]})) == len(pathways)
+    selected = index.select(policy="CT", seed=0)
+    assert len(selected) == 1 and selected[0] is pathways[6]
+    with pytest.raises(ValueError):
+        index.query(ranges={"Timber Value": [0, 1]})
+
+
+def test_policies_match_exactly_without_a_normalizer(pathways):
+    index = MDP_index.MDP_MetadataIndex(pathways)
+    assert list(index.query(policy="LB")) == list(range(6))
+    assert len(index.query(policy=[-20, 0])) == 0
+    assert list(index.query(policy=(0.0, 0.0))) == list(index.query(policy=numpy.array([0, 0])))
+    assert list(index.query(policy=[20, 0])) == list(range(12, 18))
+
+
+def test_index_doesnt_need_the_simulator():
+    import os, subprocess, sys
+    code = "import sys, MDP_index; sys.exit('SWMv1_3' in sys.modules)"
+    assert subprocess.call([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(MDP_index.__file__))) == 0
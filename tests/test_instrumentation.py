@@ -0,0 +1,50 @@
+import pytest
+import SWMv1_3 as SWM
+
+
+@pytest.mark.parametrize("model_parameters", [{}, {"Probabilistic Choices": "True"}])
+@pytest.mark.parametrize("policy", ["CT", "LB", [0, 10], [200, -400]])
+def test_stats_runs_are_identical(policy, model_parameters):
+    stats = SWM.SimulationStats()
+    result = SWM.simulate(150, policy, 4, model_parameters, SILENT=True, stats=stats)
+    assert result == SWM.simulate(150, policy, 4, model_parameters, SILENT=True)
+    assert SWM.SWMSimulator(model_parameters).simulate(150, 4, policy=policy, stats=SWM.SimulationStats()) == result
+
+
+def test_counters_match_the_pathway():
+    stats = SWM.SimulationStats()
+    result = SWM.simulate(200, [0, 10, -0.5], 2, {"Probabilistic Choices": "True"}, SILENT=True, stats=stats)
+    report = stats.report()
+    assert report["Pathways"] == 1
+    assert report["Timesteps"] == 200
+    assert report["Counts"]["RNG Draws"] == 3 + 2 * 200
+    assert report["Counts"]["Policy Evaluations"] == 200
+    assert report["Counts"]["Suppressions"] == result["Suppressions"]
+    assert report["Counts"]["Habitat Gains"] + report["Counts"]["Habitat Losses"] == 200
+    assert report["Fraction"] == pytest.approx(dict((k, v / sum(report["Seconds"].values()))
+                                                    for k, v in report["Seconds"].items()))
+
+
+def test_policy_clamps_are_counted():
+    stats = SWM.SimulationStats()
+    SWM.simulate(50, [200, 0], 0, SILENT=True, stats=stats)
+    assert stats.counts["Policy Clamps High"] == 50
+    assert stats.counts["Policy Clamps Low"] == 0
+
+
+def test_sink_gets_one_report_per_pathway():
+    reports = []
+    stats = SWM.SimulationStats(sink=reports.append)
+    for seed in range(3):
+        SWM.simulate(20, "CT", seed, SILENT=True, stats=stats)
+    assert [r["Timesteps"] for r in reports] == [20, 20, 20]
+    assert stats.pathways == 0
+
+
+def test_merge_adds_up():
+    a, b = SWM.SimulationStats(), SWM.SimulationStats()
+    SWM.simulate(30, "CT", 0, SILENT=True, stats=a)
+    SWM.simulate(40, "CT", 1, SILENT=True, stats=b)
+    a.merge(b)
+    assert a.timesteps == 70
+    assert a.pathways == 2
@@ -0,0 +1,27 @@
+import numpy, pytest
+import MDP
+import SWMv1_3 as SWM
+
+
+@pytest.fixture(scope="module")
+def pathways():
+    results = SWM.simulate_batch(50, [0, 10, -0.5], list(range(6)), {"Probabilistic Choices": "True"})
+    return [SWM.convert_to_MDP_pathway(r) for r in results]
+
+
+def test_batch_matches_kld(pathways):
+    candidates = [[0, 10], [1, 8], [-2, 3], [0, 0]]
+    batch = MDP.KLD_batch(pathways, candidates)
+    assert batch.shape == (len(candidates),)
+    for k, params in enumerate(candidates):
+        assert batch[k] == pytest.approx(MDP.KLD(pathways, params), rel=1e-9, abs=1e-12)
+
+
+def test_chunked_matches_unchunked(pathways):
+    candidates = numpy.random.RandomState(0).uniform(-5, 5, (7, 2))
+    evaluator = MDP.MDP_Evaluator(pathways)
+    numpy.testing.assert_allclose(evaluator.KLD(candidates, chunk_size=3), evaluator.KLD(candidates), rtol=1e-12)
+
+
+def test_single_policy_row(pathways):
+    assert MDP.KLD_batch(pathways, [1, 8]).shape == (1,)
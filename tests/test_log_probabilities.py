@@ -0,0 +1,30 @@
+import math, pytest
+import MDP
+import SWMv1_3 as SWM
+
+
+def test_log_joint_probability_survives_underflow():
+    mp = {"Probabilistic Choices": "True"}
+    result = SWM.simulate(3000, [0, 0], 1, mp, SILENT=True)
+    #every coin-toss choice has probability one half
+    assert result["Joint Probability"] == 0.0
+    assert result["Log Joint Probability"] == pytest.approx(math.log(0.5) * 3000)
+
+
+def test_log_joint_probability_is_the_same_everywhere():
+    mp = {"Probabilistic Choices": "True"}
+    result = SWM.simulate(250, [0, 10, -0.5], 4, mp, SILENT=True)
+    batch = SWM.simulate_batch(250, [0, 10, -0.5], [4], mp)[0]
+    summary = SWM.RunningSummary()
+    list(SWM.simulate_iter(250, [0, 10, -0.5], 4, mp, summary=summary))
+    assert batch["Log Joint Probability"] == result["Log Joint Probability"]
+    assert summary.summary()["Log Joint Probability"] == result["Log Joint Probability"]
+
+    pathway = SWM.convert_to_MDP_pathway(result)
+    assert pathway.generation_log_joint_prob == result["Log Joint Probability"]
+
+
+def test_MDP_log_joint_prob():
+    assert MDP.log_joint_prob([]) == 0.0
+    assert MDP.log_joint_prob([0.5, 0.25]) == math.log(0.125)
+    assert MDP.log_joint_prob([0.5, 0.0]) == -math.inf
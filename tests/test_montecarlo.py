@@ -0,0 +1,58 @@
+import numpy, pytest
+import SWMv1_3 as SWM
+import SWM_montecarlo
+
+
+def _state(values):
+    estimates = dict((m, SWM_montecarlo.OnlineEstimate()) for m in SWM_montecarlo.MONTE_CARLO_METRICS)
+    estimates["Total Pathway Value"].update(values)
+    return {"Groups": len(values), "Next Batch": 1, "Stopped": None, "Estimates": estimates}
+
+
+def test_online_estimate_matches_numpy():
+    values = numpy.random.RandomState(0).normal(5, 2, 101)
+    estimate = SWM_montecarlo.OnlineEstimate()
+    for chunk in numpy.array_split(values, 7):
+        estimate.update(chunk)
+    assert estimate.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert estimate.std() == pytest.approx(values.std(ddof=1), rel=1e-12)
+
+
+def test_check_stop_waits_for_two_samples_with_batch_size_one():
+    s = _state([10.0])
+    SWM_montecarlo._check_stop(s, {"Total Pathway Value": 1e6}, 0.95, 1, 100)
+    assert s["Stopped"] is None
+    assert s["Next Batch"] == 1
+
+
+def test_check_stop_converges_and_runs_out_of_budget():
+    s = _state([10.0, 10.5, 9.5])
+    SWM_montecarlo._check_stop(s, {"Total Pathway Value": 100.0}, 0.95, 1, 100)
+    assert s["Stopped"] == "Converged"
+    s = _state([0.0, 100.0, 50.0])
+    SWM_montecarlo._check_stop(s, {"Total Pathway Value": 0.1}, 0.95, 1, 3)
+    assert s["Stopped"] == "Budget"
+
+
+def test_batch_size_one_run():
+    reports = SWM_montecarlo.adaptive_monte_carlo(timesteps=50, policies=["CT"], batch_size=1, workers=1, SILENT=True)
+    assert reports[0]["Stopped"] == "Converged"
+    assert reports[0]["Seeds"] >= 2
+
+
+def test_estimates_match_the_seeds_simulated():
+    reports = SWM_montecarlo.adaptive_monte_carlo(timesteps=40, policies=["LB", [0, 10]], max_seeds=64, workers=1,
+                                                  half_widths={"Total Pathway Value": 1.0}, SILENT=True)
+    for report in reports:
+        assert report["Stopped"] == "Budget"
+        values = [SWM.simulate(40, report["Policy"], s, SILENT=True)["Total Pathway Value"] for s in range(report["Seeds"])]
+        assert report["Total Pathway Value"]["Mean"] == pytest.approx(numpy.mean(values), rel=1e-9)
+
+
+def test_seconds_are_per_policy():
+    reports = SWM_montecarlo.adaptive_monte_carlo(timesteps=100, policies=["SA", "CT"], workers=1, max_seeds=512,
+                                                  half_widths={"Total Pathway Value": 5.0}, SILENT=True)
+    for report in reports:
+        assert 0 < report["Seconds"] <= report["Elapsed Seconds"]
+    #the shares of the shared rounds add up to no more than the whole run
+    assert sum(r["Seconds"] for r in reports) <= max(r["Elapsed Seconds"] for r in reports)
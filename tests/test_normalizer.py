@@ -0,0 +1,109 @@
+import numpy, pytest
+import MDP, MDP_store
+import SWMv1_3 as SWM
+
+
+@pytest.fixture
+def results():
+    return SWM.simulate_batch(40, [0, 10, -0.5], list(range(6)), {"Probabilistic Choices": "True"})
+
+
+def _fitted(pathways):
+    normalizer = MDP.MDP_Normalizer()
+    normalizer.update(pathways)
+    return normalizer
+
+
+def test_matches_whole_dataset_statistics(results):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    normalizer = MDP.MDP_Normalizer()
+    normalizer.update(dataset[:3])
+    other = MDP.MDP_Normalizer()
+    other.update(dataset[3:])
+    normalizer.merge(other)
+    assert normalizer.count == dataset.event_count()
+    numpy.testing.assert_allclose(normalizer.mean, dataset.states.mean(axis=0), rtol=1e-12)
+    numpy.testing.assert_allclose(normalizer.M2 / normalizer.count, dataset.states.var(axis=0), rtol=1e-9)
+
+
+@pytest.mark.parametrize("kind", ["list", "dataset", "array pathways"])
+def test_apply_and_denormalize_round_trip(results, kind):
+    if kind == "list":
+        pathways = [SWM.convert_to_MDP_pathway(dict(r)) for r in results]
+    elif kind == "dataset":
+        pathways = SWM.convert_to_MDP_dataset(results)
+    else:
+        pathways = list(SWM.convert_to_MDP_dataset(results))[1:4]
+    original = [(pw.feature_matrix().copy(), pw.net_value) for pw in pathways]
+
+    normalizer = _fitted(pathways)
+    normalizer.apply(pathways)
+    means, mags = normalizer.means(), normalizer.magnitudes()
+    for pw, (X, value) in zip(pathways, original):
+        assert pw.normalized
+        numpy.testing.assert_allclose(pw.feature_matrix(), (X - means) / mags)
+
+    MDP.denormalize(pathways)
+    for pw, (X, value) in zip(pathways, original):
+        numpy.testing.assert_array_equal(pw.feature_matrix(), X)
+        assert pw.net_value == value
+        assert not pw.normalized
+
+
+@pytest.mark.parametrize("applied, denormalized", [("dataset", "list"), ("list", "dataset"), ("dataset", "dataset"),
+                                                    ("list", "list")])
+def test_dataset_round_trips_either_way(results, applied, denormalized):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    #values that the power-of-two scaling can't restore exactly, so corrections are needed
+    dataset.states[:, 1] += 0.1
+    original = dataset.states.copy()
+    values = [pw.net_value for pw in dataset]
+
+    normalizer = _fitted(dataset)
+    normalizer.apply(dataset if applied == "dataset" else list(dataset))
+    assert not numpy.array_equal(dataset.states, original)
+    MDP.denormalize(dataset if denormalized == "dataset" else list(dataset))
+
+    numpy.testing.assert_array_equal(dataset.states, original)
+    assert [pw.net_value for pw in dataset] == values
+    assert not any(pw.normalized or pw.normalized_value for pw in dataset)
+
+
+def test_magnitudes_are_powers_of_two(results):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    normalizer = _fitted(dataset)
+    mags = normalizer.magnitudes()
+    numpy.testing.assert_array_equal(numpy.log2(mags), numpy.round(numpy.log2(mags)))
+    normalizer.apply(dataset)
+    std = dataset.states.std(axis=0)
+    varying = normalizer.M2 > 0
+    assert numpy.all((std[varying] > 0.7) & (std[varying] < 1.42))
+
+
+def test_array_pathways_write_into_their_dataset(results):
+    dataset = SWM.convert_to_MDP_dataset(results)
+    untouched = dataset.states[dataset.pathway_slice(0)].copy()
+    subset = [dataset[2], dataset[4]]
+    _fitted(subset).apply(subset, VALUES=False)
+    assert subset[0].events[0].state[1] == dataset.states[dataset.pathway_slice(2)][0,1]
+    numpy.testing.assert_array_equal(dataset.states[dataset.pathway_slice(0)], untouched)
+
+
+def test_read_only_dataset_raises_before_changing_anything(tmp_path, results):
+    store = MDP_store.MDP_PathwayStore(str(tmp_path / "store"))
+    store.append(results)
+    dataset = store.load(mmap_mode="r")
+    normalizer = _fitted(dataset)
+    with pytest.raises(ValueError, match="read-only"):
+        normalizer.apply(dataset)
+    with pytest.raises(ValueError, match="read-only"):
+        normalizer.apply(list(dataset))
+    assert not any(pw.normalized or pw.normalized_value for pw in dataset)
+
+
+def test_already_normalized_raises(results):
+    pathways = [SWM.convert_to_MDP_pathway(dict(r)) for r in results]
+    normalizer = _fitted(pathways)
+    normalizer.apply(pathways)
+    with pytest.raises(ValueError):
+        normalizer.apply(pathways)
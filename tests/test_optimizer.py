@@ -0,0 +1,56 @@
+import concurrent.futures, os
+import numpy, pytest
+
+import SWMv1_3 as SWM
+import SWM_optimizer
+
+
+def test_simulate_parallel_with_executor_matches_without():
+    seeds = list(range(12))
+    expected = SWM.simulate_parallel(40, "LB", seeds, workers=1)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as executor:
+        first = SWM.simulate_parallel(40, "LB", seeds, workers=2, executor=executor)
+        #the same pool serves a second call
+        second = SWM.simulate_parallel(40, "LB", seeds, workers=2, executor=executor)
+    assert first == expected
+    assert second == expected
+
+
+def test_gradient_estimate_shape():
+    results = SWM.simulate_parallel(60, [5, 0], range(64), {"Probabilistic Choices": "True"}, workers=1,
+                                    KEEP_STATES=True, COLUMNAR=True)
+    grad = SWM_optimizer.policy_gradient_estimate(results)
+    assert grad.shape == (2,)
+    assert numpy.all(numpy.isfinite(grad))
+
+
+def test_pooled_run_matches_serial_run():
+    kwargs = dict(timesteps=30, start_policy=[0, 0], iterations=3, rollouts=8, SILENT=True)
+    serial = SWM_optimizer.policy_gradient(workers=1, **kwargs)
+    pooled = SWM_optimizer.policy_gradient(workers=2, **kwargs)
+    assert [h["Policy"] for h in pooled] == [h["Policy"] for h in serial]
+    assert [h["Gradient"] for h in pooled] == [h["Gradient"] for h in serial]
+
+
+def test_resumed_run_matches_straight_run(tmp_path):
+    kwargs = dict(timesteps=30, start_policy=[0, 0], rollouts=8, workers=1, SILENT=True)
+    straight = SWM_optimizer.policy_gradient(iterations=4, **kwargs)
+
+    checkpoint = str(tmp_path / "pg.json")
+    SWM_optimizer.policy_gradient(iterations=2, checkpoint_file=checkpoint, **kwargs)
+    resumed = SWM_optimizer.policy_gradient(iterations=4, checkpoint_file=checkpoint, **kwargs)
+
+    assert len(resumed) == 4
+    assert [h["Policy"] for h in resumed] == [h["Policy"] for h in straight]
+    assert not os.path.exists(checkpoint + ".tmp")
+
+
+@pytest.mark.parametrize("changed", [dict(start_seed=5), dict(rollouts=4), dict(timesteps=20), dict(learning_rate=0.1),
+                                     dict(model_parameters={"Severe Burn Cost": 300})])
+def test_resuming_with_other_settings_raises(tmp_path, changed):
+    kwargs = dict(timesteps=30, start_policy=[0, 0], rollouts=8, workers=1, SILENT=True)
+    checkpoint = str(tmp_path / "pg.json")
+    SWM_optimizer.policy_gradient(iterations=1, checkpoint_file=checkpoint, **kwargs)
+    kwargs.update(changed)
+    with pytest.raises(ValueError, match="different settings"):
+        SWM_optimizer.policy_gradient(iterations=2, checkpoint_file=checkpoint, **kwargs)
@@ -0,0 +1,31 @@
+import SWMv1_3 as SWM
+
+
+def _without_states(summary):
+    summary = dict(summary)
+    summary.pop("States")
+    return summary
+
+
+def test_columnar_simulate_matches_lists():
+    mp = {"Probabilistic Choices": "True"}
+    rows = SWM.simulate(120, [0, 10, -0.5], 3, mp, SILENT=True)
+    columns = SWM.simulate(120, [0, 10, -0.5], 3, mp, SILENT=True, COLUMNAR=True)
+    assert isinstance(columns["States"], SWM.PathwayStates)
+    assert _without_states(columns) == _without_states(rows)
+    assert columns["States"].to_list() == rows["States"]
+    assert columns["States"][5] == rows["States"][5]
+
+
+def test_columnar_batch_matches_simulate():
+    batch = SWM.simulate_batch(50, [0, 10], [1, 2], COLUMNAR=True)
+    for seed, result in zip([1, 2], batch):
+        assert result["States"].to_list() == SWM.simulate(50, [0, 10], seed, SILENT=True)["States"]
+
+
+def test_prefix_and_columns():
+    states = SWM.simulate(40, [0, 0], 1, SILENT=True, COLUMNAR=True)["States"]
+    prefix = states.prefix(10)
+    assert len(prefix) == 10
+    assert prefix.to_list() == states[:10]
+    assert list(states.column(6)) == [s[6] for s in states]
@@ -0,0 +1,55 @@
+import json, os, numpy, pytest
+import SWMv1_3 as SWM
+
+
+def test_resumed_run_matches_straight_run(tmp_path):
+    checkpoint = str(tmp_path / "pathway.json")
+    first = SWM.ResumableSimulation(300, "LB", 5)
+    first.run(120, checkpoint_file=checkpoint)
+    resumed = SWM.ResumableSimulation.load(checkpoint)
+    assert resumed.timestep() == 120
+    resumed.run()
+    straight = SWM.ResumableSimulation(300, "LB", 5)
+    straight.run()
+    assert resumed.summary() == straight.summary()
+
+
+def test_kept_states_match_simulate(tmp_path):
+    checkpoint = str(tmp_path / "pathway.json")
+    summary = SWM.simulate_resumable(200, [1, 2], 9, checkpoint_file=checkpoint, checkpoint_every=50,
+                                     KEEP_STATES=True, SILENT=True)
+    assert summary == SWM.simulate(200, [1, 2], 9, SILENT=True)
+    assert not os.path.exists(checkpoint + ".tmp")
+
+
+def test_numpy_values_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "pathway.json")
+    parameters = {"Severe Burn Cost": numpy.int64(300)}
+    sim = SWM.ResumableSimulation(100, [numpy.int64(1), numpy.float32(2.0)], 4, parameters)
+    sim.run(40, checkpoint_file=checkpoint)
+    with open(checkpoint) as f:
+        saved = json.load(f)
+    assert saved["Policy"] == [1, 2.0]
+    assert saved["Model Parameters"] == {"Severe Burn Cost": 300}
+    assert saved["Random Seed"] == 4
+    resumed = SWM.ResumableSimulation.load(checkpoint)
+    resumed.run()
+    sim.run()
+    assert resumed.summary() == sim.summary()
+    #simulate_resumable still recognizes the pathway the checkpoint is for
+    summary = SWM.simulate_resumable(100, [numpy.int64(1), numpy.float32(2.0)], 4, parameters, checkpoint, SILENT=True)
+    assert summary == sim.summary()
+
+
+def test_failed_save_keeps_the_last_checkpoint(tmp_path):
+    checkpoint = str(tmp_path / "pathway.json")
+    sim = SWM.ResumableSimulation(100, "CT", 1)
+    sim.run(30, checkpoint_file=checkpoint)
+    with open(checkpoint) as f:
+        before = f.read()
+    sim.random_seed = object()
+    with pytest.raises(TypeError):
+        sim.run(30, checkpoint_file=checkpoint)
+    with open(checkpoint) as f:
+        assert f.read() == before
+    assert not os.path.exists(checkpoint + ".tmp")
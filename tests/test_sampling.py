@@ -0,0 +1,62 @@
+import numpy, pytest
+import SWMv1_3 as SWM
+import SWM_montecarlo
+
+
+def test_plain_matches_the_seeds():
+    tape, = SWM_montecarlo.sampling_tapes(40, "plain", group_seed=7)
+    assert SWM.simulate(40, "CT", None, SILENT=True, tape=tape) == SWM.simulate(40, "CT", 7, SILENT=True)
+
+
+def test_antithetic_mirror():
+    tape, mirror = SWM_montecarlo.sampling_tapes(40, "antithetic", group_seed=3)
+    assert SWM.simulate(40, "LB", None, SILENT=True, tape=tape) == SWM.simulate(40, "LB", 3, SILENT=True)
+    numpy.testing.assert_array_equal(mirror.ev, 1.0 - tape.ev)
+    numpy.testing.assert_array_equal(mirror.choice_roll, 1.0 - tape.choice_roll)
+    numpy.testing.assert_array_equal(mirror.starts, 1.0 - tape.starts)
+
+
+@pytest.mark.parametrize("sampling,size", [("sobol", 8), ("halton", 5), ("stratified", 6)])
+def test_qmc_groups(sampling, size):
+    tapes = SWM_montecarlo.sampling_tapes(30, sampling, size, group_seed=2)
+    assert len(tapes) == size
+    assert [t.random_seed for t in tapes] == list(range(2 * size, 3 * size))
+    ev = numpy.array([t.ev for t in tapes])
+    assert ev.shape == (size, 30)
+    assert numpy.all((ev >= 0) & (ev < 1))
+    if sampling == "stratified":
+        #one draw in each stratum of every dimension
+        strata = numpy.sort(numpy.floor(ev * size), axis=0)
+        assert numpy.all(strata == numpy.arange(size)[:,None])
+
+
+def test_groups_are_reproducible():
+    a = SWM_montecarlo.sampling_tapes(20, "sobol", 4, group_seed=1)
+    b = SWM_montecarlo.sampling_tapes(20, "sobol", 4, group_seed=1)
+    c = SWM_montecarlo.sampling_tapes(20, "sobol", 4, group_seed=2)
+    numpy.testing.assert_array_equal(a[0].ev, b[0].ev)
+    assert not numpy.array_equal(a[0].ev, c[0].ev)
+
+
+def test_bad_modes_and_sizes_raise():
+    with pytest.raises(ValueError):
+        SWM_montecarlo.sampling_tapes(10, "lattice")
+    with pytest.raises(ValueError):
+        SWM_montecarlo.sampling_tapes(10, "sobol", 6)
+
+
+def test_compare_sampling():
+    results = SWM_montecarlo.compare_sampling(timesteps=40, policy="CT", pathways=64, modes=["antithetic", "sobol"],
+                                              group_size=8, workers=1, SILENT=True)
+    assert sorted(results) == ["antithetic", "plain", "sobol"]
+    assert results["plain"]["Pathways"] == 64
+    assert results["sobol"]["Groups"] == 8
+    assert results["plain"]["Total Pathway Value"]["Gain"] == 1.0
+    plain = [SWM.simulate(40, "CT", s, SILENT=True)["Total Pathway Value"] for s in range(64)]
+    assert results["plain"]["Total Pathway Value"]["Mean"] == pytest.approx(numpy.mean(plain), rel=1e-12)
+
+
+def test_adaptive_run_with_groups():
+    reports = SWM_montecarlo.adaptive_monte_carlo(timesteps=40, policies=["CT"], sampling="antithetic", batch_size=8,
+                                                  max_seeds=64, workers=1, SILENT=True)
+    assert reports[0]["Seeds"] == 2 * reports[0]["Groups"]
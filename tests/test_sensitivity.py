@@ -0,0 +1,52 @@
+import numpy, pytest
+import SWMv1_3 as SWM
+import SWM_sensitivity
+
+
+def test_per_pathway_parameters_match_scalar_simulate():
+    costs = [10.0, 40.0, 80.0]
+    mp = {"Severe Burn Cost": numpy.repeat(costs, 2), "Probabilistic Choices": "True"}
+    results = SWM.simulate_parallel(60, "CT", [0, 1] * 3, mp, workers=2, chunk_size=2)
+    for k, result in enumerate(results):
+        expected = SWM.simulate(60, "CT", k % 2, {"Severe Burn Cost": costs[k // 2], "Probabilistic Choices": "True"},
+                                SILENT=True)
+        expected.pop("States")
+        assert result == expected
+
+
+def test_evaluate_design_matches_simulate():
+    points = numpy.array([[20.0, 0.1], [60.0, 0.3]])
+    names = ["Severe Burn Cost", "Vulnerability Change After Suppression"]
+    values = SWM_sensitivity.evaluate_design(points, names, timesteps=50, policy="SA", seeds=3, workers=1)
+    for point, value in zip(points, values):
+        mp = dict(zip(names, point))
+        expected = numpy.mean([SWM.simulate(50, "SA", s, mp, SILENT=True)["Total Pathway Value"] for s in range(3)])
+        assert value == pytest.approx(expected, rel=1e-12)
+
+
+def test_sobol_indices_find_the_parameter_that_matters():
+    ranges = {"Severe Burn Cost": [0.0, 200.0], "Starting Habitat Value": [2.0, 8.0]}
+    results = SWM_sensitivity.sobol_indices(ranges, samples=32, timesteps=40, policy="LB", seeds=2, bootstrap=50,
+                                            workers=1, SILENT=True)
+    #habitat doesn't enter the pathway value, so only the burn cost can explain its variance
+    assert results["Starting Habitat Value"]["Total"] == pytest.approx(0.0, abs=1e-12)
+    assert results["Severe Burn Cost"]["Total"] > 0.5
+    assert results["Evaluations"] == 32 * 4
+    low, high = results["Severe Burn Cost"]["Total CI"]
+    assert low <= high
+
+
+def test_morris_screening_ranks_parameters():
+    ranges = {"Severe Burn Cost": [0.0, 200.0], "Starting Habitat Value": [2.0, 8.0]}
+    results = SWM_sensitivity.morris_screening(ranges, trajectories=6, timesteps=40, policy="LB", seeds=2,
+                                               bootstrap=20, workers=1, SILENT=True)
+    assert results["Starting Habitat Value"]["Mu Star"] == 0.0
+    assert results["Severe Burn Cost"]["Mu Star"] > 0
+    assert results["Evaluations"] == 6 * 3
+
+
+@pytest.mark.parametrize("ranges", [{}, {"Probabilistic Choices": [0, 1]}, {"Not A Parameter": [0, 1]},
+                                    {"Severe Burn Cost": [5, 5]}])
+def test_bad_ranges_raise(ranges):
+    with pytest.raises(ValueError):
+        SWM_sensitivity.sobol_indices(ranges, samples=4, SILENT=True)
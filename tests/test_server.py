@@ -0,0 +1,93 @@
+import asyncio, json, pytest
+import SWMv1_3 as SWM
+import SWM_server
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _exchange(server, requests):
+    """Sends the requests on one connection and returns the responses by id"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+    for request in requests:
+        writer.write(json.dumps(request).encode("utf-8") + b"\n")
+    await writer.drain()
+    responses = {}
+    for request in requests:
+        response = json.loads(await reader.readline())
+        responses[response["id"]] = response
+    writer.close()
+    return responses
+
+
+def test_simulate_matches_simulate():
+    async def main():
+        server = SWM_server.SimulationServer(port=0, workers=1, batch_window=0.05)
+        await server.start()
+        try:
+            return await _exchange(server, [{"id": s, "op": "simulate", "timesteps": 40, "policy": "LB", "seed": s}
+                                            for s in range(4)])
+        finally:
+            await server.close()
+    responses = _run(main())
+    for s in range(4):
+        expected = SWM.simulate(40, "LB", s, SILENT=True)
+        expected.pop("States")
+        assert responses[s]["result"] == json.loads(json.dumps(expected))
+
+
+def test_bad_requests_only_fail_themselves():
+    async def main():
+        server = SWM_server.SimulationServer(port=0, workers=1, batch_window=0.05)
+        await server.start()
+        try:
+            return await _exchange(server, [
+                {"id": 1, "op": "simulate", "timesteps": 30, "policy": [0, 10], "seed": 1},
+                {"id": 2, "op": "simulate", "timesteps": 30, "policy": [1], "seed": 2},
+                {"id": 3, "op": "simulate", "timesteps": 30, "policy": [0, 10], "seed": [1, 2]},
+                {"id": 4, "op": "simulate", "timesteps": 30, "policy": "SA", "seed": 4},
+                {"id": 5, "op": "simulate", "timesteps": 30, "model_parameters": {"Nope": 1}},
+                {"id": 6, "op": "simulate", "timesteps": 0, "policy": [0, 10], "seed": 6},
+                {"id": 7, "op": "convert", "timesteps": -5, "policy": [0, 10], "seed": 7},
+            ]), server.stats()
+        finally:
+            await server.close()
+    responses, stats = _run(main())
+    assert "result" in responses[1] and "result" in responses[4]
+    assert "policy" in responses[2]["error"]
+    assert "seed" in responses[3]["error"]
+    assert "Nope" in responses[5]["error"]
+    assert "timesteps" in responses[6]["error"] and "timesteps" in responses[7]["error"]
+    assert responses[1]["result"]["Total Pathway Value"] == SWM.simulate(30, [0, 10], 1, SILENT=True)["Total Pathway Value"]
+    assert stats["Errors"] == 5
+
+
+def test_failed_batch_is_rerun_one_job_at_a_time():
+    group = ("simulate", 20, "{}", False)
+    #a policy of the wrong type that got past the request checks
+    results = SWM_server._run_batch(group, [([0, 10], 1, {}), ([1], 2, {}), ("CT", 3, {})])
+    assert isinstance(results[1], Exception)
+    assert results[0]["ID Number"] == 1
+    assert results[2]["ID Number"] == 3
+
+
+def test_close_with_connected_clients_is_quiet():
+    async def main():
+        errors = []
+        asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+        server = SWM_server.SimulationServer(port=0, workers=1)
+        await server.start()
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(json.dumps({"id": 1, "op": "stats"}).encode("utf-8") + b"\n")
+        await writer.drain()
+        await reader.readline()
+        await server.close()
+        #the server ends the connection
+        assert await reader.read() == b""
+        writer.close()
+        await asyncio.sleep(0.01)
+        return errors, server.clients
+    errors, clients = _run(main())
+    assert errors == []
+    assert len(clients) == 0
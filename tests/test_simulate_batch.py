@@ -0,0 +1,38 @@
+import pytest
+import SWMv1_3 as SWM
+
+
+POLICIES = [[0,0], [-20,0], [20,0], [0,20,-0.8], [-10,15], "SA", "LB"]
+MODEL_PARAMETERS = [{}, {"Probabilistic Choices": "True"},
+                    {"Probabilistic Choices": "True", "Severe Burn Cost": 25.5, "Starting Habitat Value": 9,
+                     "Vulnerability Change After Mild": -0.05}]
+
+
+@pytest.mark.parametrize("model_parameters", MODEL_PARAMETERS)
+@pytest.mark.parametrize("timesteps", [1, 60, 300])
+def test_batch_matches_simulate_exactly(timesteps, model_parameters):
+    seeds = list(range(10)) + ["abc"]
+    policies = [POLICIES[i % len(POLICIES)] for i in range(len(seeds))]
+    batch = SWM.simulate_batch(timesteps, policies, seeds, model_parameters)
+    for seed, policy, result in zip(seeds, policies, batch):
+        assert result == SWM.simulate(timesteps, policy, seed, model_parameters, SILENT=True)
+
+
+def test_single_policy_is_shared_by_every_seed():
+    batch = SWM.simulate_batch(40, [0, 10], [1, 2, 3], KEEP_STATES=False)
+    assert [r["Generation Policy"] for r in batch] == [[0, 10]] * 3
+    assert "States" not in batch[0]
+
+
+def test_policy_count_must_match_seeds():
+    with pytest.raises(ValueError):
+        SWM.simulate_batch(10, [[0,0], [1,1]], [1, 2, 3])
+
+
+def test_empty_batch():
+    assert SWM.simulate_batch(10, [0, 0], []) == []
+
+
+def test_probabilistic_choices_cant_vary_by_pathway():
+    with pytest.raises(ValueError, match="same for every pathway"):
+        SWM.simulate_batch(10, [0, 0], [1, 2], {"Probabilistic Choices": ["True", "False"]})
@@ -0,0 +1,43 @@
+import pytest
+import SWMv1_3 as SWM
+
+
+def test_iter_yields_simulate_states():
+    mp = {"Probabilistic Choices": "True"}
+    states = list(SWM.simulate_iter(150, [0, 10, -0.5], 9, mp))
+    assert states == SWM.simulate(150, [0, 10, -0.5], 9, mp, SILENT=True)["States"]
+
+
+def test_running_summary_matches_simulate():
+    mp = {"Probabilistic Choices": "True"}
+    summary = SWM.RunningSummary()
+    for state in SWM.simulate_iter(200, [0, 10, -0.5], 9, mp, summary=summary):
+        pass
+    expected = SWM.simulate(200, [0, 10, -0.5], 9, mp, SILENT=True)
+    result = summary.summary()
+    expected.pop("States")
+    assert set(result) == set(expected)
+    for key in expected:
+        if isinstance(expected[key], float):
+            #Welford's running mean and variance can differ from numpy's in the last digit
+            assert result[key] == pytest.approx(expected[key], rel=1e-9), key
+        else:
+            assert result[key] == expected[key], key
+
+
+def test_iter_leaves_global_random_alone():
+    import random
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    list(SWM.simulate_iter(20, [0, 0], 1))
+    assert random.random() == expected
+
+
+def test_empty_running_summary_raises():
+    summary = SWM.RunningSummary()
+    with pytest.raises(ValueError, match="no states"):
+        summary.summary()
+    list(SWM.simulate_iter(0, [0, 0], 1, summary=summary))
+    with pytest.raises(ValueError, match="no states"):
+        summary.summary()
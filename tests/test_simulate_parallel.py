@@ -0,0 +1,23 @@
+import pytest
+import SWMv1_3 as SWM
+
+
+@pytest.mark.parametrize("workers,chunk_size", [(1, None), (2, None), (2, 1), (3, 5)])
+def test_parallel_matches_simulate(workers, chunk_size):
+    seeds = list(range(12))
+    policies = [[0, 10, -0.5] if s % 2 else "SA" for s in seeds]
+    mp = {"Probabilistic Choices": "True"}
+    results = SWM.simulate_parallel(80, policies, seeds, mp, workers=workers, chunk_size=chunk_size)
+    for seed, policy, result in zip(seeds, policies, results):
+        expected = SWM.simulate(80, policy, seed, mp, SILENT=True)
+        expected.pop("States")
+        assert result == expected
+
+
+def test_parallel_keeps_states_on_request():
+    results = SWM.simulate_parallel(30, [0, 0], [4, 5], workers=2, KEEP_STATES=True)
+    assert results[1]["States"] == SWM.simulate(30, [0, 0], 5, SILENT=True)["States"]
+
+
+def test_empty_parallel():
+    assert SWM.simulate_parallel(10, [0, 0], [], workers=2) == []
@@ -0,0 +1,45 @@
+import concurrent.futures, random, pytest
+import SWMv1_3 as SWM
+
+
+MP = {"Probabilistic Choices": "True", "Severe Burn Cost": 50}
+
+
+def test_matches_simulate():
+    sim = SWM.SWMSimulator(MP, policy="LB")
+    for seed in [0, 5, "x"]:
+        assert sim.simulate(60, seed) == SWM.simulate(60, "LB", seed, MP, SILENT=True)
+    assert sim.simulate(60, 1, policy=[0, 10]) == SWM.simulate(60, [0, 10], 1, MP, SILENT=True)
+
+
+def test_iter_matches_simulate():
+    sim = SWM.SWMSimulator(MP)
+    assert list(sim.simulate_iter(40, 3)) == SWM.simulate(40, [0, 0], 3, MP, SILENT=True)["States"]
+
+
+def test_global_random_state_is_untouched():
+    random.seed(123)
+    expected = random.random()
+    random.seed(123)
+    SWM.SWMSimulator().simulate(50, 7)
+    assert random.random() == expected
+
+
+def test_threads_give_the_same_results():
+    def run(seed):
+        return SWM.SWMSimulator(MP).simulate(100, seed)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as pool:
+        threaded = list(pool.map(run, range(8)))
+    assert threaded == [SWM.simulate(100, [0, 0], s, MP, SILENT=True) for s in range(8)]
+
+
+@pytest.mark.parametrize("model_parameters", [
+    {"Not A Parameter": 1},
+    {"Probabilistic Choices": True},
+    {"Severe Burn Cost": "50"},
+    {"Severe Burn Cost": True},
+    {"Starting Vulnerability": 1.5},
+])
+def test_validate_rejects(model_parameters):
+    with pytest.raises(ValueError):
+        SWM.SWMSimulator(model_parameters)
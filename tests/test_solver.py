@@ -0,0 +1,43 @@
+import numpy, pytest
+import SWM_solver
+
+
+@pytest.fixture(scope="module")
+def model():
+    return SWM_solver.DiscreteSWM(vulnerability_points=11, timber_points=6, habitat_points=5)
+
+
+@pytest.fixture(scope="module")
+def result(model):
+    return model.value_iteration()
+
+
+def test_value_iteration_converges(result):
+    assert result["Converged"]
+    assert result["Value"].shape == (11, 6, 1, 1, 1)
+    assert result["Occupancy"].sum() == pytest.approx(1.0)
+
+
+def test_optimal_bounds_every_logistic_policy(model, result):
+    for policy in ["LB", "SA", "CT", [-5, 20], result["Logistic Fit"], result["Logistic Policy"]]:
+        assert model.evaluate_policy(policy)["Start Value"] <= result["Start Value"] + 1e-6
+
+
+def test_optimized_logistic_is_at_least_the_fit(model, result):
+    assert result["Logistic Start Value"] >= result["Logistic Fit Start Value"]
+    assert result["Logistic Start Value"] == pytest.approx(model.evaluate_policy(result["Logistic Policy"])["Start Value"])
+    assert result["Logistic Fit Start Value"] == pytest.approx(model.evaluate_policy(result["Logistic Fit"])["Start Value"])
+
+
+def test_optimize_logistic_improves_a_poor_start(model):
+    #suppressing only when ev >= 0.5
+    start = [-1, 2]
+    policy, value = model.optimize_logistic(start)
+    assert value["Start Value"] > model.evaluate_policy(start)["Start Value"]
+
+
+def test_evaluating_the_optimal_choices(model, result):
+    #the optimal value is a fixed point of its own greedy backup
+    V = result["Value"].reshape(11, 6, 1)
+    V_new, suppress_mild, suppress_severe = model._bellman(V, 0.96, 0)
+    assert numpy.max(numpy.abs(V_new - V)) < 1e-3
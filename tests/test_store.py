@@ -0,0 +1,122 @@
+import os, numpy, pytest
+import MDP, MDP_store
+import SWMv1_3 as SWM
+
+
+@pytest.fixture(scope="module")
+def results():
+    return SWM.simulate_batch(30, [0, 10, -0.5], list(range(6)), {"Probabilistic Choices": "True"})
+
+
+def _assert_same(dataset, expected):
+    assert len(dataset) == len(expected)
+    for field in MDP_store.MDP_PathwayStore.event_fields:
+        numpy.testing.assert_array_equal(getattr(dataset, field), getattr(expected, field))
+    for pw, expected_pw in zip(dataset, expected):
+        assert pw.ID_number == expected_pw.ID_number
+        assert pw.net_value == expected_pw.net_value
+        assert pw.metadata["Total Pathway Value"] == expected_pw.metadata["Total Pathway Value"]
+
+
+@pytest.mark.parametrize("mmap_mode", ["r", None])
+def test_append_and_load_round_trip(tmp_path, results, mmap_mode):
+    store = MDP_store.MDP_PathwayStore(str(tmp_path / "store"))
+    store.append(results[:2])
+    store.append(results[2:])
+    assert len(store) == len(results)
+    _assert_same(store.load(mmap_mode=mmap_mode), SWM.convert_to_MDP_dataset(results))
+
+
+def test_append_writes_only_new_rows(tmp_path):
+    path = str(tmp_path / "a.npy")
+    MDP_store._append_npy(path, numpy.arange(6.0).reshape(3, 2))
+    size = os.path.getsize(path)
+    for k in range(50):
+        MDP_store._append_npy(path, numpy.full((1, 2), float(k)))
+    #the header never grew, so the file is exactly the new rows longer
+    assert os.path.getsize(path) == size + 50 * 16
+    loaded = numpy.load(path)
+    assert loaded.shape == (53, 2)
+    numpy.testing.assert_array_equal(loaded[-1], [49.0, 49.0])
+
+
+def test_append_to_a_numpy_save_file(tmp_path):
+    path = str(tmp_path / "b.npy")
+    numpy.save(path, numpy.arange(5, dtype=numpy.int64))
+    MDP_store._append_npy(path, numpy.arange(5, 10, dtype=numpy.int64))
+    MDP_store._append_npy(path, numpy.arange(10, 12, dtype=numpy.int64))
+    numpy.testing.assert_array_equal(numpy.load(path), numpy.arange(12))
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_append_rewrites_a_full_header(tmp_path):
+    path = str(tmp_path / "d.npy")
+    dtype = numpy.dtype(float)
+    #a header with no padding at all, so a longer row count can't fit in it
+    text = repr({"descr": "<f8", "fortran_order": False, "shape": (9,)})
+    with open(path, "wb") as f:
+        f.write(MDP_store._npy_header(dtype, (9,), 10 + len(text) + 1))
+        f.write(numpy.arange(9.0).tobytes())
+    MDP_store._append_npy(path, numpy.arange(9.0, 12.0))
+    numpy.testing.assert_array_equal(numpy.load(path), numpy.arange(12.0))
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_append_rejects_mismatched_rows(tmp_path):
+    path = str(tmp_path / "c.npy")
+    MDP_store._append_npy(path, numpy.zeros((2, 3)))
+    with pytest.raises(ValueError):
+        MDP_store._append_npy(path, numpy.zeros((2, 4)))
+
+
+@pytest.mark.parametrize("interrupted", ["rewards.npy", "offsets.npy"])
+def test_interrupted_append_is_discarded(tmp_path, results, monkeypatch, interrupted):
+    store = MDP_store.MDP_PathwayStore(str(tmp_path / "store"))
+    store.append(results[:3])
+
+    append_npy = MDP_store._append_npy
+    def failing_append_npy(path, array):
+        if os.path.basename(path) == interrupted:
+            raise KeyboardInterrupt
+        append_npy(path, array)
+    monkeypatch.setattr(MDP_store, "_append_npy", failing_append_npy)
+    with pytest.raises(KeyboardInterrupt):
+        store.append(results[3:4])
+    monkeypatch.undo()
+    #and a line cut off part way through
+    with open(str(tmp_path / "store" / "pathways.jsonl"), "a") as f:
+        f.write('{"ID_number": 3')
+
+    assert len(store) == 3
+    store.append(results[4:5])
+    _assert_same(store.load(), SWM.convert_to_MDP_dataset(results[:3] + results[4:5]))
+
+
+def test_interrupted_first_append_is_discarded(tmp_path, results, monkeypatch):
+    store = MDP_store.MDP_PathwayStore(str(tmp_path / "store"))
+    append_npy = MDP_store._append_npy
+    def failing_append_npy(path, array):
+        if path.endswith("offsets.npy"):
+            raise KeyboardInterrupt
+        append_npy(path, array)
+    monkeypatch.setattr(MDP_store, "_append_npy", failing_append_npy)
+    with pytest.raises(KeyboardInterrupt):
+        store.append(results[:2])
+    monkeypatch.undo()
+
+    assert len(store) == 0
+    store.append(results[2:4])
+    _assert_same(store.load(), SWM.convert_to_MDP_dataset(results[2:4]))
+
+
+def test_mismatched_batch_writes_nothing(tmp_path, results):
+    store = MDP_store.MDP_PathwayStore(str(tmp_path / "store"))
+    store.append(results[:2])
+    sizes = dict((name, os.path.getsize(str(tmp_path / "store" / name))) for name in os.listdir(str(tmp_path / "store")))
+
+    dataset = SWM.convert_to_MDP_dataset(results[2:4])
+    dataset.rewards = numpy.zeros((len(dataset.rewards), 2))
+    with pytest.raises(ValueError):
+        store.append(dataset)
+    assert sizes == dict((name, os.path.getsize(str(tmp_path / "store" / name))) for name in os.listdir(str(tmp_path / "store")))
+    _assert_same(store.load(), SWM.convert_to_MDP_dataset(results[:2]))
@@ -0,0 +1,45 @@
+import numpy, pytest
+import SWMv1_3 as SWM
+import SWM_sweep
+
+
+SETTINGS = dict(timesteps=40, coarse_points=3, max_depth=2, seeds=4)
+
+
+def test_points_match_simulate():
+    sweep = SWM_sweep.PolicySweep(**SETTINGS)
+    surface = sweep.run(budget=9, workers=1, SILENT=True)
+    assert len(surface["Points"]) == 9
+    for point in surface["Points"][:3]:
+        values = [SWM.simulate(40, point["Policy"], s, SILENT=True)["Total Pathway Value"] for s in range(4)]
+        assert point["Mean Total Pathway Value"] == pytest.approx(numpy.mean(values))
+        assert point["STD Total Pathway Value"] == pytest.approx(numpy.std(values, ddof=1))
+
+
+def test_refinement_respects_the_budget():
+    surface = SWM_sweep.PolicySweep(**SETTINGS).run(budget=20, workers=1, SILENT=True)
+    assert 9 < len(surface["Points"]) <= 20
+    n = len(surface["b0"])
+    assert surface["Mean Total Pathway Value"].shape == (n, n)
+    assert surface["Evaluated"].sum() == len(surface["Points"])
+
+
+def test_resume_matches_a_straight_run(tmp_path):
+    sweep_file = str(tmp_path / "sweep.json")
+    straight = SWM_sweep.policy_sweep(budget=25, workers=1, SILENT=True, **SETTINGS)
+    SWM_sweep.policy_sweep(budget=12, workers=1, sweep_file=sweep_file, SILENT=True, **SETTINGS)
+    resumed = SWM_sweep.policy_sweep(budget=25, workers=1, sweep_file=sweep_file, SILENT=True, **SETTINGS)
+    assert [p["Policy"] for p in resumed["Points"]] == [p["Policy"] for p in straight["Points"]]
+    numpy.testing.assert_array_equal(resumed["Mean Total Pathway Value"], straight["Mean Total Pathway Value"])
+
+
+@pytest.mark.parametrize("changed", [dict(b0_range=[-10, 20]), dict(max_depth=3), dict(seeds=5), dict(timesteps=30),
+                                     dict(start_seed=2), dict(tolerance=1.0),
+                                     dict(model_parameters={"Severe Burn Cost": 300})])
+def test_resume_with_other_settings_raises(tmp_path, changed):
+    sweep_file = str(tmp_path / "sweep.json")
+    SWM_sweep.policy_sweep(budget=9, workers=1, sweep_file=sweep_file, SILENT=True, **SETTINGS)
+    settings = dict(SETTINGS)
+    settings.update(changed)
+    with pytest.raises(ValueError, match="different settings"):
+        SWM_sweep.policy_sweep(budget=12, workers=1, sweep_file=sweep_file, SILENT=True, **settings)